@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import market_analytics
+from conftest import TECHNOS
+from stub_server import VILLES
+
+SIZES = [200_000, pytest.param(1_000_000, marks=pytest.mark.large)]
+
+
+def enriched_offers(n, seed=0):
+    """Offres enrichies synthétiques : 1 à 6 compétences, 18 mois d'historique"""
+    rng = np.random.default_rng(seed)
+    villes = np.array([f"{dep} - {ville}" for dep, ville in VILLES], dtype=object)
+    technos = np.array([t.lower() for t in TECHNOS], dtype=object)
+    nombres = rng.integers(1, 7, n)
+    tirages = technos[rng.integers(0, len(technos), nombres.sum())]
+    competences = [", ".join(c) for c in np.split(tirages, np.cumsum(nombres)[:-1])]
+    return pd.DataFrame({
+        'Compétences mentionnées': pd.Series(competences, dtype=pd.StringDtype("pyarrow")),
+        'Ville ou région': pd.Categorical(rng.choice(villes, n)),
+        'Type de contrat': pd.Categorical(rng.choice(['CDI', 'CDD', 'Stage', 'Alternance', 'Freelance'], n)),
+        'Niveau de seniorité': pd.Categorical(rng.choice(['Junior', 'Confirmé', 'Senior'], n)),
+        'Date de publication': pd.Timestamp(2024, 1, 1) + pd.to_timedelta(rng.integers(0, 540, n), unit='D'),
+    })
+
+
+@pytest.mark.parametrize("workers", [1, None])
+@pytest.mark.parametrize("rows", SIZES)
+def test_market_analytics(benchmark, rows, workers):
+    df = enriched_offers(rows)
+    result = benchmark.pedantic(lambda: market_analytics(df, workers=workers), rounds=3)
+    assert result.total_offres == rows
+    benchmark.extra_info.update(lignes=rows, competences=len(result.skills))
@@ -0,0 +1,43 @@
+import pytest
+
+import collect_data_api_franceTravail as api
+import http_client
+from http_cache import HttpCache
+from http_client import HttpClient
+
+METIERS = [f"métier {i}" for i in range(20)]
+
+
+@pytest.fixture
+def api_stub(stub, monkeypatch):
+    monkeypatch.setattr(api, "API_BASE_URL", stub.api_url)
+    monkeypatch.setattr(http_client, "_default_client", HttpClient())
+    return stub
+
+
+def test_search_offers_pagination(benchmark, api_stub):
+    """Un mot-clé de 3000 offres : 20 fenêtres de 150 via Content-Range"""
+    pages = benchmark(api.search_offers, "tok", "python")
+    assert sum(len(offers) for _, offers in pages) == 3000
+    benchmark.extra_info["offres"] = 3000
+
+
+@pytest.mark.parametrize("workers", [1, 8])
+def test_collect_offers_throughput(benchmark, api_stub, workers):
+    """20 mots-clés de 450 offres, séquentiel contre pool de threads"""
+    result = benchmark.pedantic(api.collect_offers, args=("tok", METIERS),
+                                kwargs={"workers": workers, "rate": 0}, rounds=3)
+    assert sum(map(len, result.values())) == 20 * 450
+    benchmark.extra_info["offres"] = 20 * 450
+
+
+def test_search_offers_replay(benchmark, api_stub, tmp_path, monkeypatch):
+    """Même collecte servie par le cache HTTP : coût hors réseau (décompression + JSON)"""
+    cache = HttpCache(str(tmp_path / "cache.sqlite"), "auto")
+    monkeypatch.setattr(http_client, "_default_client", HttpClient(cache=cache))
+    api.search_offers("tok", "python")
+    requests_before = len(api_stub.requests)
+
+    pages = benchmark(api.search_offers, "tok", "python")
+    assert sum(len(offers) for _, offers in pages) == 3000
+    assert len(api_stub.requests) == requests_before
@@ -0,0 +1,79 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_store import store_offers
+from cdc import CurrentOffers, capture, changeset_path
+
+SIZES = [200_000, pytest.param(1_000_000, marks=pytest.mark.large)]
+
+
+def next_day(df, part=0.01, seed=1):
+    """Collecte du lendemain : `part` des offres retirées, autant de modifiées et de nouvelles"""
+    rng = np.random.default_rng(seed)
+    k = int(len(df) * part)
+    positions = rng.permutation(len(df))
+    suivante = df.drop(index=positions[:k]).copy()
+    modifiees = suivante.index.isin(positions[k:2 * k])
+    suivante.loc[modifiees, 'Salaire annuel min'] += 1000
+    nouvelles = df.iloc[:k].assign(Identifiant=pd.Series([f"NV-{i:09d}" for i in range(k)],
+                                                         dtype=pd.StringDtype("pyarrow")).to_numpy())
+    return pd.concat([suivante, nouvelles], ignore_index=True)
+
+
+@pytest.fixture(scope="module", params=SIZES)
+def base(request, tmp_path_factory):
+    """Table des offres courantes après une première collecte de `rows` offres"""
+    dossier = tmp_path_factory.mktemp("cdc")
+    df = store_offers(request.param)
+    with CurrentOffers(str(dossier / "base.sqlite")) as offres:
+        capture(df, offres, str(dossier / "changesets"))
+    return df, dossier
+
+
+def test_cdc_unchanged(benchmark, base):
+    """Collecte identique : empreintes comparées, aucun changeset"""
+    df, dossier = base
+    with CurrentOffers(str(dossier / "base.sqlite")) as offres:
+        assert benchmark.pedantic(lambda: capture(df, offres, str(dossier / "changesets")), rounds=3) is None
+    benchmark.extra_info.update(offres=len(df))
+
+
+def test_cdc_daily_changeset(benchmark, base):
+    """Changeset d'une collecte à 1 % d'insertions, de modifications et de suppressions, puis application"""
+    df, dossier = base
+    suivante = next_day(df)
+
+    def copie():
+        shutil.copy(dossier / "base.sqlite", dossier / "jour.sqlite")
+        return (), {}
+
+    def jour():
+        with CurrentOffers(str(dossier / "jour.sqlite")) as offres:
+            return capture(suivante, offres, str(dossier / "jour"))
+
+    entete = benchmark.pedantic(jour, setup=copie, rounds=3)
+    k = len(df) // 100
+    assert (entete["insertions"], entete["modifications"], entete["suppressions"]) == (k, k, k)
+    benchmark.extra_info.update(offres=len(df), octets=(dossier / "jour" / "changeset-000002.jsonl").stat().st_size)
+
+
+def test_cdc_replica_apply(benchmark, base):
+    """Consommateur : application du changeset quotidien à sa copie plutôt que rechargement complet"""
+    df, dossier = base
+    shutil.copy(dossier / "base.sqlite", dossier / "source.sqlite")
+    with CurrentOffers(str(dossier / "source.sqlite")) as offres:
+        capture(next_day(df), offres, str(dossier / "publies"))
+
+    def copie():
+        shutil.copy(dossier / "base.sqlite", dossier / "replique.sqlite")
+        return (), {}
+
+    def appliquer():
+        with CurrentOffers(str(dossier / "replique.sqlite")) as replique:
+            replique.apply_file(changeset_path(str(dossier / "publies"), 2))
+            return replique.count()
+
+    assert benchmark.pedantic(appliquer, setup=copie, rounds=3) == len(df)
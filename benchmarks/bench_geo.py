@@ -0,0 +1,55 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from geo import GeoIndex, GeoReference, default_reference, geocode
+
+SIZES = [200_000, pytest.param(1_000_000, marks=pytest.mark.large)]
+
+
+def locations(n, seed=0):
+    """Lieux bruts aux formats des quatre sources (France Travail, Glassdoor, LinkedIn, défaut), fautes comprises"""
+    reference = default_reference()
+    communes = reference.communes
+    regions = reference.departements['region'].map(reference.regions['nom'])
+    formats = [
+        lambda nom, dep: f"{dep} - {nom.upper()}",
+        lambda nom, dep: f"{nom} ({dep})",
+        lambda nom, dep: f"{nom}, {regions[dep]}, France",
+        lambda nom, dep: nom[:-2] + nom[-1],  # une lettre oubliée
+        lambda nom, dep: "France",
+    ]
+    distincts = np.array([f(nom, dep) for f in formats
+                          for nom, dep in zip(communes['nom'], communes['departement'])], dtype=object)
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'Ville ou région': pd.Series(rng.choice(distincts, n), dtype=pd.StringDtype("pyarrow"))})
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_geocode(benchmark, rows):
+    df = locations(rows)
+    # Référentiel neuf à chaque tour : le cache de résolution part vide
+    result = benchmark.pedantic(lambda: geocode(df, GeoReference()), rounds=3)
+    precision = result['Précision géo'].value_counts(normalize=True)
+    benchmark.extra_info.update(lignes=rows, lieux=df['Ville ou région'].nunique(), commune=float(precision['commune']))
+    assert precision['commune'] > 0.7
+
+
+@pytest.fixture(scope="module", params=SIZES)
+def index(request):
+    geo = geocode(locations(request.param))
+    return GeoIndex.from_frame(geo)
+
+
+def test_geo_within(benchmark, index):
+    villes = itertools.cycle([default_reference().find(v) for v in ("Lyon", "Paris", "Toulouse", "Rennes", "Lille")])
+
+    def requete():
+        lieu = next(villes)
+        return index.within(lieu.latitude, lieu.longitude, 30)
+
+    positions, distances = benchmark(requete)
+    assert len(positions) and distances.max() <= 30
+    benchmark.extra_info.update(offres=len(index))
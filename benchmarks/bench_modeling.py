@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import synthetic_titles
+from modeling import OfferModel, dataframe_chunks
+
+SIZES = [20_000, pytest.param(200_000, marks=pytest.mark.large)]
+PHRASES = ["Vous concevez des pipelines de données", "Vous développez des interfaces web",
+           "Vous administrez les serveurs Linux", "Vous assurez le support utilisateurs",
+           "Vous pilotez des projets agiles", "Vous sécurisez le système d'information"]
+
+
+def described_offers(n, seed=0):
+    """Offres synthétiques avec une description de quelques phrases"""
+    rng = np.random.default_rng(seed)
+    titres = synthetic_titles(n, seed)
+    phrases = np.array(PHRASES, dtype=object)
+    return pd.DataFrame({
+        'Identifiant': [f"o{i}" for i in range(n)],
+        'Intitulé du poste': titres,
+        'Compétences mentionnées': "Non spécifié",
+        'Description du poste': [". ".join(phrases[rng.integers(0, len(phrases), 4)]) + " " + t for t in titres],
+        'Type de contrat': [t.split()[0] if t.split()[0] in ('CDI', 'Stage', 'Alternance') else 'Freelance'
+                            for t in titres],
+        'Niveau de seniorité': rng.choice(['Junior', 'Confirmé', 'Senior'], n),
+    })
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_offer_model_fit(benchmark, rows, tmp_path):
+    df = described_offers(rows)
+    modele = benchmark.pedantic(lambda: OfferModel().fit(dataframe_chunks(df), workdir=str(tmp_path)), rounds=2)
+    assert modele.n_documents == rows
+    benchmark.extra_info.update(lignes=rows, **modele.report()["precision_validation"])
+
+
+def test_offer_model_score(benchmark):
+    df = described_offers(20_000)
+    modele = OfferModel().fit(dataframe_chunks(df))
+    scores = benchmark.pedantic(modele.score, args=(df,), rounds=3)
+    assert len(scores) == len(df)
@@ -0,0 +1,52 @@
+import random
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from normalisation import load_normalised
+from salary_parsing import SALARY_PATTERNS, PatternEngine
+from storage import JsonlWriter, batched
+from stub_server import make_offer
+
+SIZES = [100_000, pytest.param(1_000_000, marks=pytest.mark.large), pytest.param(5_000_000, marks=pytest.mark.large)]
+
+FORMATS = ["Annuel de {a}000 Euros à {b}000 Euros sur 12 mois", "Mensuel de {m}.00 Euros sur 12 mois",
+           "{a}k€ - {b}k€", "{a} 000 € - {b} 000 €", "{m} € / mois", "Gratification légale",
+           "Salaire alternance", "Non spécifié", "Selon profil"]
+
+
+def salary_labels(n, distinct, seed=0):
+    """`n` libellés de salaire tirés parmi `distinct` variantes (cardinalité réaliste)"""
+    rng = random.Random(seed)
+    variants = []
+    for _ in range(distinct):
+        a = rng.randrange(25, 70)
+        variants.append(rng.choice(FORMATS).format(a=a, b=a + rng.randrange(5, 15), m=rng.randrange(1200, 4000)))
+    return pd.Series([variants[rng.randrange(distinct)] for _ in range(n)], dtype=pd.StringDtype("pyarrow"))
+
+
+@pytest.mark.parametrize("distinct", [1_000, 50_000])
+@pytest.mark.parametrize("rows", SIZES)
+def test_parse_salaries(benchmark, rows, distinct):
+    labels = salary_labels(rows, distinct)
+    engine = PatternEngine(SALARY_PATTERNS, ['salaire_min', 'salaire_max'], "Salaires")
+
+    result = benchmark.pedantic(lambda: engine.parse(labels), rounds=3)
+    assert len(result) == rows
+    benchmark.extra_info.update(lignes=rows, distincts=distinct,
+                                taux_non_reconnu=engine.report()["taux_non_reconnu"])
+
+
+@pytest.mark.parametrize("rows", [20_000, pytest.param(200_000, marks=pytest.mark.large)])
+def test_load_normalised_api(benchmark, rows, tmp_path):
+    """Lecture Arrow du JSONL brut de l'API + normalisation typée"""
+    path = str(tmp_path / "offres.jsonl")
+    reference = datetime(2024, 6, 1)
+    with JsonlWriter(path) as writer:
+        for batch in batched((make_offer(n, reference) for n in range(rows)), 10_000):
+            writer.write_batch(batch)
+
+    df = benchmark.pedantic(lambda: load_normalised(path), rounds=3)
+    assert len(df) == rows
+    benchmark.extra_info["lignes"] = rows
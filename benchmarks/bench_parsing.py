@@ -0,0 +1,31 @@
+import pytest
+
+from collect_data_scrapping import parse_chooseyourboss_card, parse_glassdoor_card, parse_linkedin_element
+from html_parsing import available_backends, parse_cards
+from sites import CHOOSEYOURBOSS, GLASSDOOR, LINKEDIN
+from stub_server import chooseyourboss_page, glassdoor_page, linkedin_page
+
+URL = "https://www.linkedin.com/jobs/search/?keywords=stage%20informatique&location=France"
+
+# site -> (générateur de page, adaptateur, fonction de parsing d'une carte)
+SITES = {
+    "linkedin": (linkedin_page, LINKEDIN, lambda card: parse_linkedin_element(card, URL)),
+    "glassdoor": (glassdoor_page, GLASSDOOR, lambda card: parse_glassdoor_card(card, "Stage")),
+    "chooseyourboss": (chooseyourboss_page, CHOOSEYOURBOSS, lambda card: parse_chooseyourboss_card(card, "Stage")),
+}
+
+
+@pytest.mark.parametrize("cards", [100, 2000])
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("site", list(SITES))
+def test_parse_cards(benchmark, site, backend, cards):
+    """Analyse d'une grande page de résultats + conversion de chaque carte en offre"""
+    render, adapter, parse_card = SITES[site]
+    html = render("/offres/stage?q=informatique", cards)
+
+    def run():
+        return [parse_card(card) for card in parse_cards(html, adapter.selectors["card"], adapter.strainer, backend)]
+
+    offers = benchmark(run)
+    assert len(offers) == cards
+    benchmark.extra_info.update(cartes=cards, octets=len(html))
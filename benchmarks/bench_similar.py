@@ -0,0 +1,61 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from similar import DIMENSION, SimilarityIndex, recall_at_k
+
+SIZES = [200_000, pytest.param(1_000_000, marks=pytest.mark.large)]
+N_QUERIES = 100
+
+
+def clustered_embeddings(n, clusters=2000, noise=0.6, seed=0):
+    """Plongements normés regroupés en familles, comme ceux d'offres proches"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, DIMENSION)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    vecteurs = centres[rng.integers(0, clusters, n)]
+    vecteurs += noise * rng.standard_normal((n, DIMENSION)).astype(np.float32) / np.sqrt(DIMENSION)
+    return vecteurs / np.linalg.norm(vecteurs, axis=1, keepdims=True)
+
+
+@pytest.fixture(scope="module", params=SIZES)
+def index(request, tmp_path_factory):
+    """Index de `n` offres ; les requêtes sont N_QUERIES offres tirées à part, de mêmes familles"""
+    n = request.param
+    vecteurs = clustered_embeddings(n + N_QUERIES)
+    index = SimilarityIndex(str(tmp_path_factory.mktemp("similaires")))
+    index.add([str(i) for i in range(n)], vecteurs[:n])
+    return index, vecteurs[n:]
+
+
+def test_similar_search(benchmark, index):
+    index, requetes = index
+    cycle = itertools.cycle(requetes)
+    result = benchmark(lambda: index.search(next(cycle), k=20))
+    assert len(result) == 20
+    rappel = recall_at_k(index, requetes, k=20)
+    benchmark.extra_info.update(offres=len(index), rappel_20=rappel)
+    assert rappel >= 0.9
+
+
+def test_exact_search(benchmark, index):
+    index, requetes = index
+    cycle = itertools.cycle(requetes)
+    result = benchmark(lambda: index.exact(next(cycle), k=20))
+    assert len(result) == 20
+    benchmark.extra_info["offres"] = len(index)
+
+
+def test_similar_incremental_add(benchmark, tmp_path):
+    """Ajouts de 1 000 offres à un index de 200 000 (queue non triée, puis retri)"""
+    vecteurs = clustered_embeddings(300_000)
+    index = SimilarityIndex(str(tmp_path / "similaires"))
+    index.add([str(i) for i in range(200_000)], vecteurs[:200_000])
+    lots = iter(range(200_000, 300_000, 1_000))
+
+    def add():
+        debut = next(lots)
+        return index.add([str(i) for i in range(debut, debut + 1_000)], vecteurs[debut:debut + 1_000])
+
+    assert benchmark.pedantic(add, rounds=50) == 1_000
@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from collect_data_scrapping import extract_skills_from_title
+from conftest import synthetic_titles
+from skills import DEFAULT_EXTRACTOR
+
+N_TITLES = 100_000
+
+
+@pytest.fixture(scope="module")
+def titles():
+    return synthetic_titles(N_TITLES)
+
+
+def test_extract_skills_from_title(benchmark, titles):
+    result = benchmark.pedantic(lambda: [extract_skills_from_title(title) for title in titles], rounds=5)
+    assert len(result) == N_TITLES
+    benchmark.extra_info["titres"] = N_TITLES
+
+
+def test_tag_column(benchmark, titles):
+    series = pd.Series(titles)
+    result = benchmark.pedantic(DEFAULT_EXTRACTOR.tag_column, args=(series,), rounds=5)
+    assert len(result) == N_TITLES
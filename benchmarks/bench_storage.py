@@ -0,0 +1,41 @@
+import pytest
+
+from collect_data_scrapping import save_offers_csv
+from conftest import synthetic_offers
+from storage import JsonlWriter, batched, iter_jsonl
+
+SIZES = [10_000, 100_000, pytest.param(1_000_000, marks=pytest.mark.large)]
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_save_offers_csv(benchmark, rows, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # save_offers_csv écrit dans data/offres/
+    filename = benchmark.pedantic(lambda: save_offers_csv(synthetic_offers(rows)), rounds=3)
+    assert filename.endswith(".csv")
+    benchmark.extra_info["lignes"] = rows
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+@pytest.mark.parametrize("rows", SIZES)
+def test_jsonl_write(benchmark, rows, compression, tmp_path):
+    path = tmp_path / "offres.jsonl"
+
+    def run():
+        with JsonlWriter(str(path), compression) as writer:
+            for batch in batched(synthetic_offers(rows), 10_000):
+                writer.write_batch(batch)
+        return writer.rows
+
+    assert benchmark.pedantic(run, rounds=3) == rows
+    benchmark.extra_info["lignes"] = rows
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_jsonl_read(benchmark, rows, tmp_path):
+    path = str(tmp_path / "offres.jsonl")
+    with JsonlWriter(path) as writer:
+        for batch in batched(synthetic_offers(rows), 10_000):
+            writer.write_batch(batch)
+
+    count = benchmark.pedantic(lambda: sum(1 for _ in iter_jsonl(path)), rounds=3)
+    assert count == rows
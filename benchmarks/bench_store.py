@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_analytics import enriched_offers
+from offer_store import OfferStore
+
+SIZES = [200_000, pytest.param(1_000_000, marks=pytest.mark.large)]
+MONTHS = 10
+
+
+def store_offers(n, seed=0):
+    """Offres enrichies synthétiques avec intitulé, description et identifiant"""
+    df = enriched_offers(n, seed)
+    rng = np.random.default_rng(seed)
+    texte = pd.StringDtype("pyarrow")
+    df['Identifiant'] = pd.Series([f"FT-{i:09d}" for i in range(n)], dtype=texte)
+    df['Intitulé du poste'] = pd.Series(rng.choice(["Data Engineer", "Développeur Python", "DevOps AWS",
+                                                    "Administrateur systèmes"], n), dtype=texte)
+    df['Description du poste'] = pd.Series([f"Mission {i % 9973} : " + "contexte " * 40 for i in range(n)], dtype=texte)
+    df['Source'] = pd.Categorical(rng.choice(["France Travail", "LinkedIn", "Glassdoor"], n))
+    df['Salaire annuel min'] = rng.normal(45000, 8000, n).astype(np.float32)
+    return df
+
+
+@pytest.fixture(scope="module", params=SIZES)
+def rows(request):
+    return request.param
+
+
+@pytest.fixture(scope="module", params=["arrow", "parquet"])
+def store(request, rows, tmp_path_factory):
+    """Entrepôt de `rows` offres collectées sur MONTHS mois"""
+    df = store_offers(rows)
+    store = OfferStore(str(tmp_path_factory.mktemp("store")), format=request.param)
+    for mois, partie in enumerate(np.array_split(np.arange(rows), MONTHS)):
+        store.write(df.iloc[partie], collected=f"2024-{mois + 1:02d}-15")
+    return store
+
+
+def test_store_open_full(benchmark, store):
+    df = benchmark.pedantic(lambda: OfferStore(store.root).load(), rounds=5)
+    benchmark.extra_info.update(offres=len(df), format=store.format)
+    assert len(df) == len(store)
+
+
+def test_store_open_month_projection(benchmark, store):
+    colonnes = ['Intitulé du poste', 'Compétences mentionnées', 'Ville ou région']
+    df = benchmark(lambda: OfferStore(store.root).load(columns=colonnes, months=["2024-03"]))
+    benchmark.extra_info.update(offres=len(df), format=store.format)
+    assert list(df.columns) == colonnes and 0 < len(df) < len(store)
+
+
+def test_store_write_unchanged(benchmark, store):
+    """Resynchronisation d'un mois inchangé : lecture des empreintes, aucune écriture"""
+    df = store.load(months=["2024-01"])
+    stats = benchmark.pedantic(lambda: store.write(df.drop(columns=['Date de collecte'])), rounds=3)
+    assert stats["modifiees"] == 0 and stats["nouvelles"] == 0
@@ -0,0 +1,107 @@
+import itertools
+import os
+import random
+import sys
+
+import pytest
+
+# Mêmes chemins d'import que les scripts lancés depuis src/
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "src", "scraping"))
+
+from stub_server import ENTREPRISES, INTITULES, VILLES, StubServer  # noqa: E402
+
+# Historique des exécutions, comparable avec --benchmark-compare
+HISTORY = os.path.join(HERE, ".benchmarks")
+
+
+def pytest_addoption(parser):
+    parser.addoption("--bench-large", action="store_true",
+                     help="Inclure les très gros volumes (jusqu'à 1M lignes)")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    """Sauvegarde automatique de chaque exécution dans benchmarks/.benchmarks"""
+    if not config.pluginmanager.hasplugin("benchmark") or config.option.benchmark_disable:
+        return
+    from pytest_benchmark.utils import get_tag
+    if not config.option.benchmark_save and not config.option.benchmark_autosave:
+        config.option.benchmark_autosave = get_tag()
+    if config.option.benchmark_storage == "file://./.benchmarks":
+        config.option.benchmark_storage = "file://" + HISTORY
+
+
+def pytest_ignore_collect(collection_path, config):
+    """Sans pytest-benchmark, les benchmarks sont ignorés au lieu d'échouer"""
+    if collection_path.name.startswith("bench_") and not config.pluginmanager.hasplugin("benchmark"):
+        return True
+    return None
+
+
+def pytest_report_header(config):
+    if not config.pluginmanager.hasplugin("benchmark"):
+        return "pytest-benchmark absent : benchmarks ignorés (pip install pytest-benchmark)"
+    return f"historique des benchmarks : {HISTORY}"
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--bench-large"):
+        return
+    skip = pytest.mark.skip(reason="gros volume : relancer avec --bench-large")
+    for item in items:
+        if "large" in item.keywords:
+            item.add_marker(skip)
+
+
+# --------------------------------------------------------------
+#  Données synthétiques
+# --------------------------------------------------------------
+
+TECHNOS = ["Python", "Java", "React", "Node.js", "AWS", "Docker", "Kubernetes", "SQL", "Power BI",
+           "C#", ".NET", "Angular", "Spark", "Go", "Vue", "PHP/Symfony", "DevOps", "Cloud Azure"]
+
+
+def synthetic_titles(n, seed=0):
+    """Intitulés de poste réalistes (mélange de formulations et de technologies)"""
+    rng = random.Random(seed)
+    return [f"{rng.choice(['Stage', 'Alternance', 'CDI', 'Freelance'])} {rng.choice(INTITULES)} "
+            f"{rng.choice(TECHNOS)}/{rng.choice(TECHNOS)} H/F"
+            for _ in range(n)]
+
+
+def synthetic_offers(n, seed=0, distinct=1000):
+    """
+    `n` offres au format des scrapers, générées à la volée : on recycle
+    `distinct` offres pour ne pas mesurer la génération ni saturer la mémoire.
+    """
+    rng = random.Random(seed)
+    base = []
+    for i, title in enumerate(synthetic_titles(distinct, seed)):
+        company = rng.choice(ENTREPRISES)
+        base.append({
+            'Intitulé du poste': title,
+            'Nom de l entreprise': company,
+            'Ville ou région': rng.choice(VILLES)[1],
+            'Date de publication': f"{rng.randint(1, 28):02d}/0{rng.randint(1, 9)}/2024",
+            'Type de contrat': title.split()[0],
+            'Nombre d années d expérience demandées': str(rng.randint(0, 5)),
+            'Niveau de seniorité': rng.choice(['Étudiant', 'Junior', 'Confirmé']),
+            'Description du poste': f"Offre synthétique - {title} chez {company}. " * 3,
+            'Source': rng.choice(['LinkedIn', 'Glassdoor', 'ChooseYourBoss']),
+            'Télétravail': rng.choice(['Oui', 'Non', 'Non spécifié']),
+            'Compétences mentionnées': 'python, sql',
+            'Fourchette salariale': 'Non spécifié',
+            'URL': f"https://example.com/offre/{i}",
+        })
+    return itertools.islice(itertools.cycle(base), n)
+
+
+@pytest.fixture(scope="session")
+def stub():
+    """Serveur bouchon local : aucune requête ne sort de la machine"""
+    totals = {"python": 3000, **{f"métier {i}": 450 for i in range(20)}}
+    with StubServer(totals=totals, cards_per_page=25) as server:
+        yield server
@@ -0,0 +1,282 @@
+import argparse
+import os
+import sys
+
+# ==============================================================
+#  Point d'entrée unique du projet
+# ==============================================================
+#
+#  python main.py run                 collecte -> normalisation -> dédoublonnage -> enrichissement -> analyse
+#  python main.py run --until enrich  s'arrêter après l'enrichissement
+#  python main.py run --force analyse rejouer une étape malgré le cache
+#  python main.py status              état du cache des étapes
+#  python main.py search kubernetes --city Lyon --remote
+#                                     recherche plein texte dans les offres indexées
+#  python main.py similar FT-123456A  offres les plus proches d'une offre
+#  python main.py similar --skills python docker aws
+#                                     offres correspondant à une liste de compétences (CV)
+#  python main.py near Lyon --km 30   offres à moins de 30 km d'un lieu
+#  python main.py store --month 2024-05 --columns "Intitulé du poste" "Ville ou région"
+#                                     lecture de l'entrepôt colonnaire (mois, sources, colonnes)
+#  python main.py changes --replica copie.sqlite
+#                                     changesets publiés ; tenir à jour une copie des offres courantes
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(ROOT, "src")
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.join(SRC, "scraping"))
+
+# Options désignant des fichiers de l'utilisateur (search --index, changes --replica)
+PATH_OPTIONS = ("index", "replica")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline d'analyse des offres d'emploi IT")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Exécuter le pipeline (les étapes inchangées sont sautées)")
+    run.add_argument("--until", nargs="+", default=None, metavar="ETAPE",
+                     help="Étapes cibles (avec leurs dépendances) ; toutes par défaut")
+    run.add_argument("--force", nargs="+", default=[], metavar="ETAPE",
+                     help="Étapes à rejouer même si leur cache est valide")
+    run.add_argument("--refresh", action="store_true",
+                     help="Relancer les collectes même si elles sont récentes")
+    run.add_argument("--max-age", type=float, default=24,
+                     help="Âge maximal (heures) d'une collecte réutilisable")
+    run.add_argument("--no-api", action="store_true", help="Sans la collecte France Travail")
+    run.add_argument("--no-scraping", action="store_true", help="Sans le scraping des sites")
+    run.add_argument("--workers", type=int, default=1,
+                     help="Requêtes simultanées vers l'API France Travail")
+    run.add_argument("--max-results", type=int, default=None,
+                     help="Nombre maximal d'offres par mot-clé (par défaut : toutes)")
+    run.add_argument("--incremental", action="store_true",
+                     help="Collecte France Travail incrémentale")
+
+    commands.add_parser("status", help="Afficher l'état du cache des étapes")
+
+    search = commands.add_parser("search", help="Rechercher dans les offres indexées (étape index)")
+    search.add_argument("query", nargs="*", help="Mots-clés (tous requis)")
+    search.add_argument("--city", help="Ville ou région")
+    search.add_argument("--contract", nargs="+", help="Type(s) de contrat : CDI, Stage, Alternance...")
+    search.add_argument("--skill", help="Compétence mentionnée")
+    search.add_argument("--since", help="Publiées depuis (AAAA-MM-JJ)")
+    search.add_argument("--until", help="Publiées jusqu'au (AAAA-MM-JJ)")
+    search.add_argument("--remote", action="store_true", help="Télétravail total ou partiel")
+    search.add_argument("--source", help="France Travail, LinkedIn, Glassdoor, ChooseYourBoss...")
+    search.add_argument("--limit", type=int, default=20, help="Nombre maximal de résultats")
+    search.add_argument("--index", default=None, help="Chemin de l'index (data/pipeline/recherche.sqlite)")
+
+    similar = commands.add_parser("similar", help="Offres similaires à une offre ou à des compétences (étape similar)")
+    similar.add_argument("offer", nargs="?", help="Identifiant de l'offre de référence")
+    similar.add_argument("--skills", nargs="+", help="Compétences à rapprocher des offres (ex. celles d'un CV)")
+    similar.add_argument("--limit", type=int, default=20, help="Nombre d'offres proposées")
+    similar.add_argument("--exact", action="store_true", help="Recherche exhaustive plutôt qu'approchée")
+
+    near = commands.add_parser("near", help="Offres autour d'un lieu (étapes geo et index)")
+    near.add_argument("place", help="Commune, département ou région (ex. Lyon, « 92 - Nanterre », Bretagne)")
+    near.add_argument("--km", type=float, default=30, help="Rayon de recherche en kilomètres")
+    near.add_argument("--limit", type=int, default=20, help="Nombre d'offres affichées (les plus proches)")
+
+    store = commands.add_parser("store", help="Contenu de l'entrepôt colonnaire des offres (étape store)")
+    store.add_argument("--month", nargs="+", help="Mois de collecte (AAAA-MM)")
+    store.add_argument("--source", nargs="+", help="Source(s) : France Travail, LinkedIn...")
+    store.add_argument("--columns", nargs="+", help="Colonnes à charger (toutes par défaut)")
+    store.add_argument("--contract", nargs="+", help="Type(s) de contrat")
+    store.add_argument("--since", help="Publiées depuis (AAAA-MM-JJ)")
+
+    changes = commands.add_parser("changes", help="Changesets entre collectes et table des offres courantes (étape cdc)")
+    changes.add_argument("--replica", help="Base SQLite à mettre à jour en appliquant les changesets manquants")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Chemins donnés par l'utilisateur : relatifs à son répertoire courant, pas à src/
+    for option in PATH_OPTIONS:
+        if getattr(args, option, None):
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+    # Les collecteurs écrivent dans data/ relativement à src/, comme lorsqu'ils sont lancés seuls
+    os.chdir(SRC)
+    from pipeline import Pipeline, default_stages
+
+    if args.command == "status":
+        for row in Pipeline(default_stages()).describe():
+            presence = "✅" if row["presente"] else "—"
+            print(f"{presence} {row['etape']:<17} ← {row['depend_de']:<35} {row['derniere_execution']}")
+        return 0
+
+    if args.command == "search":
+        return search(args)
+
+    if args.command == "similar":
+        return similar(args)
+
+    if args.command == "near":
+        return near(args)
+
+    if args.command == "store":
+        return store(args)
+
+    if args.command == "changes":
+        return changes(args)
+
+    if args.no_api and args.no_scraping:
+        print("❌ Au moins une source de collecte est nécessaire")
+        return 1
+    stages = default_stages(workers=args.workers, max_results=args.max_results, incremental=args.incremental,
+                            max_age=args.max_age, api=not args.no_api, scraping=not args.no_scraping)
+    status = Pipeline(stages).run(targets=args.until, force=args.force, refresh=args.refresh)
+
+    print("\n📋 Bilan du pipeline:")
+    for name, etat in status.items():
+        print(f"   - {name}: {etat}")
+    return 1 if "echec" in status.values() else 0
+
+
+def search(args):
+    import time
+    from search_index import SEARCH_INDEX_PATH, SearchIndex
+
+    path = args.index or SEARCH_INDEX_PATH
+    if not os.path.exists(path):
+        print(f"❌ Index absent ({path}) : lancer d'abord `python main.py run --until index`")
+        return 1
+    start = time.perf_counter()
+    with SearchIndex(path) as index:
+        results = index.search(" ".join(args.query), city=args.city, contract=args.contract, skill=args.skill,
+                               since=args.since, until=args.until, remote=True if args.remote else None,
+                               source=args.source, limit=args.limit)
+    elapsed = 1000 * (time.perf_counter() - start)
+
+    print(f"🔍 {len(results)} offre(s) en {elapsed:.1f} ms")
+    for offre in results:
+        print_offer(offre)
+    return 0
+
+
+def similar(args):
+    import time
+    from modeling import MODEL_PATH, OfferModel
+    from search_index import SEARCH_INDEX_PATH, SearchIndex
+    from similar import META, SIMILAR_INDEX_DIR, OfferEmbedder, SimilarityIndex
+
+    if bool(args.offer) == bool(args.skills):
+        print("❌ Indiquer soit un identifiant d'offre, soit --skills")
+        return 1
+    for path in (os.path.join(SIMILAR_INDEX_DIR, META), SEARCH_INDEX_PATH):
+        if not os.path.exists(path):
+            print(f"❌ Index absent ({path}) : lancer d'abord `python main.py run --until similar index`")
+            return 1
+    start = time.perf_counter()
+    index = SimilarityIndex(SIMILAR_INDEX_DIR)
+    if args.offer:
+        if args.offer not in index.rangs:
+            print(f"❌ Offre inconnue de l'index : {args.offer}")
+            return 1
+        ligne = index.rangs[args.offer]
+        vecteur, exclude = index.vecteurs[ligne], ligne
+    else:
+        embedder = OfferEmbedder.frozen(OfferModel.load(MODEL_PATH), SIMILAR_INDEX_DIR)
+        vecteur, exclude = embedder.embed_skills(args.skills), None
+    chercher = index.exact if args.exact else index.search
+    voisins = chercher(vecteur, args.limit, exclude=exclude)
+    elapsed = 1000 * (time.perf_counter() - start)
+
+    scores = dict(voisins)
+    with SearchIndex(SEARCH_INDEX_PATH) as offres:
+        results = offres.get(scores)
+    print(f"🧭 {len(results)} offre(s) similaire(s) en {elapsed:.1f} ms")
+    for offre in results:
+        print_offer(offre, f"similarité {scores[offre['identifiant']]:.2f}")
+    return 0
+
+
+def near(args):
+    import time
+    import pandas as pd
+    from geo import GeoIndex, default_reference
+    from pipeline import PIPELINE_DIR
+    from search_index import SEARCH_INDEX_PATH, SearchIndex
+
+    path = os.path.join(PIPELINE_DIR, 'offres_enrichies.parquet')
+    for requis in (path, SEARCH_INDEX_PATH):
+        if not os.path.exists(requis):
+            print(f"❌ Fichier absent ({requis}) : lancer d'abord `python main.py run --until enrich index`")
+            return 1
+    try:
+        lieu = default_reference().find(args.place)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    df = pd.read_parquet(path, columns=['Identifiant', 'Latitude', 'Longitude'])
+    index = GeoIndex.from_frame(df)
+    start = time.perf_counter()
+    positions, distances = index.within(lieu.latitude, lieu.longitude, args.km)
+    elapsed = 1000 * (time.perf_counter() - start)
+
+    distances = dict(zip(df['Identifiant'].to_numpy()[positions[:args.limit]], distances[:args.limit]))
+    with SearchIndex(SEARCH_INDEX_PATH) as offres:
+        results = offres.get(distances)
+    print(f"📍 {len(positions)} offre(s) à moins de {args.km:g} km de {lieu.commune or args.place} "
+          f"en {elapsed:.1f} ms")
+    for offre in results:
+        print_offer(offre, f"{distances[offre['identifiant']]:.0f} km")
+    return 0
+
+
+def store(args):
+    import time
+    from normalisation import memory_mb
+    from offer_store import OFFER_STORE_DIR, OfferStore
+
+    if not os.path.exists(os.path.join(OFFER_STORE_DIR, 'manifest.json')):
+        print(f"❌ Entrepôt absent ({OFFER_STORE_DIR}) : lancer d'abord `python main.py run --until store`")
+        return 1
+    start = time.perf_counter()
+    entrepot = OfferStore(OFFER_STORE_DIR)
+    filtre = [('Type de contrat', 'in', args.contract)] if args.contract else None
+    df = entrepot.load(columns=args.columns, filter=filtre, months=args.month, sources=args.source, since=args.since)
+    elapsed = 1000 * (time.perf_counter() - start)
+
+    fichiers = entrepot.files(args.month, args.source, args.since)
+    print(f"🗄️ {len(entrepot)} offres, mois {', '.join(entrepot.months)}, sources {', '.join(entrepot.sources)}")
+    print(f"   {len(df)} offre(s) x {df.shape[1]} colonne(s) lues dans {len(fichiers)} fichier(s) "
+          f"en {elapsed:.0f} ms, {memory_mb(df):.1f} Mo")
+    if len(df):
+        print(df.head(10).to_string(max_colwidth=40))
+    return 0
+
+
+def changes(args):
+    from cdc import CHANGESET_DIR, CURRENT_OFFERS_PATH, CurrentOffers, changeset_path
+
+    if not os.path.exists(CURRENT_OFFERS_PATH):
+        print(f"❌ Table des offres courantes absente ({CURRENT_OFFERS_PATH}) : lancer d'abord `python main.py run --until cdc`")
+        return 1
+    with CurrentOffers(CURRENT_OFFERS_PATH) as offres:
+        historique = offres.conn.execute("SELECT * FROM changesets ORDER BY seq").fetchall()
+        version = offres.version
+        print(f"🔁 {offres.count()} offres courantes, version {version}")
+    for seq, date, fichier, insertions, modifications, suppressions in historique:
+        print(f"   {seq:>4}  {date}  +{insertions} ~{modifications} -{suppressions}  {fichier}")
+    if args.replica:
+        with CurrentOffers(args.replica) as copie:
+            depart = copie.version
+            for seq in range(depart + 1, version + 1):
+                copie.apply_file(changeset_path(CHANGESET_DIR, seq))
+            print(f"📥 {args.replica} : version {depart} -> {copie.version}, {copie.count()} offres")
+    return 0
+
+
+def print_offer(offre, note=None):
+    bornes = [f"{offre[borne]:.0f}" if offre[borne] is not None else "?" for borne in ('salaire_min', 'salaire_max')]
+    salaire = f" | {'-'.join(bornes)} €/an" if bornes != ["?", "?"] else ""
+    print(f"\n• {offre['titre']} — {offre['entreprise']} ({offre['ville']})" + (f"  [{note}]" if note else ""))
+    print(f"  {offre['contrat']} | {offre['date_publication']} | {offre['source']} | "
+          f"télétravail : {offre['teletravail']}{salaire}")
+    print(f"  compétences : {offre['competences']}")
+    print(f"  {offre['url']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from scipy import sparse
+
+from normalisation import NON_SPECIFIE
+
+# ==============================================================
+#  Analyses du marché : compétences, co-occurrences, croisements
+# ==============================================================
+
+# Croisements compétence x catégorie : nom -> colonne du schéma commun
+PIVOTS = {
+    'ville': 'Ville ou région',
+    'contrat': 'Type de contrat',
+    'seniorite': 'Niveau de seniorité',
+    'region': 'Région',  # colonne ajoutée par l'étape geo, absente des offres non géocodées
+}
+SEPARATEUR = ', '
+# En deçà, lancer des processus coûte plus que le calcul lui-même
+PARALLEL_MIN_ROWS = 100_000
+
+
+# --------------------------------------------------------------
+#  Matrices creuses
+# --------------------------------------------------------------
+
+def skill_matrix(competences):
+    """
+    Colonne « Compétences mentionnées » -> (matrice offres x compétences
+    binaire au format CSR, vocabulaire). Le découpage et l'encodage sont
+    faits en Arrow, sans boucle Python ; « Non spécifié » est ignoré.
+    """
+    listes = pc.split_pattern(pa.array(pd.Series(competences, dtype=object), type=pa.string(),
+                                       from_pandas=True), SEPARATEUR)
+    lignes = pc.list_parent_indices(listes).to_numpy()
+    mots = pc.utf8_trim_whitespace(pc.list_flatten(listes))
+    gardes = pc.and_(pc.not_equal(mots, NON_SPECIFIE), pc.not_equal(mots, '')).to_numpy(zero_copy_only=False)
+    encodes = pc.dictionary_encode(mots.filter(pa.array(gardes)))
+    vocabulaire = encodes.dictionary.to_pylist()
+    matrice = sparse.csr_matrix(
+        (np.ones(len(encodes), dtype=np.int32), (lignes[gardes], encodes.indices.to_numpy())),
+        shape=(len(competences), len(vocabulaire)))
+    matrice.data[:] = 1  # une compétence citée deux fois dans une offre compte une fois
+    return matrice, vocabulaire
+
+
+def category_matrix(valeurs):
+    """Colonne catégorielle -> (indicatrice offres x modalités en CSR, modalités) ; les manquants sont ignorés"""
+    codes, modalites = pd.factorize(pd.Series(valeurs), use_na_sentinel=True)
+    gardes = codes >= 0
+    matrice = sparse.csr_matrix(
+        (np.ones(gardes.sum(), dtype=np.int32), (np.flatnonzero(gardes), codes[gardes])),
+        shape=(len(codes), len(modalites)))
+    return matrice, [str(m) for m in modalites]
+
+
+def _weeks(dates):
+    """Lundi de la semaine de publication (NaT si la date est absente)"""
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce').dt.normalize()
+    codes, lundis = pd.factorize(dates - pd.to_timedelta(dates.dt.dayofweek, unit='D'))
+    return pd.Categorical.from_codes(codes, categories=lundis.strftime('%Y-%m-%d'))
+
+
+def _partition_counts(df):
+    """
+    Comptages additifs d'une partition : ils se somment d'une partition à
+    l'autre une fois réalignés sur les vocabulaires globaux.
+    """
+    competences, vocabulaire = skill_matrix(df['Compétences mentionnées'])
+    transposee = competences.T.tocsr()
+    comptes = {
+        "offres": len(df),
+        "vocabulaire": vocabulaire,
+        "frequence": np.asarray(competences.sum(axis=0)).ravel(),
+        "cooccurrences": (transposee @ competences).tocsr(),
+        "croisements": {},
+    }
+    colonnes = dict(PIVOTS, semaine=None)
+    for nom, colonne in colonnes.items():
+        if colonne is not None and colonne not in df:
+            continue
+        valeurs = _weeks(df['Date de publication']) if nom == 'semaine' else df[colonne]
+        indicatrice, modalites = category_matrix(valeurs)
+        comptes["croisements"][nom] = (modalites, (transposee @ indicatrice).tocsr(),
+                                       np.asarray(indicatrice.sum(axis=0)).ravel())
+    return comptes
+
+
+def _align(matrice, lignes, colonnes, shape):
+    """Reporter une matrice locale sur les indices globaux (les doublons sont sommés)"""
+    coo = matrice.tocoo()
+    return sparse.csr_matrix((coo.data, (lignes[coo.row], colonnes[coo.col])), shape=shape)
+
+
+def _positions(etiquettes, index):
+    """Positions globales d'étiquettes locales, en complétant l'index au besoin"""
+    return np.array([index.setdefault(e, len(index)) for e in etiquettes], dtype=np.int64)
+
+
+# --------------------------------------------------------------
+#  Résultat
+# --------------------------------------------------------------
+
+@dataclass
+class MarketAnalytics:
+    """
+    Indicateurs du marché calculés sur le jeu normalisé :
+
+    - `frequence` : nombre d'offres citant chaque compétence (décroissant)
+    - `cooccurrences` : matrice creuse compétence x compétence (diagonale = fréquence)
+    - `croisements` : compétence x ville / contrat / séniorité / semaine
+      (DataFrames creux, une ligne par compétence)
+    - `offres_par` : nombre d'offres par modalité de chaque croisement
+    """
+    total_offres: int
+    frequence: pd.Series
+    cooccurrences: sparse.csr_matrix
+    croisements: dict = field(default_factory=dict)
+    offres_par: dict = field(default_factory=dict)
+
+    @property
+    def skills(self):
+        return self.frequence.index
+
+    def pivot(self, nom):
+        """Croisement `nom` (ville, contrat, seniorite, region, semaine) en DataFrame dense"""
+        return self.croisements[nom].sparse.to_dense()
+
+    def top_pairs(self, top=20):
+        """
+        Paires de compétences les plus souvent demandées ensemble, avec le
+        lift (co-occurrence observée / attendue si indépendantes).
+        """
+        triangle = sparse.triu(self.cooccurrences, k=1).tocoo()
+        ordre = np.argsort(-triangle.data, kind='stable')[:top]
+        frequence = self.frequence.to_numpy()
+        return [{"competences": [self.skills[i], self.skills[j]], "offres": int(n),
+                 "lift": round(float(n * self.total_offres / (frequence[i] * frequence[j])), 2)}
+                for i, j, n in zip(triangle.row[ordre], triangle.col[ordre], triangle.data[ordre])]
+
+    def top_by(self, nom, top=10, modalites=None):
+        """Compétences les plus citées pour chaque modalité d'un croisement"""
+        croisement = self.croisements[nom]
+        modalites = modalites if modalites is not None else croisement.columns
+        resultat = {}
+        for modalite in modalites:
+            colonne = croisement[modalite].sparse.to_dense()
+            colonne = colonne[colonne > 0].sort_values(ascending=False, kind='stable').head(top)
+            resultat[str(modalite)] = {k: int(v) for k, v in colonne.items()}
+        return resultat
+
+    def trends(self, top=10):
+        """Part hebdomadaire des offres citant chacune des `top` compétences les plus fréquentes"""
+        semaines = self.pivot('semaine').loc[self.skills[:top]].T.sort_index()
+        return semaines.div(self.offres_par['semaine'].reindex(semaines.index), axis=0)
+
+    def report(self, top=20):
+        """Synthèse sérialisable en JSON (cf. étape analyse du pipeline)"""
+        villes = self.offres_par['ville'].sort_values(ascending=False, kind='stable').head(top).index
+        tendances = self.trends(top=min(top, 10))
+        return {
+            "competences": {k: int(v) for k, v in self.frequence.head(top).items()},
+            "paires_competences": self.top_pairs(top),
+            "competences_par_ville": self.top_by('ville', 10, villes),
+            "competences_par_contrat": self.top_by('contrat', 10),
+            "competences_par_seniorite": self.top_by('seniorite', 10),
+            **({"competences_par_region": self.top_by('region', 10)} if 'region' in self.croisements else {}),
+            "tendances_hebdomadaires": {
+                semaine: {k: round(float(v), 4) for k, v in ligne.items() if v > 0}
+                for semaine, ligne in tendances.iterrows()
+            },
+        }
+
+    def save_cooccurrences(self, path):
+        """Matrice complète (.npz) et son vocabulaire (.txt, une compétence par ligne)"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        sparse.save_npz(path, self.cooccurrences)
+        with open(os.path.splitext(path)[0] + '.txt', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.skills) + '\n')
+
+
+# --------------------------------------------------------------
+#  Calcul, partition par partition
+# --------------------------------------------------------------
+
+def partitions(df, count, freq='M'):
+    """
+    Découpage en `count` partitions au plus, chacune faite de périodes de
+    publication entières (mois par défaut) et consécutives ; les offres sans
+    date rejoignent la dernière.
+    """
+    periode = pd.to_datetime(df['Date de publication'], errors='coerce').dt.to_period(freq)
+    codes, periodes = pd.factorize(periode, sort=True)
+    codes = np.where(codes < 0, len(periodes), codes)
+    groupes = codes * count // (len(periodes) + 1)
+    return [partie for _, partie in df.groupby(groupes, sort=True)]
+
+
+def market_analytics(df, workers=None, freq='M'):
+    """
+    Calculer les indicateurs de `df` (schéma commun, compétences enrichies).
+
+    L'historique est découpé par mois de publication en une partition par
+    processus ; les comptages sont additifs, les matrices partielles sont
+    réalignées sur un vocabulaire global puis sommées.
+    `workers=1`, ou un jeu de moins de PARALLEL_MIN_ROWS offres, est calculé
+    dans le processus courant.
+    """
+    if workers is None:
+        workers = (os.cpu_count() or 1) if len(df) >= PARALLEL_MIN_ROWS else 1
+    parties = partitions(df, workers, freq) if workers > 1 else [df]
+    if len(parties) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultats = list(pool.map(_partition_counts, parties))
+    else:
+        resultats = [_partition_counts(partie) for partie in parties]
+    return merge_counts(resultats)
+
+
+def merge_counts(resultats):
+    """Somme des comptages de plusieurs partitions"""
+    vocabulaire = {}
+    positions = [_positions(r["vocabulaire"], vocabulaire) for r in resultats]
+    n = len(vocabulaire)
+    frequence = np.zeros(n, dtype=np.int64)
+    cooccurrences = sparse.csr_matrix((n, n), dtype=np.int64)
+    for r, pos in zip(resultats, positions):
+        np.add.at(frequence, pos, r["frequence"])
+        cooccurrences = cooccurrences + _align(r["cooccurrences"], pos, pos, (n, n))
+
+    croisements, offres_par = {}, {}
+    for nom in resultats[0]["croisements"]:
+        modalites = {}
+        colonnes = [_positions(r["croisements"][nom][0], modalites) for r in resultats]
+        m = len(modalites)
+        matrice = sparse.csr_matrix((n, m), dtype=np.int64)
+        effectifs = np.zeros(m, dtype=np.int64)
+        for r, pos, cols in zip(resultats, positions, colonnes):
+            _, partielle, partiels = r["croisements"][nom]
+            matrice = matrice + _align(partielle, pos, cols, (n, m))
+            np.add.at(effectifs, cols, partiels)
+        croisements[nom] = (list(modalites), matrice)
+        offres_par[nom] = pd.Series(effectifs, index=list(modalites), name='offres')
+
+    # Compétences triées par fréquence décroissante (puis ordre d'apparition)
+    ordre = np.argsort(-frequence, kind='stable')
+    skills = pd.Index(np.array(list(vocabulaire), dtype=object)[ordre], name='competence')
+    return MarketAnalytics(
+        total_offres=sum(r["offres"] for r in resultats),
+        frequence=pd.Series(frequence[ordre], index=skills, name='offres'),
+        cooccurrences=cooccurrences[ordre][:, ordre].tocsr(),
+        croisements={nom: pd.DataFrame.sparse.from_spmatrix(matrice[ordre], index=skills, columns=modalites)
+                     for nom, (modalites, matrice) in croisements.items()},
+        offres_par=offres_par,
+    )
@@ -0,0 +1,285 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from normalisation import TEXTE
+from storage import JsonlWriter, batched, iter_jsonl
+
+# ==============================================================
+#  Capture des changements entre deux collectes : changesets JSONL
+#  (insertions, modifications champ par champ, suppressions) et table
+#  matérialisée des offres courantes
+# ==============================================================
+
+CURRENT_OFFERS_PATH = 'data/pipeline/offres_courantes.sqlite'
+CHANGESET_DIR = 'data/pipeline/changesets'
+
+# Colonnes du schéma commun suivies -> champs des changesets et de la table
+CHAMPS = {
+    'Intitulé du poste': 'titre',
+    'Nom de l entreprise': 'entreprise',
+    'Ville ou région': 'ville',
+    'Date de publication': 'date_publication',
+    'Type de contrat': 'contrat',
+    'Nombre d années d expérience demandées': 'experience',
+    'Niveau de seniorité': 'seniorite',
+    'Description du poste': 'description',
+    'Source': 'source',
+    'Télétravail': 'teletravail',
+    'Compétences mentionnées': 'competences',
+    'Fourchette salariale': 'fourchette_salariale',
+    'Salaire annuel min': 'salaire_min',
+    'Salaire annuel max': 'salaire_max',
+    'URL': 'url',
+    'Département': 'departement',
+    'Région': 'region',
+    'Latitude': 'latitude',
+    'Longitude': 'longitude',
+}
+
+NUMERIQUES = ('experience', 'salaire_min', 'salaire_max', 'latitude', 'longitude')
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS offres_courantes (
+    cle TEXT PRIMARY KEY,
+    identifiant TEXT NOT NULL,
+    {', '.join(f"{champ} {'REAL' if champ in NUMERIQUES else 'TEXT'}" for champ in CHAMPS.values())},
+    empreinte TEXT NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changesets (
+    seq INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    fichier TEXT NOT NULL,
+    insertions INTEGER NOT NULL,
+    modifications INTEGER NOT NULL,
+    suppressions INTEGER NOT NULL
+);
+"""
+
+
+# --------------------------------------------------------------
+#  Clés, empreintes et valeurs
+# --------------------------------------------------------------
+
+def offer_keys(identifiants):
+    """Clé hachée (64 bits, hexadécimal) de chaque identifiant d'offre"""
+    valeurs = pd.Series(identifiants, dtype=object).to_numpy()
+    return [f"{h:016x}" for h in pd.util.hash_array(valeurs, categorize=False)]
+
+
+def _canonical(df):
+    """
+    Colonnes suivies sous une forme stable d'une collecte à l'autre : texte
+    Arrow (catégories comprises), dates AAAA-MM-JJ, flottants float64
+    arrondis (48.8566 et non 48.856601715087891). Une colonne absente est nulle.
+    """
+    colonnes = {}
+    for colonne, champ in CHAMPS.items():
+        if colonne not in df:
+            colonnes[champ] = pd.Series(None, index=df.index, dtype=TEXTE)
+            continue
+        serie = df[colonne]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            serie = serie.dt.strftime('%Y-%m-%d').astype(TEXTE)
+        elif pd.api.types.is_float_dtype(serie):
+            serie = serie.astype('float64').round(6)
+        else:
+            serie = serie.astype(TEXTE)
+        colonnes[champ] = serie
+    return pd.DataFrame(colonnes, index=df.index)
+
+
+def _values(canonique):
+    """Colonnes canoniques -> {champ: valeurs JSON / SQLite} (None pour les manquants)"""
+    return {champ: [None if pd.isna(v) else v for v in serie.astype(object).tolist()]
+            for champ, serie in canonique.items()}
+
+
+def fingerprints(canonique):
+    """Empreinte hexadécimale du contenu suivi de chaque offre"""
+    return pd.util.hash_pandas_object(canonique, index=False).map('{:016x}'.format).tolist()
+
+
+# --------------------------------------------------------------
+#  Table matérialisée
+# --------------------------------------------------------------
+
+class CurrentOffers:
+    """
+    Table SQLite des offres courantes, tenue à jour en appliquant les
+    changesets dans l'ordre. Le moteur de capture l'utilise pour son propre
+    état ; un consommateur peut en tenir une copie avec `apply_file`, sans
+    jamais recharger une collecte complète.
+    """
+
+    def __init__(self, path=CURRENT_OFFERS_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def version(self):
+        """Numéro du dernier changeset appliqué (0 : table vide)"""
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changesets").fetchone()[0]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM offres_courantes").fetchone()[0]
+
+    def fingerprints(self):
+        """{clé: empreinte} de toutes les offres courantes"""
+        return dict(self.conn.execute("SELECT cle, empreinte FROM offres_courantes"))
+
+    def rows(self, cles):
+        """Offres courantes de clés `cles`, en dictionnaires {champ: valeur}"""
+        cles, resultat = list(cles), {}
+        for i in range(0, len(cles), 500):
+            lot = cles[i:i + 500]
+            curseur = self.conn.execute(
+                f"SELECT * FROM offres_courantes WHERE cle IN ({','.join('?' * len(lot))})", lot)
+            noms = [d[0] for d in curseur.description]
+            resultat.update((ligne[0], dict(zip(noms, ligne))) for ligne in curseur)
+        return resultat
+
+    def load(self):
+        """Table des offres courantes en DataFrame"""
+        return pd.read_sql("SELECT * FROM offres_courantes", self.conn)
+
+    def apply(self, entete, changements):
+        """
+        Appliquer un changeset (en-tête et lignes insert / update / delete) en
+        une transaction. Un changeset qui ne part pas de la version courante
+        est refusé : les consommateurs doivent les appliquer dans l'ordre.
+        """
+        if entete["base"] != self.version:
+            raise ValueError(f"changeset {entete['seq']} prévu pour la version {entete['base']}, "
+                             f"table en version {self.version}")
+        seq, champs = entete["seq"], list(CHAMPS.values())
+        insertions, suppressions, modifications = [], [], {}
+        for c in changements:
+            if c["op"] == "insert":
+                insertions.append((c["cle"], c["identifiant"], *(c["valeurs"].get(ch) for ch in champs),
+                                   c["empreinte"], seq))
+            elif c["op"] == "update":
+                # Regrouper par ensemble de champs modifiés : une requête préparée par groupe
+                modifies = tuple(sorted(c["delta"]))
+                modifications.setdefault(modifies, []).append(
+                    (*(c["delta"][ch][1] for ch in modifies), c["empreinte"], seq, c["cle"]))
+            else:
+                suppressions.append((c["cle"],))
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO offres_courantes (cle, identifiant, {', '.join(champs)}, empreinte, version) "
+                f"VALUES ({', '.join('?' * (len(champs) + 4))})", insertions)
+            for modifies, lignes in modifications.items():
+                affectations = ", ".join(f"{ch} = ?" for ch in modifies + ("empreinte", "version"))
+                self.conn.executemany(f"UPDATE offres_courantes SET {affectations} WHERE cle = ?", lignes)
+            self.conn.executemany("DELETE FROM offres_courantes WHERE cle = ?", suppressions)
+            self.conn.execute("INSERT INTO changesets VALUES (?, ?, ?, ?, ?, ?)",
+                              (seq, entete["date"], entete.get("fichier", ""), len(insertions),
+                               sum(len(l) for l in modifications.values()), len(suppressions)))
+
+    def apply_file(self, path):
+        """Appliquer un fichier changeset JSONL (première ligne : en-tête)"""
+        lignes = iter_jsonl(path)
+        entete = next(lignes)
+        self.apply(dict(entete, fichier=os.path.basename(path)), lignes)
+        return entete
+
+
+# --------------------------------------------------------------
+#  Capture
+# --------------------------------------------------------------
+
+def changeset_path(directory, seq):
+    return os.path.join(directory, f"changeset-{seq:06d}.jsonl")
+
+
+def diff(df, offres, sources=None):
+    """
+    Changements de `df` (nouvelle collecte au schéma commun) par rapport à
+    la table `offres` : insertions complètes, modifications limitées aux
+    champs changés ({champ: [avant, après]}), suppressions.
+
+    `sources` limite les suppressions aux sources collectées en entier ; les
+    offres absentes des autres sont conservées. None : toutes les sources.
+
+    Seules les offres dont l'empreinte diffère sont relues et comparées
+    champ par champ.
+    """
+    df = df.drop_duplicates('Identifiant', keep='last')
+    cles = offer_keys(df['Identifiant'])
+    identifiants = df['Identifiant'].astype(object).tolist()
+    canonique = _canonical(df)
+    empreintes = fingerprints(canonique)
+    connues = offres.fingerprints()
+
+    nouvelles, modifiees = [], []
+    for i, (cle, empreinte) in enumerate(zip(cles, empreintes)):
+        if cle not in connues:
+            nouvelles.append(i)
+        elif connues[cle] != empreinte:
+            modifiees.append(i)
+
+    # Seules les offres nouvelles ou modifiées sont converties en valeurs Python
+    changements = []
+    valeurs = _values(canonique.iloc[nouvelles])
+    for j, i in enumerate(nouvelles):
+        changements.append({"op": "insert", "cle": cles[i], "identifiant": identifiants[i], "empreinte": empreintes[i],
+                            "valeurs": {champ: v[j] for champ, v in valeurs.items() if v[j] is not None}})
+    valeurs = _values(canonique.iloc[modifiees])
+    anciennes = offres.rows(cles[i] for i in modifiees)
+    for j, i in enumerate(modifiees):
+        avant = anciennes[cles[i]]
+        delta = {champ: [avant[champ], v[j]] for champ, v in valeurs.items() if avant[champ] != v[j]}
+        changements.append({"op": "update", "cle": cles[i], "identifiant": identifiants[i],
+                            "empreinte": empreintes[i], "delta": delta})
+    presentes = set(cles)
+    requete, params = "SELECT cle, identifiant FROM offres_courantes", []
+    if sources is not None:
+        params = sorted(sources)
+        requete += f" WHERE source IN ({', '.join('?' * len(params))})"
+    changements += [{"op": "delete", "cle": cle, "identifiant": identifiant}
+                    for cle, identifiant in offres.conn.execute(requete, params)
+                    if cle not in presentes]
+    return changements
+
+
+def capture(df, offres, directory=CHANGESET_DIR, date=None, sources=None):
+    """
+    Comparer `df` à l'état courant, écrire le changeset JSONL suivant puis
+    l'appliquer à la table. Retourne l'en-tête du changeset, ou None si
+    rien n'a changé (aucun fichier n'est alors écrit). `sources` : cf. diff.
+    """
+    changements = diff(df, offres, sources)
+    if not changements:
+        return None
+    ops = pd.Series([c["op"] for c in changements]).value_counts()
+    seq = offres.version + 1
+    entete = {"op": "changeset", "seq": seq, "base": offres.version,
+              "date": (date or datetime.now()).isoformat(timespec='seconds'),
+              "insertions": int(ops.get("insert", 0)), "modifications": int(ops.get("update", 0)),
+              "suppressions": int(ops.get("delete", 0))}
+    chemin = changeset_path(directory, seq)
+    # Fichier complet d'abord, puis état : un arrêt entre les deux rejoue le même numéro
+    with JsonlWriter(chemin + ".tmp") as writer:
+        writer.write_batch([entete])
+        for lot in batched(changements, 10_000):
+            writer.write_batch(lot)
+    os.replace(chemin + ".tmp", chemin)
+    offres.apply(dict(entete, fichier=os.path.basename(chemin)), changements)
+    return entete
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+
+# ==============================================================
+#  Points de reprise des collectes longues
+# ==============================================================
+
+
+def atomic_write_json(path, data):
+    """Écrire un JSON de façon atomique : fichier temporaire, fsync puis rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Checkpoint:
+    """
+    État durable d'une collecte en cours.
+
+    Pour chaque mot-clé : fenêtres déjà collectées (filtres + début de plage),
+    nombre d'offres retenues, indicateur de fin et requêtes en échec ou
+    tronquées. `offset`/`rows` donnent la taille du JSONL brut au dernier
+    point de reprise : tout ce qui suit est tronqué à la reprise.
+    """
+
+    def __init__(self, path, state):
+        self.path = path
+        self.state = state
+
+    @classmethod
+    def create(cls, path, **params):
+        state = {"offset": 0, "rows": 0, "metiers": {}}
+        state.update(params)
+        checkpoint = cls(path, state)
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, path):
+        """Charger un point de reprise existant (None s'il n'y en a pas)"""
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return cls(path, json.load(f))
+
+    def __getitem__(self, key):
+        return self.state[key]
+
+    @property
+    def progress(self):
+        """{mot-clé: {"plages": [...], "offres": n, "termine": bool, "incidents": [...]}}"""
+        return self.state["metiers"]
+
+    def page_done(self, keyword, range_key, count, offset, rows):
+        """Enregistrer une plage dont les offres sont déjà écrites sur disque"""
+        etat = self.progress.setdefault(keyword, {"plages": [], "offres": 0, "termine": False})
+        etat["plages"].append(range_key)
+        etat["offres"] += count
+        self.state["offset"] = offset
+        self.state["rows"] = rows
+        self.save()
+
+    def keyword_done(self, keyword, incidents=()):
+        etat = self.progress.setdefault(keyword, {"plages": [], "offres": 0, "termine": False})
+        etat["termine"] = True
+        etat["incidents"] = list(incidents)
+        self.save()
+
+    def save(self):
+        atomic_write_json(self.path, self.state)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,10 +1,20 @@
 import os
-import requests
+import argparse
 import json
-import pandas as pd
-from datetime import datetime
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 
+from checkpoint import Checkpoint
+from dedup import dedup_offers
+from http_client import RateLimiter, get_client
+from metrics import METRICS, append_history
+from offer_index import OfferIndex
+from storage import EXTENSIONS, JsonlWriter, batched, iter_jsonl, jsonl_to_parquet
+from token_manager import TokenManager
+
 # ============================================================== 
 #  Chargement des identifiants depuis le fichier .env 
 # ============================================================== 
@@ -13,139 +23,549 @@ load_dotenv()
 CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 SCOPE = os.getenv("SCOPE", "api_offresdemploiv2 o2dsoffre")
+TOKEN_CACHE_PATH = os.getenv("TOKEN_CACHE_PATH")  # cache disque optionnel du token
+
+# Surchargeables pour travailler hors ligne (cf. stub_server.py)
+TOKEN_URL = os.getenv("FRANCE_TRAVAIL_TOKEN_URL",
+                      "https://entreprise.francetravail.fr/connexion/oauth2/access_token")
+API_BASE_URL = os.getenv("FRANCE_TRAVAIL_API_URL",
+                         "https://api.francetravail.io/partenaire/offresdemploi/v2")
+
+# Quota de l'API offres d'emploi (requêtes par seconde)
+API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", "10"))
+
+# Pagination : fenêtre maximale de 150 offres, et une même requête ne donne
+# accès qu'aux 3150 premières (range p-d avec p <= 3000 et d <= 3149)
+PAGE_SIZE = 150
+MAX_RESULTS_PER_QUERY = 3150
+# Au-delà du plafond, découpage par département puis par période de création
+DEPARTEMENTS = ([f"{code:02d}" for code in range(1, 96) if code != 20]
+                + ["2A", "2B", "971", "972", "973", "974", "976"])
+SPLIT_HORIZON_DAYS = 365
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
-TOKEN_URL = "https://entreprise.francetravail.fr/connexion/oauth2/access_token"
-API_BASE_URL = "https://api.francetravail.io/partenaire/offresdemploi/v2"
+# Valeurs acceptées par le filtre `publieeDepuis` de l'API (en jours)
+PUBLIEE_DEPUIS = (1, 3, 7, 14, 31)
+INDEX_PATH = 'data/raw/offres_index.sqlite'
+CHECKPOINT_PATH = 'data/raw/collecte.checkpoint.json'
+METADATA_PATH = 'data/raw/metadata_collecte.json'
+HISTORY_PATH = 'data/raw/historique_collectes.jsonl'
+
+# Métiers IT recherchés (un mot-clé par requête)
+METIERS_IT = [
+    "développeur", "développeur fullstack", "développeur backend", "développeur frontend",
+    "développeur mobile", "développeur web", "ingénieur logiciel", "ingénieur informatique",
+    "data scientist", "data analyst", "analyste données", "ingénieur data", "data engineer",
+    "machine learning", "deep learning", "intelligence artificielle", "analyste big data",
+    "architecte data", "scientifique des données",
+    "administrateur système", "administrateur réseau", "devops", "ingénieur devops",
+    "cloud engineer", "ingénieur cloud", "spécialiste cloud", "architecte cloud",
+    "administrateur cloud",
+    "cybersécurité", "analyste sécurité", "ingénieur sécurité", "responsable sécurité informatique",
+    "ethical hacker", "pentester",
+    "webmaster", "designer UX/UI", "intégrateur web", "développeur javascript",
+    "développeur python", "développeur java", "développeur c#", "développeur php",
+    "administrateur base de données", "DBA", "ingénieur systèmes", "technicien informatique",
+    "support technique", "helpdesk",
+    "chef de projet informatique", "consultant informatique", "product owner", "scrum master",
+    "analyste fonctionnel", "testeur QA", "ingénieur qualité logiciel"
+]
 
 # ============================================================== 
 #  Fonctions utilitaires 
 # ============================================================== 
 
+_token_manager = None
+
+def get_token_manager(cache_path=TOKEN_CACHE_PATH):
+    """Gestionnaire de token partagé (cache + rafraîchissement automatique)"""
+    global _token_manager
+    if _token_manager is not None and _token_manager.cache_path != cache_path:
+        # Autre fichier de cache demandé : le gestionnaire partagé est remplacé
+        _token_manager.close()
+        _token_manager = None
+    if _token_manager is None:
+        _token_manager = TokenManager(CLIENT_ID, CLIENT_SECRET, SCOPE, TOKEN_URL, cache_path=cache_path)
+    return _token_manager
+
 def get_token():
     """Obtenir le token d'accès OAuth2"""
-    params = {"realm": "/partenaire"}
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "scope": SCOPE
+    return get_token_manager().get_token()
+
+def parse_content_range(value):
+    """Nombre total de résultats d'un en-tête Content-Range (« offres 0-149/2543 »)"""
+    match = re.search(r"/\s*(\d+)\s*$", value or "")
+    return int(match.group(1)) if match else None
+
+def fetch_page(token, keyword, range_start, limiter=None, filters=None, range_end=None):
+    """
+    Récupérer une fenêtre de résultats : retourne (code HTTP, offres, total).
+
+    `total` est lu dans l'en-tête Content-Range (None s'il est absent).
+    `token` est soit un token brut, soit un TokenManager : dans ce cas un 401
+    déclenche un rafraîchissement (unique entre threads) puis un nouvel essai.
+    Sans token valide (authentification en échec), aucune requête n'est
+    envoyée et la fenêtre est rapportée en 401.
+    """
+    url = f"{API_BASE_URL}/offres/search"
+    if range_end is None:
+        range_end = range_start + PAGE_SIZE - 1
+    manager = token if isinstance(token, TokenManager) else None
+    access_token = manager.get_token() if manager else token
+    if access_token is None:
+        print(f"  ❌ Requête '{keyword}' {range_start}-{range_end} non envoyée : aucun token valide")
+        return 401, [], 0
+    params = {
+        "motsCles": keyword,
+        "range": f"{range_start}-{range_end}",
+        "rome": "M18"  # Domaine informatique
     }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    
-    print("🔐 Authentification en cours...")
-    response = requests.post(TOKEN_URL, params=params, data=data, headers=headers)
-    
-    if response.status_code == 200:
-        print("✅ Authentification réussie !")
-        return response.json()["access_token"]
+    if filters:
+        params.update(filters)
+    response = get_client().get(url, headers={"Authorization": f"Bearer {access_token}"},
+                                params=params, limiter=limiter, label=keyword)
+    if response.status_code == 401 and manager:
+        access_token = manager.refresh(stale_token=access_token)
+        if access_token is None:
+            print(f"  ❌ Requête '{keyword}' {range_start}-{range_end} : rafraîchissement du token en échec")
+            return 401, [], 0
+        response = get_client().get(url, headers={"Authorization": f"Bearer {access_token}"},
+                                    params=params, limiter=limiter, label=keyword)
+    suffix = f" [{query_label(filters)}]" if filters else ""
+    print(f"  ➜ Requête '{keyword}' {range_start}-{range_end}{suffix}: {response.status_code}")
+
+    if response.status_code in [200, 206]:
+        start = time.perf_counter()
+        offers = response.json().get("resultats", [])
+        METRICS.record_parse(keyword, time.perf_counter() - start, len(offers))
+        total = parse_content_range(response.headers.get("Content-Range"))
+        if total is None and response.status_code == 200:
+            total = range_start + len(offers)  # 200 : tout tient dans la fenêtre
+        return response.status_code, offers, total
+    return response.status_code, [], 0
+
+def query_label(filters):
+    """Représentation stable des filtres d'une sous-requête"""
+    return "&".join(f"{cle}={valeur}" for cle, valeur in sorted((filters or {}).items()))
+
+def window_key(filters, range_start):
+    """Clé d'une fenêtre dans le point de reprise : filtres + début de plage"""
+    return f"{query_label(filters)}#{range_start}"
+
+def _format_date(date):
+    return date.strftime(DATE_FORMAT)
+
+def split_query(filters, now=None):
+    """
+    Découper une requête dépassant le plafond de l'API en sous-requêtes disjointes.
+
+    D'abord par département, puis par moitiés de la période de création
+    (`minCreationDate`/`maxCreationDate`, qui remplacent `publieeDepuis`).
+    Retourne [] quand la période ne fait plus qu'un jour. Les offres sans
+    département (ou d'un département absent de DEPARTEMENTS) et, sans
+    `publieeDepuis`, celles antérieures à SPLIT_HORIZON_DAYS échappent au
+    découpage : search_offers les compte comme un incident.
+    """
+    filters = dict(filters or {})
+    if "departement" not in filters:
+        return [dict(filters, departement=code) for code in DEPARTEMENTS]
+    if "minCreationDate" in filters:
+        debut = datetime.strptime(filters["minCreationDate"], DATE_FORMAT)
+        fin = datetime.strptime(filters["maxCreationDate"], DATE_FORMAT)
     else:
-        print(f"❌ Erreur d'authentification ({response.status_code}): {response.text}")
-        return None
+        fin = (now or datetime.now(timezone.utc)).replace(tzinfo=None, microsecond=0)
+        debut = fin - timedelta(days=filters.pop("publieeDepuis", SPLIT_HORIZON_DAYS))
+    if fin - debut <= timedelta(days=1):
+        return []
+    milieu = debut + (fin - debut) / 2
+    return [dict(filters, minCreationDate=_format_date(debut), maxCreationDate=_format_date(milieu)),
+            dict(filters, minCreationDate=_format_date(milieu), maxCreationDate=_format_date(fin))]
 
-def search_offers(token, keyword, max_results=50):
-    """Rechercher des offres par mot-clé"""
-    url = f"{API_BASE_URL}/offres/search"
-    headers = {"Authorization": f"Bearer {token}"}
-    all_offers = []
-    range_start = 0
-    
+def search_offers(token, keyword, max_results=None, limiter=None, filters=None, on_page=None,
+                  executor=None, done=(), already=0, now=None, incidents=None):
+    """
+    Rechercher toutes les offres d'un mot-clé (ou les `max_results` premières).
+
+    La première fenêtre de 150 offres donne le total (Content-Range) ; les
+    fenêtres restantes sont ensuite demandées d'un coup, en parallèle si un
+    `executor` est fourni. Une requête dont le total dépasse le plafond de
+    l'API est découpée (cf. split_query).
+
+    Retourne les pages [(clé de fenêtre, offres)] dans un ordre déterministe ;
+    `on_page(keyword, clé, offres)` est appelé pour chacune, dans cet ordre.
+    `done` (clés déjà collectées) et `already` (offres correspondantes)
+    permettent de reprendre une collecte interrompue ; `now` fixe la date de
+    référence des découpages par période pour qu'ils soient identiques à la reprise.
+
+    Les requêtes en échec ou tronquées (plafond de l'API, offres qu'aucune
+    sous-requête d'un découpage ne couvre) sont décrites dans la liste
+    `incidents` si elle est fournie : la collecte est alors incomplète.
+    """
     print(f"🔍 Recherche des offres pour le mot-clé: '{keyword}'")
+    limit = max_results if max_results is not None else float("inf")
+    collected = already
+    pages = []
+
+    def fetch(start, end, query):
+        if executor is None:
+            return fetch_page(token, keyword, start, limiter, query, end)
+        return executor.submit(fetch_page, token, keyword, start, limiter, query, end)
+
+    def emit(key, offers):
+        nonlocal collected
+        if key in done:
+            return
+        if limit - collected < len(offers):
+            offers = offers[:int(limit - collected)]
+        for offer in offers:
+            offer["metier_recherche"] = keyword
+        collected += len(offers)
+        pages.append((key, offers))
+        if on_page:
+            on_page(keyword, key, offers)
 
-    while range_start < max_results:
-        params = {
-            "motsCles": keyword,
-            "range": f"{range_start}-{range_start + 9}",
-            "rome": "M18"  # Domaine informatique
-        }
-        response = requests.get(url, headers=headers, params=params)
-        print(f"  ➜ Requête {range_start}-{range_start+9}: {response.status_code}")
-        
-        if response.status_code in [200, 206]:
-            data = response.json()
-            offers = data.get("resultats", [])
-            if not offers:
+    def incident(message):
+        print(f"❌ {message}")
+        if incidents is not None:
+            incidents.append(message)
+
+    # Découpages en cours : total de la requête découpée, somme des totaux de
+    # ses sous-requêtes (None si l'une a échoué) et sous-requêtes sans réponse.
+    # L'écart (offres sans département, hors des départements connus ou plus
+    # anciennes que l'horizon de découpage) n'est accessible par aucune sous-requête.
+    decoupages = []
+
+    def settle(parent, total):
+        if parent is None:
+            return
+        decoupage = decoupages[parent]
+        decoupage["restantes"] -= 1
+        decoupage["somme"] = None if total is None or decoupage["somme"] is None else decoupage["somme"] + total
+        manquantes = decoupage["total"] - (decoupage["somme"] or 0)
+        if decoupage["restantes"] == 0 and decoupage["somme"] is not None and manquantes > 0:
+            incident(f"{manquantes} offres de '{keyword}' [{decoupage['requete']}] "
+                     f"hors de toutes les sous-requêtes du découpage")
+
+    queries = [(dict(filters or {}), None)]
+    while queries and collected < limit:
+        query, parent = queries.pop(0)
+        first = fetch(0, min(PAGE_SIZE, limit) - 1, query)
+        status_code, offers, total = first if executor is None else first.result()
+        if status_code not in [200, 206]:
+            if status_code != 204:  # 204 : aucune offre
+                incident(f"Erreur API: {status_code} pour '{keyword}' [{query_label(query)}] 0")
+            settle(parent, 0 if status_code == 204 else None)
+            continue
+        total = len(offers) if total is None else total
+        settle(parent, total)
+        # Les fenêtres déjà collectées de cette requête sont comptées dans `collected`
+        deja = sum(PAGE_SIZE for start in range(0, total, PAGE_SIZE) if window_key(query, start) in done)
+        wanted = min(total, limit - collected + deja)
+        if wanted > MAX_RESULTS_PER_QUERY:
+            sub_queries = split_query(query, now)
+            if sub_queries:
+                print(f"   ✂ {total} offres pour '{keyword}' [{query_label(query)}] : "
+                      f"découpage en {len(sub_queries)} sous-requêtes")
+                decoupages.append({"requete": query_label(query), "total": total, "somme": 0,
+                                   "restantes": len(sub_queries)})
+                queries[:0] = [(sub_query, len(decoupages) - 1) for sub_query in sub_queries]
+                continue
+            incident(f"Plafond de l'API atteint pour '{keyword}' [{query_label(query)}] : "
+                     f"{total - MAX_RESULTS_PER_QUERY} offres non accessibles")
+            wanted = MAX_RESULTS_PER_QUERY
+
+        # Fenêtres suivantes, toutes demandées d'avance (sauf celles déjà collectées)
+        windows = [(start, fetch(start, min(start + PAGE_SIZE, wanted) - 1, query) if executor else None)
+                   for start in range(PAGE_SIZE, int(wanted), PAGE_SIZE)
+                   if window_key(query, start) not in done]
+        emit(window_key(query, 0), offers)
+        for start, future in windows:
+            if collected >= limit:
                 break
-            for offer in offers:
-                offer["metier_recherche"] = keyword
-            all_offers.extend(offers)
-            if len(all_offers) >= max_results:
+            if future is None:
+                status_code, offers, _ = fetch(start, min(start + PAGE_SIZE, wanted) - 1, query)
+            else:
+                status_code, offers, _ = future.result()
+            if status_code not in [200, 206]:
+                if status_code != 204:
+                    incident(f"Erreur API: {status_code} pour '{keyword}' [{query_label(query)}] {start}")
                 break
-            range_start += 10
+            emit(window_key(query, start), offers)
+        for _, future in windows:
+            if future is not None:
+                future.cancel()
+    return pages
+
+def iter_collect(token, metiers, max_results=None, workers=1, rate=API_RATE_LIMIT, filters=None,
+                 on_page=None, resume=None, now=None, incidents=None):
+    """
+    Collecter les offres de plusieurs métiers : générateur de (métier, offres).
+
+    Avec workers > 1, les mots-clés avancent en parallèle et toutes leurs
+    requêtes passent par un pool de `workers` threads, borné par un débit
+    global de `rate` requêtes/s. Les métiers (et leurs pages, transmises à
+    `on_page` depuis le thread appelant) sont restitués dans l'ordre, avec le
+    même contenu qu'en mode séquentiel.
+
+    `resume` ({mot-clé: progression}, cf. Checkpoint) permet de sauter les
+    mots-clés terminés et les fenêtres déjà collectées des autres.
+    `incidents` ({mot-clé: [...]}) reçoit les requêtes en échec ou tronquées
+    de chaque mot-clé, renseignées avant que le mot-clé ne soit restitué.
+    """
+    limiter = RateLimiter(rate)
+    resume = resume or {}
+    todo = []
+    for metier in metiers:
+        if resume.get(metier, {}).get("termine"):
+            print(f"⏭ '{metier}' déjà collecté")
         else:
-            print(f"❌ Erreur API: {response.status_code}")
-            break
-    return all_offers[:max_results]
+            todo.append(metier)
+
+    def run(metier, on_page=None, executor=None):
+        progress = resume.get(metier) or {}
+        problemes = []
+        with METRICS.timed(metier):
+            pages = search_offers(token, metier, max_results, limiter, filters, on_page, executor,
+                                  done=set(progress.get("plages", [])), already=progress.get("offres", 0),
+                                  now=now, incidents=problemes)
+        if incidents is not None:
+            incidents[metier] = problemes
+        return pages
+
+    if workers <= 1:
+        for metier in todo:
+            pages = run(metier, on_page)
+            yield metier, [offer for _, offers in pages for offer in offers]
+        return
+
+    # Deux pools distincts : les mots-clés attendent leurs fenêtres sans bloquer le pool HTTP
+    with ThreadPoolExecutor(max_workers=workers) as http_pool, \
+            ThreadPoolExecutor(max_workers=workers) as keyword_pool:
+        futures = [(metier, keyword_pool.submit(run, metier, None, http_pool)) for metier in todo]
+        for metier, future in futures:
+            pages = future.result()
+            if on_page:
+                for key, offers in pages:
+                    on_page(metier, key, offers)
+            yield metier, [offer for _, offers in pages for offer in offers]
+
+def collect_offers(token, metiers, max_results=None, workers=1, rate=API_RATE_LIMIT, filters=None):
+    """Collecter les offres de plusieurs métiers : {métier: offres}"""
+    return dict(iter_collect(token, metiers, max_results, workers, rate, filters))
+
+def publiee_depuis(last_run, now=None):
+    """Plus petite fenêtre `publieeDepuis` couvrant la période depuis la dernière collecte"""
+    if last_run is None:
+        return None
+    jours = ((now or datetime.now()) - last_run).total_seconds() / 86400
+    for fenetre in PUBLIEE_DEPUIS:
+        if jours <= fenetre:
+            return fenetre
+    return None
+
+def record_deletions(index, collecte, filters=None, max_results=None, incidents=None):
+    """
+    Marquer comme supprimées les offres absentes de la collecte `collecte`.
+
+    Une disparition n'est une suppression que si la collecte a tout vu :
+    pas de filtre `publieeDepuis`, pas de plafond `max_results`, aucune
+    requête en échec ou tronquée (`incidents` : {mot-clé: [...]}). Sinon
+    rien n'est marqué et None est retourné.
+    """
+    incomplets = sorted(metier for metier, problemes in (incidents or {}).items() if problemes)
+    if filters is not None or max_results is not None or incomplets:
+        return None
+    return index.mark_deleted(collecte)
+
+def last_run_complete(path=METADATA_PATH):
+    """
+    La dernière collecte a-t-elle tout vu (cf. `collecte_complete` des
+    métadonnées) ? Sinon une offre absente de ses fichiers n'est pas pour
+    autant supprimée. Faux en l'absence de métadonnées lisibles.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            return bool(json.load(f).get("collecte_complete"))
+    except (OSError, ValueError):
+        return False
 
 # ============================================================== 
 #  Programme principal 
 # ============================================================== 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Collecte des offres IT via l'API France Travail")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nombre de requêtes simultanées (1 = mode séquentiel)")
+    parser.add_argument("--rps", type=float, default=API_RATE_LIMIT,
+                        help="Débit global maximal en requêtes par seconde (quota API)")
+    parser.add_argument("--token-cache", default=TOKEN_CACHE_PATH,
+                        help="Fichier de cache du token OAuth2 (désactivé par défaut)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Ne demander que les offres publiées depuis la dernière collecte")
+    parser.add_argument("--index", default=INDEX_PATH,
+                        help="Index SQLite des offres déjà collectées")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default=None,
+                        help="Compression des fichiers JSONL")
+    parser.add_argument("--max-results", type=int, default=None,
+                        help="Nombre maximal d'offres par mot-clé (par défaut : toutes)")
+    parser.add_argument("--prometheus", default=None, metavar="FICHIER",
+                        help="Exporter aussi les métriques au format texte Prometheus")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprendre la collecte interrompue depuis le dernier point de reprise")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     print("DÉMARRAGE DE LA COLLECTE DES OFFRES (brutes)")
 
     # 1️⃣ Authentification
-    token = get_token()
-    if not token:
+    token = get_token_manager(args.token_cache)
+    if not token.get_token():
         return
+    METRICS.lap("authentification")
 
     # 2️⃣ Liste des métiers IT à rechercher
-    metiers_it = [
-        "développeur", "développeur fullstack", "développeur backend", "développeur frontend",
-        "développeur mobile", "développeur web", "ingénieur logiciel", "ingénieur informatique",
-        "data scientist", "data analyst", "analyste données", "ingénieur data", "data engineer",
-        "machine learning", "deep learning", "intelligence artificielle", "analyste big data",
-        "architecte data", "scientifique des données",
-        "administrateur système", "administrateur réseau", "devops", "ingénieur devops",
-        "cloud engineer", "ingénieur cloud", "spécialiste cloud", "architecte cloud",
-        "administrateur cloud",
-        "cybersécurité", "analyste sécurité", "ingénieur sécurité", "responsable sécurité informatique",
-        "ethical hacker", "pentester",
-        "webmaster", "designer UX/UI", "intégrateur web", "développeur javascript",
-        "développeur python", "développeur java", "développeur c#", "développeur php",
-        "administrateur base de données", "DBA", "ingénieur systèmes", "technicien informatique",
-        "support technique", "helpdesk",
-        "chef de projet informatique", "consultant informatique", "product owner", "scrum master",
-        "analyste fonctionnel", "testeur QA", "ingénieur qualité logiciel"
-    ]
-
-    # 3️⃣ Collecte brute
-    all_offers = []
-    for metier in metiers_it:
-        offers = search_offers(token, metier, max_results=50)
-        if offers:
-            all_offers.extend(offers)
-            print(f"✅ {len(offers)} offres collectées pour '{metier}'")
-        else:
-            print(f"⚠ Aucune offre trouvée pour '{metier}'")
-
-    # 4️⃣ Sauvegarde brute
-    if all_offers:
-        os.makedirs('data/raw', exist_ok=True)  # Créer le dossier si nécessaire
-
-        json_path = 'data/raw/offres_it_brutes.json'
-        csv_path = 'data/raw/offres_it_brutes.csv'
-
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(all_offers, f, ensure_ascii=False, indent=2)
-
-        df = pd.DataFrame(all_offers)
-        df.to_csv(csv_path, index=False, encoding='utf-8')
-
-        # Métadonnées de collecte
-        metadata = {
-            "date_collecte": datetime.now().isoformat(),
-            "total_offres": len(df),
-            "metiers_recherches": metiers_it
-        }
-        with open('data/raw/metadata_collecte.json', 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
-
-        print("\n💾 Données brutes sauvegardées:")
-        print(f"   - {json_path}")
-        print(f"   - {csv_path}")
-        print("   - data/raw/metadata_collecte.json")
+    metiers_it = METIERS_IT
+
+    # 3️⃣ Collecte brute (complète, ou incrémentale grâce à l'index des offres)
+    index = OfferIndex(args.index)
+    checkpoint = Checkpoint.load(CHECKPOINT_PATH) if args.resume else None
+    if args.resume and checkpoint is None:
+        print("⚠ Aucun point de reprise trouvé, nouvelle collecte")
+
+    if checkpoint:
+        collecte = checkpoint["collecte"]
+        filters = checkpoint["filters"]
+        max_results = checkpoint.state.get("max_results")
+        compression = checkpoint["compression"]
+        incremental = checkpoint["incremental"]
+        reference = checkpoint.state.get("reference")
+        print(f"⏯ Reprise de la collecte du {collecte} ({checkpoint['rows']} offres déjà sur disque)")
     else:
+        filters = None
+        max_results = args.max_results
+        compression = args.compression
+        incremental = args.incremental
+        if incremental:
+            depuis = publiee_depuis(index.last_run())
+            if depuis:
+                filters = {"publieeDepuis": depuis}
+                print(f"♻ Mode incrémental : offres publiées depuis {depuis} jour(s)")
+            else:
+                print("♻ Mode incrémental : aucune collecte récente, collecte complète")
+        collecte = index.start_run("incrementale" if filters else "complete")
+        # Date de référence des découpages par période, conservée pour la reprise
+        reference = _format_date(datetime.now(timezone.utc))
+        checkpoint = Checkpoint.create(CHECKPOINT_PATH, collecte=collecte, filters=filters,
+                                       compression=compression, incremental=incremental,
+                                       reference=reference, max_results=max_results)
+
+    ext = EXTENSIONS[compression]
+    raw_path = f'data/raw/offres_it_brutes.jsonl{ext}'
+    offers_path = f'data/raw/offres_it.jsonl{ext}'
+    parquet_path = 'data/raw/offres_it.parquet'
+
+    # Reprise : on ignore tout ce qui a été écrit après le dernier point de reprise
+    resuming = bool(checkpoint.progress) and os.path.exists(raw_path)
+    if resuming:
+        os.truncate(raw_path, checkpoint["offset"])
+
+    # Chaque page est ajoutée au JSONL brut dès son arrivée, puis validée dans le point de reprise
+    with JsonlWriter(raw_path, compression, mode="a" if resuming else "w", fsync=True) as raw_writer:
+        raw_writer.rows = checkpoint["rows"] if resuming else 0
+
+        def on_page(keyword, key, offers):
+            offset = raw_writer.write_batch(offers)
+            checkpoint.page_done(keyword, key, len(offers), offset, raw_writer.rows)
+
+        resume = checkpoint.progress if resuming else None
+        incidents = {}
+        for metier, offers in iter_collect(token, metiers_it, max_results=max_results, workers=args.workers,
+                                           rate=args.rps, filters=filters, on_page=on_page, resume=resume,
+                                           now=reference and datetime.strptime(reference, DATE_FORMAT),
+                                           incidents=incidents):
+            checkpoint.keyword_done(metier, incidents.get(metier, []))
+            if offers:
+                print(f"✅ {len(offers)} offres collectées pour '{metier}'")
+            else:
+                print(f"⚠ Aucune offre trouvée pour '{metier}'")
+        total_brut = raw_writer.rows
+    METRICS.lap("collecte")
+
+    if not total_brut and not incremental:
         print("❌ Aucune offre collectée.")
+        checkpoint.remove()
+        index.close()
+        return
+
+    # 4️⃣ Déduplication (une même offre remonte sous plusieurs mots-clés) et mise à jour de l'index
+    stats = {"nouvelles": 0, "modifiees": 0, "inchangees": 0}
+    with JsonlWriter(offers_path, compression) as writer:
+        for batch in batched(dedup_offers(iter_jsonl(raw_path)), 1000):
+            for cle, valeur in index.upsert(batch, collecte).items():
+                stats[cle] += valeur
+            if not incremental:
+                writer.write_batch(batch)
+        if incremental:
+            # Le fichier reflète l'état courant complet, pas seulement le delta
+            for batch in batched(index.iter_offers(), 1000):
+                writer.write_batch(batch)
+        total_offres = writer.rows
+
+    # Les suppressions ne sont détectables que sur une collecte complète et sans incident
+    # (les incidents des mots-clés terminés avant une reprise viennent du point de reprise)
+    incidents = {metier: etat.get("incidents", []) for metier, etat in checkpoint.progress.items()}
+    supprimees = record_deletions(index, collecte, filters, max_results, incidents)
+    if supprimees is not None:
+        stats["supprimees"] = supprimees
+    elif filters is None:
+        incomplets = [metier for metier, problemes in incidents.items() if problemes]
+        print(f"⚠ Collecte incomplète ({len(incomplets)} mot(s)-clé(s) en échec ou tronqué(s)"
+              f"{', --max-results' if max_results is not None else ''}) : suppressions non détectées")
+    index.finish_run(collecte, stats)
+    index.close()
+    print(f"\n🧹 Déduplication: {total_brut} offres brutes → {total_offres} offres uniques")
+    print(f"🗂 Index: {stats['nouvelles']} nouvelles, {stats['modifiees']} modifiées, "
+          f"{stats['inchangees']} inchangées, {stats.get('supprimees', 0)} supprimées")
+
+    METRICS.lap("deduplication")
+
+    # 5️⃣ Conversion colonnaire pour les analyses
+    jsonl_to_parquet(offers_path, parquet_path)
+    METRICS.lap("parquet")
+
+    # Métadonnées de collecte
+    metadata = {
+        "date_collecte": datetime.now().isoformat(),
+        "total_offres": total_offres,
+        "total_offres_brutes": total_brut,
+        # Les étapes en aval ne retirent les offres absentes que d'une collecte complète ;
+        # en incrémental, le fichier des offres reprend tout l'index et reste complet
+        "collecte_complete": supprimees is not None or filters is not None,
+        "metiers_recherches": metiers_it,
+        # Requêtes, latences, parsing et débit par mot-clé
+        "metriques": METRICS.report()
+    }
+    with open(METADATA_PATH, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    # Les rapports successifs s'accumulent pour comparer les collectes dans le temps
+    append_history(HISTORY_PATH, metadata)
+
+    print("\n💾 Données sauvegardées:")
+    print(f"   - {raw_path}")
+    print(f"   - {offers_path}")
+    print(f"   - {parquet_path}")
+    print(f"   - {METADATA_PATH}")
+    print(f"   - {HISTORY_PATH}")
+    if args.prometheus:
+        METRICS.write_prometheus(args.prometheus)
+        print(f"   - {args.prometheus}")
+    print()
+    METRICS.print_summary()
+
+    # Collecte terminée : le point de reprise n'a plus lieu d'être
+    checkpoint.remove()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,166 @@
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import unicodedata
+import zlib
+from itertools import groupby
+
+import numpy as np
+
+from storage import batched
+
+# ==============================================================
+#  Déduplication des offres (exacte par id + quasi-doublons)
+# ==============================================================
+
+
+def dedup_offers(offers, key="id", merge_field="metier_recherche", workdir=None, batch_size=1000):
+    """
+    Générateur : une seule offre par `key`, dans l'ordre de première apparition.
+
+    Les valeurs de `merge_field` de tous les doublons sont fusionnées dans une
+    liste sans répétition. Les offres transitent par une base SQLite temporaire
+    sur disque : la mémoire reste bornée quelle que soit la taille du corpus.
+    """
+    with tempfile.TemporaryDirectory(dir=workdir, prefix="dedup-") as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "dedup.sqlite"))
+        conn.executescript("""
+            PRAGMA journal_mode=OFF;
+            PRAGMA synchronous=OFF;
+            CREATE TABLE offres (cle TEXT PRIMARY KEY, rang INTEGER, payload TEXT);
+            CREATE TABLE valeurs (cle TEXT, valeur TEXT, UNIQUE (cle, valeur));
+        """)
+        rang = 0
+        for batch in batched(offers, batch_size):
+            lignes, valeurs = [], []
+            for offer in batch:
+                cle = str(offer[key])
+                valeur = offer.get(merge_field)
+                for v in (valeur if isinstance(valeur, list) else [valeur]):
+                    if v is not None:
+                        valeurs.append((cle, v))
+                lignes.append((cle, rang, json.dumps(offer, ensure_ascii=False)))
+                rang += 1
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO offres VALUES (?, ?, ?)", lignes)
+                conn.executemany("INSERT OR IGNORE INTO valeurs VALUES (?, ?)", valeurs)
+
+        conn.execute("CREATE INDEX idx_valeurs ON valeurs(cle)")
+        rows = conn.execute(
+            "SELECT o.rang, o.payload, v.valeur FROM offres o "
+            "LEFT JOIN valeurs v ON v.cle = o.cle ORDER BY o.rang, v.rowid")
+        for _, groupe in groupby(rows, key=lambda row: row[0]):
+            groupe = list(groupe)
+            offer = json.loads(groupe[0][1])
+            offer[merge_field] = [valeur for _, _, valeur in groupe if valeur is not None]
+            yield offer
+        conn.close()
+
+
+# --------------------------------------------------------------
+#  Quasi-doublons entre sources (MinHash + LSH)
+# --------------------------------------------------------------
+
+_MERSENNE = np.uint64((1 << 31) - 1)
+
+
+def normalise_text(text):
+    """Minuscules, sans accents ni ponctuation"""
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def offer_signature_text(offer):
+    """Titre + entreprise + ville, que l'offre vienne de l'API ou du scraping"""
+    if "intitule" in offer:
+        entreprise = (offer.get("entreprise") or {}).get("nom", "")
+        lieu = (offer.get("lieuTravail") or {}).get("libelle", "")
+        # « 75 - Paris 11e » : le numéro de département n'apparaît pas côté scraping
+        lieu = re.sub(r"^\s*\w{2,3}\s+-\s+", "", lieu)
+        parts = (offer.get("intitule"), entreprise, lieu)
+    else:
+        parts = (offer.get("Intitulé du poste"), offer.get("Nom de l entreprise"), offer.get("Ville ou région"))
+    return normalise_text(" ".join(p for p in parts if p))
+
+
+def shingles(text, k=3):
+    """Ensemble des k-grammes de caractères du texte normalisé"""
+    text = f" {text} "
+    if len(text) <= k:
+        return {text}
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+class MinHashLSH:
+    """
+    Index LSH sur signatures MinHash pour retrouver les offres quasi identiques.
+
+    `bands` bandes de `num_perm // bands` lignes : deux offres partagent un
+    seau dès qu'une bande coïncide, puis la similarité de Jaccard estimée par
+    les signatures complètes est comparée à `threshold`.
+    """
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.5, seed=42):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_MERSENNE), num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE), num_perm).astype(np.uint64)
+        self._buckets = {}
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+        hashes %= _MERSENNE
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, hash(signature[band * self.rows:(band + 1) * self.rows].tobytes())
+
+    def add(self, key, text):
+        signature = self.signature(text)
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def query(self, text):
+        """Clés similaires à `text`, triées par similarité estimée décroissante"""
+        signature = self.signature(text)
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        scored = []
+        for key in candidates:
+            score = float(np.mean(self._signatures[key] == signature))
+            if score >= self.threshold:
+                scored.append((key, score))
+        return sorted(scored, key=lambda item: -item[1])
+
+
+def match_to_reference(records, reference, threshold=0.5, key="id"):
+    """
+    Associer chaque enregistrement (ex. cartes LinkedIn/Glassdoor/ChooseYourBoss)
+    à l'offre de référence la plus proche (ex. offres de l'API).
+
+    Générateur de tuples (enregistrement, clé de l'offre trouvée ou None, score).
+    """
+    lsh = MinHashLSH(threshold=threshold)
+    for offer in reference:
+        lsh.add(offer[key], offer_signature_text(offer))
+    for record in records:
+        matches = lsh.query(offer_signature_text(record))
+        if matches:
+            yield record, matches[0][0], matches[0][1]
+        else:
+            yield record, None, 0.0
@@ -0,0 +1,302 @@
+import difflib
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+# ==============================================================
+#  Géographie des offres : lieu libre -> commune, département, région,
+#  coordonnées, et index spatial (sans géocodeur en ligne)
+# ==============================================================
+
+REFERENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'reference')
+RAYON_TERRE_KM = 6371.0088
+# Similarité minimale (difflib) pour accepter une variante orthographique
+FUZZY_CUTOFF = 0.85
+
+PRECISIONS = pd.CategoricalDtype(['commune', 'departement', 'region', 'pays', 'inconnue'], ordered=True)
+COLONNES_GEO = ['Commune', 'Département', 'Région', 'Latitude', 'Longitude', 'Précision géo']
+
+# Libellés sans localisation exploitable (valeur par défaut des collectes, télétravail)
+PAYS = frozenset(("france", "france entiere", "france metropolitaine", "teletravail", "full remote", "remote",
+                  "a distance", "non specifie"))
+# Appellations courantes sur LinkedIn / Glassdoor -> (niveau, nom de référence)
+ALIAS = {
+    "greater paris": ("departement", "Paris"),
+    "greater paris metropolitan region": ("region", "Île-de-France"),
+    "paris et peripherie": ("region", "Île-de-France"),
+    "region parisienne": ("region", "Île-de-France"),
+    "idf": ("region", "Île-de-France"),
+    "paris la defense": ("commune", "La Défense"),
+    "sophia antipolis": ("commune", "Valbonne"),
+    "marne la vallee": ("commune", "Champs-sur-Marne"),
+    "saint quentin en yvelines": ("commune", "Guyancourt"),
+    "plateau de saclay": ("commune", "Saclay"),
+    "greater lyon area": ("commune", "Lyon"),
+    "greater toulouse metropolitan area": ("commune", "Toulouse"),
+    "greater bordeaux metropolitan area": ("commune", "Bordeaux"),
+    "greater lille metropolitan area": ("commune", "Lille"),
+    "greater nantes metropolitan area": ("commune", "Nantes"),
+    "greater marseille metropolitan area": ("commune", "Marseille"),
+    "corsica": ("region", "Corse"),
+    "brittany": ("region", "Bretagne"),
+    "normandy": ("region", "Normandie"),
+}
+
+# « 75 - Paris 11e » (France Travail), « Lyon (69) » / « Lyon (69003) » (Glassdoor)
+_CODE_DEBUT = re.compile(r"^\s*(97\d|\d{2}|2[AaBb])\s*-\s*(.*)$")
+_CODE_FIN = re.compile(r"^(.*?)\s*\(\s*(\d{5}|97\d|\d{2}|2[AaBb])\s*\)\s*$")
+_ARRONDISSEMENT = re.compile(r"( \d{1,2}( ?(e|er|eme))?( arrondissement)?| cedex( \d+)?)+$")
+_SAINT = re.compile(r"\b(st|ste)\b")
+
+
+def geo_key(texte):
+    """Clé de comparaison d'un nom de lieu : minuscules, sans accents ni ponctuation, « St » -> « saint »"""
+    texte = texte.lower().replace("œ", "oe").replace("æ", "ae")
+    texte = unicodedata.normalize("NFKD", texte).encode("ascii", "ignore").decode("ascii")
+    texte = re.sub(r"[^a-z0-9]+", " ", texte).strip()
+    return _SAINT.sub(lambda m: "saint" if m.group(1) == "st" else "sainte", texte)
+
+
+def _departement_code(code):
+    """« 69 », « 69003 », « 97411 », « 2a » -> code de département"""
+    code = code.upper()
+    if len(code) == 5:
+        return code[:3] if code.startswith("97") else code[:2]
+    return code
+
+
+@dataclass(frozen=True)
+class Lieu:
+    """Lieu résolu ; les coordonnées d'un département ou d'une région sont celles de son chef-lieu"""
+    commune: str = None
+    departement: str = None
+    region: str = None
+    latitude: float = float('nan')
+    longitude: float = float('nan')
+    precision: str = 'inconnue'
+
+
+# --------------------------------------------------------------
+#  Référentiel embarqué
+# --------------------------------------------------------------
+
+class GeoReference:
+    """
+    Référentiel hors ligne (data/reference/*.csv) : régions, départements
+    et communes avec leurs coordonnées. `resolve` est mis en cache : un
+    fichier d'offres ne compte que quelques centaines de lieux distincts.
+    """
+
+    def __init__(self, directory=REFERENCE_DIR):
+        lire = lambda nom: pd.read_csv(os.path.join(directory, nom), dtype=str, keep_default_na=False)
+        self.regions = lire('regions.csv').set_index('code')
+        self.departements = lire('departements.csv').set_index('code')
+        self.communes = lire('communes.csv').astype({'latitude': float, 'longitude': float})
+        region_de = self.departements['region']
+        # Lieux construits une fois pour toutes : la résolution ne touche plus aux DataFrames
+        self._lieux_communes = [Lieu(nom, dep, region_de[dep], float(lat), float(lon), 'commune') for nom, dep, lat, lon in
+                                self.communes[['nom', 'departement', 'latitude', 'longitude']].itertuples(index=False)]
+        self._communes = {}
+        for position, nom in enumerate(self.communes['nom']):
+            self._communes.setdefault(geo_key(nom), []).append(position)
+        self._departements = {geo_key(nom): code for code, nom in self.departements['nom'].items()}
+        self._regions = {geo_key(nom): code for code, nom in self.regions['nom'].items()}
+        self._lieux_departements = {}
+        for code, chef_lieu in self.departements['chef_lieu'].items():
+            ville = self._lieux_communes[self._commune(geo_key(chef_lieu), (code,))]
+            self._lieux_departements[code] = Lieu(None, code, ville.region, ville.latitude, ville.longitude,
+                                                  'departement')
+        self._lieux_regions = {}
+        for code, chef_lieu in self.regions['chef_lieu'].items():
+            departements = tuple(region_de.index[region_de == code])
+            ville = self._lieux_communes[self._commune(geo_key(chef_lieu), departements)]
+            self._lieux_regions[code] = Lieu(None, None, code, ville.latitude, ville.longitude, 'region')
+        self.resolve = lru_cache(maxsize=None)(self._resolve)
+
+    def _commune(self, cle, departements=None):
+        """Position de la commune de clé `cle` (restreinte à `departements` si donnés), ou None"""
+        for position in self._communes.get(cle, ()):
+            if departements is None or self._lieux_communes[position].departement in departements:
+                return position
+        return None
+
+    def _alias(self, niveau, nom):
+        cle = geo_key(nom)
+        if niveau == 'commune':
+            return self._lieux_communes[self._commune(cle)]
+        if niveau == 'departement':
+            return self._lieux_departements[self._departements[cle]]
+        return self._lieux_regions[self._regions[cle]]
+
+    # ---------------------------------------------------------- résolution
+
+    def _resolve(self, texte):
+        """Texte libre -> Lieu le plus précis reconnu"""
+        texte = (texte or "").strip()
+        departement = None
+        for motif, groupe_code, groupe_lieu in ((_CODE_DEBUT, 1, 2), (_CODE_FIN, 2, 1)):
+            correspondance = motif.match(texte)
+            if correspondance and _departement_code(correspondance.group(groupe_code)) in self.departements.index:
+                departement = _departement_code(correspondance.group(groupe_code))
+                texte = correspondance.group(groupe_lieu)
+                break
+        # LinkedIn : « Ville, Région, Pays » -> le morceau le plus précis l'emporte
+        candidats = [self._match(geo_key(morceau), departement) for morceau in re.split(r"[,/|]", texte)]
+        candidats = [lieu for lieu in candidats if lieu is not None]
+        if candidats:
+            return min(candidats, key=lambda lieu: PRECISIONS.categories.get_loc(lieu.precision))
+        if departement:
+            return self._lieux_departements[departement]
+        return Lieu(precision='pays' if geo_key(texte) in PAYS else 'inconnue')
+
+    def _match(self, cle, departement=None):
+        cle = _ARRONDISSEMENT.sub("", cle)
+        if not cle or cle in PAYS:
+            return None
+        portee = (departement,) if departement else None
+        position = self._commune(cle, portee)
+        if position is not None:
+            return self._lieux_communes[position]
+        if cle in ALIAS:
+            return self._alias(*ALIAS[cle])
+        if cle in self._departements:
+            return self._lieux_departements[self._departements[cle]]
+        if cle in self._regions:
+            return self._lieux_regions[self._regions[cle]]
+        return self._fuzzy(cle, portee)
+
+    def _fuzzy(self, cle, portee):
+        """Variante orthographique (« Marseile », « Villeneuve d'Asq ») d'une commune, d'un département ou d'une région"""
+        for noms, construire in ((self._communes, lambda c: self._lieux_communes[self._commune(c, portee)]),
+                                 (self._departements, lambda c: self._lieux_departements[self._departements[c]]),
+                                 (self._regions, lambda c: self._lieux_regions[self._regions[c]])):
+            if noms is self._communes and portee:
+                noms = [c for c in noms if self._commune(c, portee) is not None]
+            proches = difflib.get_close_matches(cle, noms, n=1, cutoff=FUZZY_CUTOFF)
+            if proches:
+                return construire(proches[0])
+        return None
+
+    def find(self, lieu):
+        """Lieu d'un nom saisi par l'utilisateur ; ValueError s'il n'a pas de coordonnées"""
+        resultat = self.resolve(lieu)
+        if np.isnan(resultat.latitude):
+            raise ValueError(f"lieu inconnu du référentiel : {lieu!r}")
+        return resultat
+
+
+@lru_cache(maxsize=1)
+def default_reference():
+    return GeoReference()
+
+
+# --------------------------------------------------------------
+#  Colonnes géographiques
+# --------------------------------------------------------------
+
+def geocode(df, reference=None, colonne='Ville ou région'):
+    """
+    Colonnes Commune, Département, Région (catégorielles), Latitude,
+    Longitude (float32) et Précision géo pour chaque offre de `df`. Seules
+    les valeurs distinctes de `colonne` sont résolues.
+    """
+    reference = reference or default_reference()
+    codes, valeurs = pd.factorize(df[colonne].fillna(''))
+    lieux = pd.DataFrame([reference.resolve(str(valeur)) for valeur in valeurs],
+                         columns=['commune', 'departement', 'region', 'latitude', 'longitude', 'precision'])
+    lieux = lieux.reindex(codes)
+    categories = {
+        'Commune': pd.CategoricalDtype(sorted(set(reference.communes['nom']))),
+        'Département': pd.CategoricalDtype(list(reference.departements.index)),
+        'Région': pd.CategoricalDtype(list(reference.regions.index)),
+    }
+    return pd.DataFrame({
+        'Commune': pd.Categorical(lieux['commune'], dtype=categories['Commune']),
+        'Département': pd.Categorical(lieux['departement'], dtype=categories['Département']),
+        'Région': pd.Categorical(lieux['region'], dtype=categories['Région']),
+        'Latitude': lieux['latitude'].to_numpy(np.float32),
+        'Longitude': lieux['longitude'].to_numpy(np.float32),
+        'Précision géo': pd.Categorical(lieux['precision'], dtype=PRECISIONS),
+    }, index=df.index)
+
+
+def region_summary(df, reference=None):
+    """Offres, départements représentés et salaires médians par région (colonnes de `geocode` requises)"""
+    reference = reference or default_reference()
+    groupes = df.groupby('Région', observed=True)
+    resume = pd.DataFrame({
+        'offres': groupes.size(),
+        'departements': groupes['Département'].nunique(),
+        'salaire_min_median': groupes['Salaire annuel min'].median(),
+        'salaire_max_median': groupes['Salaire annuel max'].median(),
+    })
+    resume.insert(0, 'nom', reference.regions['nom'].reindex(resume.index.astype(str)).to_numpy())
+    return resume.sort_values('offres', ascending=False, kind='stable')
+
+
+# --------------------------------------------------------------
+#  Index spatial
+# --------------------------------------------------------------
+
+def _unit_vectors(latitudes, longitudes):
+    lat, lon = np.radians(latitudes), np.radians(longitudes)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(a))
+
+
+class GeoIndex:
+    """
+    Index spatial des offres géocodées : un cKDTree sur les points distincts
+    (vecteurs unitaires 3D, la distance euclidienne y est la corde du grand
+    cercle), et pour chaque point la liste des offres qui s'y trouvent. Les
+    offres partagent quelques centaines de points : une requête de rayon ne
+    parcourt que ceux-ci.
+    """
+
+    def __init__(self, latitudes, longitudes):
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        valides = np.flatnonzero(~(np.isnan(latitudes) | np.isnan(longitudes)))
+        self.points, point_offre = np.unique(np.column_stack((latitudes[valides], longitudes[valides])),
+                                             axis=0, return_inverse=True)
+        ordre = np.argsort(point_offre.ravel(), kind='stable')
+        self.offres = valides[ordre]
+        self.debuts = np.searchsorted(point_offre.ravel()[ordre], np.arange(len(self.points) + 1))
+        self.tree = cKDTree(_unit_vectors(self.points[:, 0], self.points[:, 1]))
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df['Latitude'].to_numpy(np.float64, na_value=np.nan),
+                   df['Longitude'].to_numpy(np.float64, na_value=np.nan))
+
+    def __len__(self):
+        return len(self.offres)
+
+    def within(self, latitude, longitude, km):
+        """(positions des offres à moins de `km` km, distances en km), des plus proches aux plus lointaines"""
+        corde = 2 * np.sin(min(km / RAYON_TERRE_KM, np.pi) / 2)
+        points = np.asarray(self.tree.query_ball_point(_unit_vectors([latitude], [longitude])[0], corde * (1 + 1e-9)),
+                            dtype=np.int64)
+        if not len(points):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        distances = haversine_km(latitude, longitude, self.points[points, 0], self.points[points, 1])
+        points, distances = points[np.argsort(distances, kind='stable')], np.sort(distances, kind='stable')
+        tailles = self.debuts[points + 1] - self.debuts[points]
+        positions = np.concatenate([self.offres[self.debuts[p]:self.debuts[p + 1]] for p in points])
+        return positions, np.repeat(distances, tailles).astype(np.float32)
+
+    def near(self, lieu, km, reference=None):
+        """Offres à moins de `km` km d'un lieu nommé (« Lyon », « 92 - Nanterre »...)"""
+        lieu = (reference or default_reference()).find(lieu)
+        return self.within(lieu.latitude, lieu.longitude, km)
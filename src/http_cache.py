@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# ==============================================================
+#  Cache HTTP local : enregistrement / rejeu des réponses
+# ==============================================================
+
+# record : réseau systématique (revalidation ETag/Last-Modified) + enregistrement
+# replay : uniquement le cache, une requête absente lève CacheMiss
+# auto   : le cache s'il contient la réponse (GET), sinon réseau + enregistrement
+MODES = ("record", "replay", "auto")
+
+# En-têtes de réponse conservés (les autres n'apportent rien au rejeu)
+KEPT_HEADERS = ("Content-Type", "Content-Range", "ETag", "Last-Modified", "Retry-After")
+
+# Champs secrets des réponses OAuth2 : jamais écrits en clair dans le cache
+SECRET_FIELDS = ("access_token", "refresh_token", "id_token")
+REDACTED = "<masque-par-le-cache>"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reponses (
+    cle TEXT PRIMARY KEY,
+    methode TEXT NOT NULL,
+    url TEXT NOT NULL,
+    statut INTEGER NOT NULL,
+    entetes TEXT NOT NULL,
+    corps BLOB NOT NULL,
+    enregistree_le REAL NOT NULL
+);
+"""
+
+
+class CacheMiss(LookupError):
+    """Requête absente du cache en mode replay"""
+
+
+def redact(content):
+    """
+    Corps JSON dont les jetons OAuth2 sont masqués (inchangé s'il n'en contient
+    pas). Le rejeu reste possible : les clés de cache ignorent Authorization.
+    """
+    try:
+        payload = json.loads(content)
+    except ValueError:
+        return content
+    if not isinstance(payload, dict) or not any(champ in payload for champ in SECRET_FIELDS):
+        return content
+    payload.update({champ: REDACTED for champ in SECRET_FIELDS if champ in payload})
+    return json.dumps(payload).encode("utf-8")
+
+
+def request_key(method, url, params=None, data=None):
+    """
+    Clé d'une requête : méthode, URL et paramètres triés (corps compris).
+
+    Les en-têtes, et donc le token Authorization, n'en font pas partie :
+    un enregistrement reste rejouable avec un autre token.
+    """
+    parts = [method.upper(), url, urlencode(sorted((params or {}).items()), doseq=True)]
+    if data:
+        parts.append(urlencode(sorted(data.items()), doseq=True) if isinstance(data, dict) else str(data))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """
+    Magasin SQLite des réponses HTTP (corps compressés avec zlib).
+
+    Utilisé par HttpClient : en mode `record`, une réponse déjà connue est
+    revalidée par If-None-Match / If-Modified-Since et un 304 restitue le
+    corps enregistré ; en mode `replay`, aucune requête ne part sur le réseau.
+    """
+
+    def __init__(self, path, mode="auto", statuses=(200, 204, 206)):
+        if mode not in MODES:
+            raise ValueError(f"Mode de cache inconnu : {mode} (attendu : {', '.join(MODES)})")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.mode = mode
+        self.statuses = set(statuses)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls):
+        """Cache configuré par HTTP_CACHE_MODE / HTTP_CACHE_PATH (None si désactivé)"""
+        mode = os.getenv("HTTP_CACHE_MODE")
+        if not mode or mode == "off":
+            return None
+        return cls(os.getenv("HTTP_CACHE_PATH", "data/cache/http_cache.sqlite"), mode)
+
+    # ---------------------------------------------------------- API utilisée par HttpClient
+
+    def lookup(self, method, url, params=None, data=None):
+        """
+        Réponse à servir sans réseau (None s'il faut interroger le serveur).
+
+        Lève CacheMiss en mode replay si la requête n'a jamais été enregistrée.
+        """
+        # En mode auto, seules les lectures sont rejouées (un token périmé ne doit pas l'être)
+        if self.mode == "record" or (self.mode == "auto" and method.upper() != "GET"):
+            return None
+        row = self._get(request_key(method, url, params, data))
+        if row is None:
+            if self.mode == "replay":
+                raise CacheMiss(f"{method} {url} {params or ''} absent du cache {self.path}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._to_response(url, *row)
+
+    def conditional_headers(self, method, url, params=None, data=None):
+        """En-têtes de revalidation pour une réponse déjà enregistrée"""
+        row = self._get(request_key(method, url, params, data))
+        if row is None:
+            return {}
+        headers = json.loads(row[1])
+        conditional = {}
+        if headers.get("ETag"):
+            conditional["If-None-Match"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            conditional["If-Modified-Since"] = headers["Last-Modified"]
+        return conditional
+
+    def store(self, method, url, response, params=None, data=None):
+        """
+        Enregistrer une réponse réseau et retourner celle à utiliser :
+        un 304 est remplacé par la réponse enregistrée.
+        """
+        key = request_key(method, url, params, data)
+        if response.status_code == 304:
+            row = self._get(key)
+            if row is not None:
+                self.hits += 1
+                return self._to_response(url, *row)
+            return response
+        if response.status_code not in self.statuses:
+            return response
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        body = zlib.compress(redact(response.content or b""), 6)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO reponses (cle, methode, url, statut, entetes, corps, enregistree_le) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, method.upper(), url, response.status_code, json.dumps(headers), body, time.time()),
+            )
+        return response
+
+    # ---------------------------------------------------------- divers
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM reponses").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM reponses")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get(self, key):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT statut, entetes, corps FROM reponses WHERE cle = ?", (key,)
+            ).fetchone()
+
+    @staticmethod
+    def _to_response(url, status, headers, body):
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response._content = zlib.decompress(body)
+        response.url = url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers) or "utf-8"
+        response.from_cache = True
+        return response
@@ -0,0 +1,190 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HttpCache
+from metrics import METRICS
+
+# ==============================================================
+#  Client HTTP partagé par les collecteurs (API et scraping)
+# ==============================================================
+
+# Codes pour lesquels une nouvelle tentative a du sens
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+try:
+    import brotli  # noqa: F401  (décodage 'br' pris en charge par urllib3)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class RateLimiter:
+    """Seau à jetons partagé entre threads pour respecter un débit global"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate or 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquer jusqu'à ce qu'une requête puisse partir"""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def parse_retry_after(value):
+    """Convertir un en-tête Retry-After (secondes ou date HTTP) en secondes"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class HttpClient:
+    """
+    Session HTTP persistante : pools de connexions keep-alive par hôte,
+    compression négociée et nouvelles tentatives avec backoff exponentiel
+    « full jitter » respectant Retry-After.
+
+    Avec un `cache` (HttpCache), les réponses sont enregistrées localement et
+    peuvent être rejouées sans réseau ni attente du limiteur de débit.
+    Avec `metrics` (RunMetrics), chaque tentative est comptabilisée sous le
+    libellé `label` passé à request() (mot-clé, site...).
+    """
+
+    def __init__(self, max_retries=4, backoff_base=0.5, backoff_max=30.0,
+                 max_retry_after=120.0, pool_connections=10, pool_maxsize=32, timeout=10,
+                 cache=None, metrics=None):
+        self.cache = cache
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Connection": "keep-alive",
+        })
+        self._host_limiters = {}
+
+    def set_rate_limit(self, host, rate, burst=None):
+        """Limiter le débit (requêtes/s) vers un hôte donné"""
+        self._host_limiters[host] = RateLimiter(rate, burst)
+
+    def backoff(self, attempt):
+        """Délai avant la tentative suivante (backoff exponentiel avec jitter)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method, url, limiter=None, label=None, **kwargs):
+        """Envoyer une requête, en réessayant sur 429/5xx et erreurs réseau"""
+        if self.cache is not None:
+            params, data = kwargs.get("params"), kwargs.get("data")
+            cached = self.cache.lookup(method, url, params, data)
+            if cached is not None:
+                if self.metrics:
+                    self.metrics.record_cache_hit(label)
+                return cached
+            conditional = self.cache.conditional_headers(method, url, params, data)
+            if conditional:
+                kwargs["headers"] = {**(kwargs.get("headers") or {}), **conditional}
+            response = self._send(method, url, limiter, label, kwargs)
+            return self.cache.store(method, url, response, params, data)
+        return self._send(method, url, limiter, label, kwargs)
+
+    def _send(self, method, url, limiter, label, kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+        host_limiter = self._host_limiters.get(host)
+
+        for attempt in range(self.max_retries + 1):
+            waited = time.perf_counter()
+            if limiter:
+                limiter.acquire()
+            if host_limiter:
+                host_limiter.acquire()
+            start = time.perf_counter()
+            waited = start - waited
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if self.metrics:
+                    self.metrics.record_request(label or host, None, time.perf_counter() - start,
+                                                retry=attempt > 0, wait=waited)
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                print(f"   ↻ {type(e).__name__} sur {host}, nouvelle tentative dans {delay:.1f}s")
+            else:
+                if self.metrics:
+                    self.metrics.record_request(label or host, response.status_code, time.perf_counter() - start,
+                                                _wire_bytes(response), retry=attempt > 0, wait=waited)
+                if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                    return response
+                delay = parse_retry_after(response.headers.get("Retry-After"))
+                if delay is None:
+                    delay = self.backoff(attempt)
+                delay = min(delay, self.max_retry_after)
+                print(f"   ↻ HTTP {response.status_code} sur {host}, nouvelle tentative dans {delay:.1f}s")
+                response.close()
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+def _wire_bytes(response):
+    """Octets reçus sur le réseau (corps compressé), à défaut taille du corps décodé"""
+    try:
+        return response.raw.tell() or len(response.content)
+    except (AttributeError, TypeError, ValueError):
+        return len(response.content or b"")
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """Client partagé par tout le processus (créé à la première utilisation)"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient(cache=HttpCache.from_env(), metrics=METRICS)
+        return _default_client
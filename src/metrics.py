@@ -0,0 +1,278 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from checkpoint import atomic_write_json
+from storage import JsonlWriter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ==============================================================
+#  Instrumentation des collectes (requêtes, parsing, débit, mémoire)
+# ==============================================================
+
+GLOBAL = "_total"
+
+
+def peak_memory_bytes():
+    """Pic de mémoire résidente du processus (None si indisponible)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux : en kilo-octets
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class _LabelStats:
+    __slots__ = ("requests", "statuses", "retries", "errors", "cache_hits", "bytes", "latencies",
+                 "wait", "parse_time", "pages", "offers", "wall_time", "peak_memory")
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = Counter()
+        self.retries = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.bytes = 0
+        self.latencies = []
+        self.wait = 0.0
+        self.parse_time = 0.0
+        self.pages = 0
+        self.offers = 0
+        self.wall_time = 0.0
+        self.peak_memory = None
+
+    def report(self):
+        latencies = self.latencies
+        return {
+            "requetes": self.requests,
+            "statuts": {str(status): n for status, n in sorted(self.statuses.items(), key=str)},
+            "retries": self.retries,
+            "erreurs_reseau": self.errors,
+            "cache": self.cache_hits,
+            "octets": self.bytes,
+            "latence_ms": {
+                "moyenne": round(1000 * sum(latencies) / len(latencies), 2) if latencies else None,
+                "p50": round(1000 * _percentile(latencies, 0.5), 2) if latencies else None,
+                "p95": round(1000 * _percentile(latencies, 0.95), 2) if latencies else None,
+                "max": round(1000 * max(latencies), 2) if latencies else None,
+            },
+            "attente_limiteur_s": round(self.wait, 3),
+            "parsing_s": round(self.parse_time, 3),
+            "pages": self.pages,
+            "offres": self.offers,
+            "duree_s": round(self.wall_time, 3),
+            "offres_par_s": round(self.offers / self.wall_time, 1) if self.wall_time else None,
+            "memoire_max_mo": round(self.peak_memory / 2 ** 20, 1) if self.peak_memory else None,
+        }
+
+
+class RunMetrics:
+    """
+    Compteurs d'une exécution, ventilés par libellé (mot-clé ou site).
+
+    Alimentés par HttpClient (requêtes, retries, octets, latence, attente du
+    limiteur) et par les collecteurs (temps de parsing, offres, durée).
+    Thread-safe ; exportable en rapport JSON ou au format texte Prometheus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._labels = defaultdict(_LabelStats)
+        self._stages = {}
+        self.started = time.time()
+        self._last_lap = time.perf_counter()
+        self.started_at = datetime.now().isoformat()
+
+    def _stats(self, label):
+        return self._labels[label or GLOBAL]
+
+    # ---------------------------------------------------------- enregistrement
+
+    def record_request(self, label, status, latency, nbytes=0, retry=False, wait=0.0):
+        """Une tentative HTTP ; `status` vaut None pour une erreur réseau"""
+        with self._lock:
+            stats = self._stats(label)
+            stats.requests += 1
+            stats.latencies.append(latency)
+            stats.bytes += nbytes
+            stats.wait += wait
+            if status is None:
+                stats.errors += 1
+            else:
+                stats.statuses[status] += 1
+            if retry:
+                stats.retries += 1
+
+    def record_cache_hit(self, label):
+        with self._lock:
+            self._stats(label).cache_hits += 1
+
+    def record_parse(self, label, seconds, offers=0):
+        """Temps de décodage / parsing d'une page et nombre d'offres extraites"""
+        with self._lock:
+            stats = self._stats(label)
+            stats.parse_time += seconds
+            stats.pages += 1
+            stats.offers += offers
+
+    @contextmanager
+    def timed(self, label):
+        """Mesurer la durée totale consacrée à un mot-clé ou un site"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self._stats(label)
+                stats.wall_time += elapsed
+                stats.peak_memory = peak_memory_bytes()
+
+    def lap(self, name):
+        """Clore l'étape `name` du programme : durée écoulée depuis l'étape précédente"""
+        now = time.perf_counter()
+        with self._lock:
+            self._stages[name] = round(self._stages.get(name, 0.0) + now - self._last_lap, 3)
+            self._last_lap = now
+
+    # ---------------------------------------------------------- export
+
+    def report(self):
+        """Rapport JSON de l'exécution : totaux, étapes et détail par libellé"""
+        with self._lock:
+            labels = {label: stats.report() for label, stats in sorted(self._labels.items())}
+            stats = list(self._labels.values())
+            latencies = [latency for s in stats for latency in s.latencies]
+        duration = time.time() - self.started
+        offers = sum(s.offers for s in stats)
+        peak = peak_memory_bytes()
+        return {
+            "debut": self.started_at,
+            "duree_s": round(duration, 3),
+            "memoire_max_mo": round(peak / 2 ** 20, 1) if peak else None,
+            "etapes_s": dict(self._stages),
+            "totaux": {
+                "requetes": sum(s.requests for s in stats),
+                "retries": sum(s.retries for s in stats),
+                "erreurs_reseau": sum(s.errors for s in stats),
+                "cache": sum(s.cache_hits for s in stats),
+                "octets": sum(s.bytes for s in stats),
+                "latence_p95_ms": round(1000 * _percentile(latencies, 0.95), 2) if latencies else None,
+                "offres": offers,
+                "offres_par_s": round(offers / duration, 1) if duration else None,
+            },
+            "par_source": labels,
+        }
+
+    def slowest(self, n=5):
+        """Libellés ayant consommé le plus de temps : [(libellé, durée en s)]"""
+        with self._lock:
+            durations = [(label, s.wall_time) for label, s in self._labels.items() if label != GLOBAL]
+        return sorted(durations, key=lambda item: item[1], reverse=True)[:n]
+
+    def to_prometheus(self, prefix="collecte"):
+        """Export au format texte d'exposition Prometheus"""
+        def esc(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        metrics = [
+            ("requetes_total", "counter", "Tentatives HTTP envoyées"),
+            ("retries_total", "counter", "Nouvelles tentatives HTTP"),
+            ("cache_total", "counter", "Réponses servies par le cache HTTP"),
+            ("octets_total", "counter", "Octets reçus"),
+            ("latence_secondes", "summary", "Latence des requêtes HTTP"),
+            ("attente_limiteur_secondes_total", "counter", "Temps passé à attendre le limiteur de débit"),
+            ("parsing_secondes_total", "counter", "Temps de décodage / parsing des pages"),
+            ("offres_total", "counter", "Offres collectées"),
+            ("duree_secondes", "gauge", "Durée consacrée à chaque mot-clé ou site"),
+        ]
+        # nom de la métrique -> [(suffixe, étiquettes, valeur)]
+        samples = defaultdict(list)
+        with self._lock:
+            for label, s in sorted(self._labels.items()):
+                source = f'source="{esc(label)}"'
+                for status, n in sorted(s.statuses.items(), key=str):
+                    samples["requetes_total"].append(("", f'{source},statut="{status}"', n))
+                if s.errors:
+                    samples["requetes_total"].append(("", f'{source},statut="erreur"', s.errors))
+                samples["retries_total"].append(("", source, s.retries))
+                samples["cache_total"].append(("", source, s.cache_hits))
+                samples["octets_total"].append(("", source, s.bytes))
+                if s.latencies:
+                    for q in (0.5, 0.95):
+                        samples["latence_secondes"].append(
+                            ("", f'{source},quantile="{q}"', round(_percentile(s.latencies, q), 6)))
+                samples["latence_secondes"].append(("_sum", source, round(sum(s.latencies), 6)))
+                samples["latence_secondes"].append(("_count", source, len(s.latencies)))
+                samples["attente_limiteur_secondes_total"].append(("", source, round(s.wait, 6)))
+                samples["parsing_secondes_total"].append(("", source, round(s.parse_time, 6)))
+                samples["offres_total"].append(("", source, s.offers))
+                samples["duree_secondes"].append(("", source, round(s.wall_time, 6)))
+
+        lines = []
+        for name, kind, help_text in metrics:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples[name]:
+                lines.append(f"{prefix}_{name}{suffix}{{{labels}}} {value}")
+        peak = peak_memory_bytes()
+        if peak:
+            lines.append(f"# HELP {prefix}_memoire_max_octets Pic de mémoire résidente du processus")
+            lines.append(f"# TYPE {prefix}_memoire_max_octets gauge")
+            lines.append(f"{prefix}_memoire_max_octets {peak}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path, key="metriques"):
+        """
+        Ajouter le rapport à un fichier JSON existant (métadonnées de collecte)
+        sous `key`, ou créer le fichier.
+        """
+        data = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        data[key] = self.report()
+        atomic_write_json(path, data)
+        return data[key]
+
+    def write_prometheus(self, path, prefix="collecte"):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus(prefix))
+
+    def print_summary(self, n=5):
+        totaux = self.report()["totaux"]
+        print(f"📈 {totaux['requetes']} requêtes ({totaux['retries']} retries, {totaux['cache']} depuis le cache), "
+              f"{totaux['octets'] / 2 ** 20:.1f} Mo, {totaux['offres_par_s']} offres/s")
+        for label, duration in self.slowest(n):
+            print(f"   ⏱ {label}: {duration:.1f}s")
+
+
+def append_history(path, report):
+    """
+    Ajouter le rapport d'une exécution à l'historique JSONL `path` (une ligne
+    par exécution) : contrairement aux métadonnées, réécrites à chaque
+    collecte, les rapports s'y accumulent pour suivre les tendances.
+    """
+    with JsonlWriter(path, mode="a") as writer:
+        writer.write_batch([report])
+
+
+# Instance partagée par le processus (alimentée par le client HTTP par défaut)
+METRICS = RunMetrics()
@@ -0,0 +1,261 @@
+import os
+import tempfile
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from scipy import sparse
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import normalize
+
+from normalisation import CONTRATS, NON_SPECIFIE, SENIORITES, TEXTE, normalise_api, normalise_scraped, \
+    read_api_records
+from search_index import analyse_column
+from storage import batched, iter_jsonl
+
+# ==============================================================
+#  Modélisation des descriptions : TF-IDF haché, familles de métiers,
+#  prédiction de la séniorité et du contrat (apprentissage hors mémoire)
+# ==============================================================
+
+MODEL_PATH = 'data/pipeline/modele_offres.joblib'
+CHUNK_SIZE = 20_000
+# 2^18 colonnes : assez pour limiter les collisions, assez peu pour des
+# centroïdes k-means denses de quelques dizaines de Mo
+N_FEATURES = 2 ** 18
+# Nombre maximal de termes conservés pour nommer les familles (le hachage est irréversible)
+MAX_TERMES = 200_000
+
+# Colonne à prédire -> classes possibles (les offres « Non spécifié » ne servent pas à l'apprentissage)
+CIBLES = {
+    'Niveau de seniorité': [c for c in SENIORITES.categories if c != NON_SPECIFIE],
+    'Type de contrat': [c for c in CONTRATS.categories if c != NON_SPECIFIE],
+}
+
+
+# --------------------------------------------------------------
+#  Sources d'offres par lots
+# --------------------------------------------------------------
+
+def jsonl_chunks(api_path=None, scraping_path=None, batch_size=CHUNK_SIZE):
+    """Offres normalisées lues par lots depuis les collectes JSONL, sans tout charger en mémoire"""
+    if api_path:
+        for flat in read_api_records(api_path, batch_size):
+            yield normalise_api(flat)
+    if scraping_path:
+        for batch in batched(iter_jsonl(scraping_path), batch_size):
+            yield normalise_scraped(pd.DataFrame.from_records(batch))
+
+
+def parquet_chunks(path, batch_size=CHUNK_SIZE):
+    """Offres d'un Parquet du pipeline, lues par lots de lignes"""
+    for batch in pq.ParquetFile(path).iter_batches(batch_size):
+        yield batch.to_pandas(types_mapper={pa.string(): TEXTE, pa.large_string(): TEXTE}.get)
+
+
+def dataframe_chunks(df, batch_size=CHUNK_SIZE):
+    """Lots d'un DataFrame déjà en mémoire"""
+    for debut in range(0, len(df), batch_size):
+        yield df.iloc[debut:debut + batch_size]
+
+
+def offer_text(df):
+    """Texte modélisé : intitulé (compté deux fois), compétences et description, analysés comme pour la recherche"""
+    morceaux = [analyse_column(df[colonne]) for colonne in
+                ('Intitulé du poste', 'Compétences mentionnées', 'Description du poste')]
+    return [" ".join(filter(None, (titre, titre, competences, description)))
+            for titre, competences, description in zip(*morceaux)]
+
+
+# --------------------------------------------------------------
+#  Modèle
+# --------------------------------------------------------------
+
+class OfferModel:
+    """
+    TF-IDF haché (HashingVectorizer, tf sous-linéaire) des offres, familles
+    de métiers par MiniBatchKMeans et classifieurs SGD pour la séniorité et
+    le type de contrat.
+
+    `fit` ne garde jamais plus d'un lot en mémoire : une première passe
+    compte les fréquences documentaires (IDF), une seconde entraîne k-means
+    et les classifieurs par `partial_fit` sur les lots hachés déposés sur
+    disque. Le modèle se sauvegarde avec joblib ; `score` annote de
+    nouvelles offres et `update` poursuit l'apprentissage sur elles, à IDF
+    figée pour ne pas déplacer l'espace des centroïdes.
+    """
+
+    def __init__(self, n_clusters=12, n_features=N_FEATURES, random_state=0):
+        self.n_clusters = n_clusters
+        self.vectorizer = HashingVectorizer(n_features=n_features, analyzer='word', token_pattern=r"\S+",
+                                            lowercase=False, ngram_range=(1, 2), alternate_sign=False, norm=None)
+        self.kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, n_init=3)
+        self.classifiers = {cible: SGDClassifier(loss='log_loss', alpha=1e-5, random_state=random_state)
+                            for cible in CIBLES}
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.n_documents = 0
+        self.idf = None
+        self.termes = {}
+        self.validation = {cible: [0, 0] for cible in CIBLES}  # [bonnes réponses, prédictions]
+        self.date = None
+        self._en_attente = []  # lots trop petits pour un premier partial_fit de k-means
+
+    # ---------------------------------------------------------- vectorisation
+
+    def _hash(self, textes):
+        X = self.vectorizer.transform(textes).tocsr()
+        X.data = 1 + np.log(X.data)
+        return X
+
+    def _count(self, textes):
+        """Première passe : fréquences documentaires et termes lisibles des colonnes hachées"""
+        X = self._hash(textes)
+        self.document_frequency += np.bincount(X.indices, minlength=len(self.document_frequency))
+        self.n_documents += X.shape[0]
+        if len(self.termes) < MAX_TERMES:
+            mots = pc.unique(pc.list_flatten(pc.split_pattern(pa.array(textes, type=pa.string()), " "))).to_pylist()
+            nouveaux = [mot for mot in mots if mot and mot not in self.termes][:MAX_TERMES - len(self.termes)]
+            if nouveaux:
+                self.termes.update(zip(nouveaux, self.vectorizer.transform(nouveaux).tocsr().indices.tolist()))
+        return X
+
+    def transform(self, df, idf=None):
+        """Offres -> matrice TF-IDF creuse, normalisée L2 (`idf` : pondérations à utiliser à la place du modèle)"""
+        return self._tfidf(self._hash(offer_text(df)), idf)
+
+    def _tfidf(self, X, idf=None):
+        idf = self.idf if idf is None else idf
+        return normalize(X @ sparse.diags(np.asarray(idf, dtype=np.float64)), copy=False)
+
+    @staticmethod
+    def _targets(df):
+        """Codes des classes à prédire (-1 : inconnue, exclue de l'apprentissage)"""
+        return {cible: pd.Index(classes).get_indexer(df[cible].astype(object)).astype(np.int8)
+                for cible, classes in CIBLES.items()}
+
+    # ---------------------------------------------------------- apprentissage
+
+    def fit(self, chunks, workdir=None):
+        """
+        Entraîner sur un flux de DataFrames normalisés, par ex.
+        `jsonl_chunks(api_path)` ou `parquet_chunks(path)`, lu une seule fois.
+
+        La première passe hache chaque lot, compte les fréquences documentaires
+        et dépose la matrice creuse dans un répertoire temporaire ; la seconde
+        relit ces matrices pour k-means et les classifieurs, sans réanalyser
+        le texte. La mémoire reste bornée par la taille d'un lot.
+
+        Un corpus de moins de `n_clusters` offres donne une famille par offre ;
+        un corpus vide lève ValueError.
+        """
+        with tempfile.TemporaryDirectory(dir=workdir, prefix="modele-") as tmp:
+            lots = []
+            for i, df in enumerate(chunks):
+                X = self._count(offer_text(df))
+                chemin = os.path.join(tmp, f"lot-{i:05d}")
+                sparse.save_npz(chemin + ".npz", X, compressed=False)
+                np.savez(chemin + "-cibles.npz", **self._targets(df))
+                lots.append(chemin)
+            if not self.n_documents:
+                raise ValueError("aucune offre à modéliser")
+            self.idf = (np.log((1 + self.n_documents) / (1 + self.document_frequency)) + 1).astype(np.float32)
+            if 0 < self.n_documents < self.n_clusters:
+                self.n_clusters = self.n_documents
+                self.kmeans.set_params(n_clusters=self.n_documents)
+            for i, chemin in enumerate(lots):
+                with np.load(chemin + "-cibles.npz") as cibles:
+                    self._partial_fit(self._tfidf(sparse.load_npz(chemin + ".npz")), dict(cibles), evaluate=i > 0)
+        self.date = datetime.now().isoformat()
+        return self
+
+    def update(self, df):
+        """Poursuivre l'apprentissage sur de nouvelles offres (IDF inchangée)"""
+        self._partial_fit(self.transform(df), self._targets(df), evaluate=True)
+        self.date = datetime.now().isoformat()
+        return self
+
+    def _partial_fit(self, X, cibles, evaluate):
+        self._partial_fit_kmeans(X)
+        for cible, classes in CIBLES.items():
+            codes = cibles[cible]
+            connus = codes >= 0
+            if not connus.any():
+                continue
+            y = np.asarray(classes, dtype=object)[codes[connus]]
+            classifier = self.classifiers[cible]
+            # Validation progressive : chaque lot est prédit avant d'être appris
+            if evaluate and hasattr(classifier, 'coef_'):
+                self.validation[cible][0] += int((classifier.predict(X[connus]) == y).sum())
+                self.validation[cible][1] += len(y)
+            classifier.partial_fit(X[connus], y, classes=classes)
+
+    def _partial_fit_kmeans(self, X):
+        """Le premier partial_fit de k-means demande `n_clusters` lignes : les lots plus petits sont cumulés"""
+        if not hasattr(self.kmeans, 'cluster_centers_'):
+            self._en_attente.append(X)
+            X = sparse.vstack(self._en_attente, format='csr')
+            if X.shape[0] < self.n_clusters:
+                return
+            self._en_attente = []
+        self.kmeans.partial_fit(X)
+
+    # ---------------------------------------------------------- prédiction
+
+    def score(self, df):
+        """Famille de métier, séniorité et contrat prédits pour chaque offre de `df`"""
+        X = self.transform(df)
+        familles = self.kmeans.predict(X)
+        libelles = self.family_labels()
+        resultat = pd.DataFrame({
+            'Identifiant': df['Identifiant'].to_numpy(),
+            'Famille de métier': familles.astype(np.int16),
+            'Libellé de la famille': pd.Categorical.from_codes(familles, categories=libelles),
+        }, index=df.index)
+        for cible, classifier in self.classifiers.items():
+            if not hasattr(classifier, 'coef_'):
+                continue
+            probas = classifier.predict_proba(X)
+            resultat[f"{cible} (prédit)"] = pd.Categorical.from_codes(
+                probas.argmax(axis=1), categories=list(classifier.classes_))
+            resultat[f"Confiance {cible.lower()}"] = probas.max(axis=1).astype(np.float32)
+        return resultat
+
+    def family_labels(self, top=4):
+        """Nom de chaque famille : ses termes les plus lourds (parmi les termes connus), ex. « data / engineer / spark »"""
+        termes = np.array(list(self.termes), dtype=object)
+        colonnes = np.fromiter(self.termes.values(), dtype=np.int64, count=len(self.termes))
+        poids = self.kmeans.cluster_centers_[:, colonnes]
+        libelles = []
+        for famille, ligne in enumerate(poids):
+            meilleurs = termes[np.argsort(-ligne, kind='stable')[:top]]
+            libelles.append(f"{famille:02d} " + " / ".join(meilleurs))
+        return libelles
+
+    def report(self):
+        """Résumé sérialisable en JSON : familles et précision en validation progressive"""
+        return {
+            "date": self.date,
+            "documents": int(self.n_documents),
+            "familles": self.family_labels(),
+            "precision_validation": {
+                cible: round(bons / total, 4) if total else None
+                for cible, (bons, total) in self.validation.items()
+            },
+        }
+
+    # ---------------------------------------------------------- persistance
+
+    def save(self, path=MODEL_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(self, path, compress=3)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        return joblib.load(path)
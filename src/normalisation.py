@@ -0,0 +1,293 @@
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+from salary_parsing import parse_experience, parse_salaries
+from storage import batched, compression_from_path, flatten_offer, iter_jsonl
+
+# ==============================================================
+#  Normalisation des offres vers le schéma commun du projet
+# ==============================================================
+
+NON_SPECIFIE = 'Non spécifié'
+SOURCE_API = 'France Travail'
+URL_OFFRE_API = "https://candidat.francetravail.fr/offres/recherche/detail/"
+
+# Les 12 colonnes du README (clés des offres scrapées), l'identifiant, l'URL
+# et la fourchette salariale convertie en euros annuels
+COLONNES = [
+    'Identifiant',
+    'Intitulé du poste',
+    'Nom de l entreprise',
+    'Ville ou région',
+    'Date de publication',
+    'Type de contrat',
+    'Nombre d années d expérience demandées',
+    'Niveau de seniorité',
+    'Description du poste',
+    'Source',
+    'Télétravail',
+    'Compétences mentionnées',
+    'Fourchette salariale',
+    'Salaire annuel min',
+    'Salaire annuel max',
+    'URL',
+]
+
+# --------------------------------------------------------------
+#  Types des colonnes
+# --------------------------------------------------------------
+
+# Chaînes stockées dans des tampons Arrow (pas un objet Python par cellule)
+TEXTE = pd.StringDtype("pyarrow")
+
+CONTRATS = pd.CategoricalDtype(
+    ['CDI', 'CDD', 'Intérim', 'Stage', 'Alternance', 'Freelance', 'Saisonnier', 'Autre', NON_SPECIFIE])
+SENIORITES = pd.CategoricalDtype(['Étudiant', 'Junior', 'Confirmé', 'Senior', NON_SPECIFIE])
+TELETRAVAIL = pd.CategoricalDtype(['Oui', 'Hybride', 'Non', NON_SPECIFIE])
+
+TYPES = {
+    'Identifiant': TEXTE,
+    'Intitulé du poste': TEXTE,
+    'Nom de l entreprise': TEXTE,
+    'Ville ou région': TEXTE,
+    'Date de publication': 'datetime64[ns]',
+    'Type de contrat': CONTRATS,
+    'Nombre d années d expérience demandées': 'float32',
+    'Niveau de seniorité': SENIORITES,
+    'Description du poste': TEXTE,
+    # Catégories construites après concaténation : les sites du registre peuvent évoluer
+    'Source': 'category',
+    'Télétravail': TELETRAVAIL,
+    'Compétences mentionnées': TEXTE,
+    'Fourchette salariale': TEXTE,
+    'Salaire annuel min': 'float32',
+    'Salaire annuel max': 'float32',
+    'URL': TEXTE,
+}
+
+# Codes typeContrat de l'API -> libellés du projet (les autres codes : « Autre »)
+CONTRATS_API = {'CDI': 'CDI', 'CDD': 'CDD', 'MIS': 'Intérim', 'SAI': 'Saisonnier', 'LIB': 'Freelance'}
+
+# --------------------------------------------------------------
+#  Expressions compilées (appliquées colonne par colonne)
+# --------------------------------------------------------------
+
+STAGE_RE = re.compile(r"\bstag(?:e|iaire)\b", re.I)
+HYBRIDE_RE = re.compile(r"hybride", re.I)
+TELETRAVAIL_RE = re.compile(r"t[ée]l[ée]travail|remote", re.I)
+
+
+def salaire_annuel(libelles):
+    """Fourchette libre -> (min, max) en euros annuels, NaN si non reconnue (cf. salary_parsing)"""
+    salaires = parse_salaries(libelles)
+    return salaires['salaire_min'], salaires['salaire_max']
+
+
+def experience_annees(libelles):
+    """« 2 An(s) » -> 2, « 6 Mois » -> 0.5, « Débutant accepté » -> 0, NaN sinon (cf. salary_parsing)"""
+    return parse_experience(libelles)['annees']
+
+
+def seniorite(annees):
+    """Années d'expérience -> Junior (< 2), Confirmé (< 5) ou Senior"""
+    niveaux = pd.cut(annees, [-np.inf, 2, 5, np.inf], right=False, labels=['Junior', 'Confirmé', 'Senior'])
+    return niveaux.astype(str).where(niveaux.notna(), NON_SPECIFIE).astype(SENIORITES)
+
+
+def _categorie(serie, dtype, defaut=NON_SPECIFIE):
+    """Valeurs hors du vocabulaire de `dtype` -> `defaut`"""
+    serie = serie.astype(TEXTE).str.strip()
+    return serie.where(serie.isin(dtype.categories), defaut).fillna(defaut).astype(dtype)
+
+
+def _texte(serie, defaut=None):
+    serie = serie.astype(TEXTE)
+    return serie.fillna(defaut) if defaut is not None else serie
+
+
+def identifiant_scraping(df):
+    """
+    Identifiant stable d'une offre scrapée : empreinte de la source, de
+    l'URL, du titre, de l'entreprise et de la ville (LinkedIn et Glassdoor
+    renvoient souvent l'URL de la page de recherche pour toutes les cartes).
+    """
+    cles = df['Source'].astype(TEXTE).fillna('').str.cat(
+        [df[c].astype(TEXTE).fillna('') for c in
+         ('URL', 'Intitulé du poste', 'Nom de l entreprise', 'Ville ou région')], sep='|')
+    return pd.Series(['SC-' + hashlib.sha1(cle.encode('utf-8')).hexdigest()[:16] for cle in cles],
+                     index=df.index, dtype=TEXTE)
+
+
+# --------------------------------------------------------------
+#  Lecture des offres brutes de l'API
+# --------------------------------------------------------------
+
+# Champs de l'offre France Travail utiles au schéma commun -> colonnes de flatten_offer
+CHAMPS_API = {
+    'id': 'id',
+    'intitule': 'intitule',
+    'description': 'description',
+    'dateCreation': 'date_creation',
+    'lieuTravail.libelle': 'lieu_libelle',
+    'entreprise.nom': 'entreprise_nom',
+    'typeContrat': 'type_contrat',
+    'experienceLibelle': 'experience_libelle',
+    'competences.libelle': 'competences',
+    'salaire.libelle': 'salaire_libelle',
+    'alternance': 'alternance',
+    'origineOffre.urlOrigine': 'origine_url',
+}
+
+
+def _api_schema():
+    import pyarrow as pa
+
+    def struct(champ):
+        return pa.struct([(champ, pa.string())])
+
+    return pa.schema([
+        ('id', pa.string()), ('intitule', pa.string()), ('description', pa.string()),
+        ('dateCreation', pa.string()), ('lieuTravail', struct('libelle')), ('entreprise', struct('nom')),
+        ('typeContrat', pa.string()), ('experienceLibelle', pa.string()),
+        ('competences', pa.list_(struct('libelle'))), ('salaire', struct('libelle')),
+        ('alternance', pa.bool_()), ('origineOffre', struct('urlOrigine')),
+    ])
+
+
+def read_api(path):
+    """
+    Colonnes utiles des offres brutes, lues par le lecteur JSON d'Arrow.
+
+    Le décodage (C++, multi-thread) se limite aux champs de CHAMPS_API ; les
+    compétences sont jointes en « a, b, c » sans repasser par Python.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.json as pj
+
+    options = pj.ParseOptions(explicit_schema=_api_schema(), unexpected_field_behavior='ignore')
+    with pa.input_stream(path, compression=compression_from_path(path)) as stream:
+        table = pj.read_json(stream, parse_options=options)
+
+    colonnes = {}
+    for champ, colonne in CHAMPS_API.items():
+        parent, _, enfant = champ.partition('.')
+        valeurs = table.column(parent)
+        if colonne == 'competences':
+            listes = valeurs.combine_chunks()
+            libelles = pa.ListArray.from_arrays(listes.offsets, listes.values.field(enfant), mask=listes.is_null())
+            valeurs = pc.binary_join(libelles, ', ')
+        elif enfant:
+            valeurs = pc.struct_field(valeurs, [enfant])
+        colonnes[colonne] = valeurs
+    return pa.table(colonnes).to_pandas(types_mapper={pa.string(): TEXTE}.get)
+
+
+def read_api_records(path, batch_size=50000):
+    """Repli en Python pur (flatten_offer) pour un JSONL que le lecteur Arrow refuse"""
+    for batch in batched(iter_jsonl(path), batch_size):
+        flat = pd.DataFrame.from_records([flatten_offer(o) for o in batch], columns=list(CHAMPS_API.values()))
+        flat['competences'] = flat['competences'].str.join(', ')
+        yield flat
+
+
+# --------------------------------------------------------------
+#  Normalisation par source
+# --------------------------------------------------------------
+
+def normalise_api(flat):
+    """Offres France Travail (colonnes de read_api) -> schéma commun"""
+    description = _texte(flat['description'], '')
+    intitule = _texte(flat['intitule'])
+    annees = experience_annees(flat['experience_libelle'])
+    bas, haut = salaire_annuel(flat['salaire_libelle'])
+
+    contrat = flat['type_contrat'].map(CONTRATS_API).fillna('Autre')
+    contrat = contrat.mask(intitule.str.contains(STAGE_RE).fillna(False).astype(bool), 'Stage')
+    contrat = contrat.mask(flat['alternance'].fillna(False).astype(bool), 'Alternance')
+
+    teletravail = pd.Series(NON_SPECIFIE, index=flat.index)
+    teletravail = teletravail.mask(description.str.contains(TELETRAVAIL_RE), 'Oui')
+    teletravail = teletravail.mask(description.str.contains(HYBRIDE_RE), 'Hybride')
+
+    competences = _texte(flat['competences'])
+    url = _texte(flat['origine_url']).fillna(URL_OFFRE_API + flat['id'].astype(TEXTE))
+
+    df = pd.DataFrame({
+        'Identifiant': 'FT-' + flat['id'].astype(TEXTE),
+        'Intitulé du poste': intitule,
+        'Nom de l entreprise': _texte(flat['entreprise_nom'], NON_SPECIFIE),
+        'Ville ou région': _texte(flat['lieu_libelle'], 'France'),
+        'Date de publication': pd.to_datetime(flat['date_creation'], utc=True, format='ISO8601').dt.tz_localize(None),
+        'Type de contrat': contrat.astype(CONTRATS),
+        'Nombre d années d expérience demandées': annees,
+        'Niveau de seniorité': seniorite(annees),
+        'Description du poste': description,
+        'Source': SOURCE_API,
+        'Télétravail': teletravail.astype(TELETRAVAIL),
+        'Compétences mentionnées': competences.mask(competences.fillna('') == '', NON_SPECIFIE),
+        'Fourchette salariale': _texte(flat['salaire_libelle'], NON_SPECIFIE),
+        'Salaire annuel min': bas,
+        'Salaire annuel max': haut,
+        'URL': url,
+    }, index=flat.index)
+    return df.astype(TYPES)
+
+
+def normalise_scraped(raw):
+    """Offres scrapées (dictionnaires aux clés du README) -> schéma commun"""
+    raw = raw.reindex(columns=COLONNES)
+    bas, haut = salaire_annuel(raw['Fourchette salariale'])
+    df = pd.DataFrame({
+        'Identifiant': identifiant_scraping(raw),
+        'Intitulé du poste': _texte(raw['Intitulé du poste']),
+        'Nom de l entreprise': _texte(raw['Nom de l entreprise'], NON_SPECIFIE),
+        'Ville ou région': _texte(raw['Ville ou région'], 'France'),
+        'Date de publication': pd.to_datetime(raw['Date de publication'], format="%d/%m/%Y", errors='coerce'),
+        'Type de contrat': _categorie(raw['Type de contrat'], CONTRATS, 'Autre'),
+        'Nombre d années d expérience demandées': experience_annees(raw['Nombre d années d expérience demandées']),
+        'Niveau de seniorité': _categorie(raw['Niveau de seniorité'], SENIORITES),
+        'Description du poste': _texte(raw['Description du poste'], ''),
+        'Source': _texte(raw['Source'], NON_SPECIFIE),
+        'Télétravail': _categorie(raw['Télétravail'], TELETRAVAIL),
+        'Compétences mentionnées': _texte(raw['Compétences mentionnées'], NON_SPECIFIE),
+        'Fourchette salariale': _texte(raw['Fourchette salariale'], NON_SPECIFIE),
+        'Salaire annuel min': bas,
+        'Salaire annuel max': haut,
+        'URL': _texte(raw['URL']),
+    }, index=raw.index)
+    return df.astype(TYPES)
+
+
+def load_normalised(api_path=None, scraping_path=None, batch_size=50000):
+    """
+    Lire les collectes JSONL et retourner un DataFrame typé au schéma commun.
+
+    Les offres de l'API passent par le lecteur JSON d'Arrow ; en cas de
+    contenu inattendu, elles sont relues par lots de `batch_size` en Python.
+    """
+    import pyarrow as pa
+
+    frames = []
+    if api_path:
+        try:
+            frames.append(normalise_api(read_api(api_path)))
+        except pa.ArrowInvalid as e:
+            print(f"⚠️ Lecture Arrow impossible ({e}), relecture ligne à ligne")
+            frames.extend(normalise_api(flat) for flat in read_api_records(api_path, batch_size))
+    if scraping_path:
+        for batch in batched(iter_jsonl(scraping_path), batch_size):
+            frames.append(normalise_scraped(pd.DataFrame.from_records(batch)))
+    if not frames:
+        return pd.DataFrame({colonne: pd.Series(dtype=dtype) for colonne, dtype in TYPES.items()})
+    df = pd.concat(frames, ignore_index=True)
+    df['Source'] = df['Source'].astype('category')
+    return df
+
+
+def memory_mb(df):
+    """Empreinte mémoire réelle d'un DataFrame (chaînes comprises), en Mo"""
+    return df.memory_usage(deep=True).sum() / 2 ** 20
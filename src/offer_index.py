@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+# ==============================================================
+#  Index persistant des offres (collecte incrémentale)
+# ==============================================================
+
+# Champs ajoutés par la collecte, exclus de l'empreinte du contenu
+CHAMPS_COLLECTE = ("metier_recherche",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS offres (
+    id TEXT PRIMARY KEY,
+    date_actualisation TEXT,
+    content_hash TEXT NOT NULL,
+    premiere_vue TEXT NOT NULL,
+    derniere_vue TEXT NOT NULL,
+    supprimee_le TEXT,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS historique (
+    id TEXT NOT NULL,
+    collecte TEXT NOT NULL,
+    evenement TEXT NOT NULL,
+    date_actualisation TEXT,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_historique_id ON historique(id);
+CREATE TABLE IF NOT EXISTS collectes (
+    collecte TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    fin TEXT,
+    nouvelles INTEGER DEFAULT 0,
+    modifiees INTEGER DEFAULT 0,
+    inchangees INTEGER DEFAULT 0,
+    supprimees INTEGER DEFAULT 0
+);
+"""
+
+
+def content_hash(offer):
+    """Empreinte stable du contenu d'une offre"""
+    contenu = {k: v for k, v in offer.items() if k not in CHAMPS_COLLECTE}
+    data = json.dumps(contenu, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class OfferIndex:
+    """
+    Index SQLite des offres déjà collectées, clé = `id` de l'offre.
+
+    Conserve pour chaque offre sa `dateActualisation`, l'empreinte de son
+    contenu, ses dates de première/dernière observation et de suppression,
+    ainsi qu'un historique des évènements utilisable pour les tendances.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------------------------------------------------- collectes
+
+    def start_run(self, mode):
+        """Enregistrer le début d'une collecte et retourner son identifiant"""
+        collecte = datetime.now().isoformat()
+        with self.conn:
+            self.conn.execute("INSERT INTO collectes (collecte, mode) VALUES (?, ?)", (collecte, mode))
+        return collecte
+
+    def finish_run(self, collecte, stats):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE collectes SET fin = ?, nouvelles = ?, modifiees = ?, inchangees = ?, supprimees = ? "
+                "WHERE collecte = ?",
+                (datetime.now().isoformat(), stats.get("nouvelles", 0), stats.get("modifiees", 0),
+                 stats.get("inchangees", 0), stats.get("supprimees", 0), collecte))
+
+    def last_run(self):
+        """Date de fin de la dernière collecte terminée (ou None)"""
+        row = self.conn.execute("SELECT MAX(fin) FROM collectes WHERE fin IS NOT NULL").fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    # ---------------------------------------------------------- offres
+
+    def upsert(self, offers, collecte):
+        """
+        Insérer ou mettre à jour un lot d'offres.
+
+        Retourne le nombre d'offres nouvelles, modifiées et inchangées ; seules
+        les deux premières catégories sont réécrites.
+        """
+        stats = {"nouvelles": 0, "modifiees": 0, "inchangees": 0}
+        connues = self._known_hashes([o["id"] for o in offers])
+        with self.conn:
+            for offer in offers:
+                offer_id = offer["id"]
+                empreinte = content_hash(offer)
+                ancienne = connues.get(offer_id)
+                if ancienne == empreinte:
+                    stats["inchangees"] += 1
+                    self.conn.execute(
+                        "UPDATE offres SET derniere_vue = ?, supprimee_le = NULL WHERE id = ?",
+                        (collecte, offer_id))
+                    continue
+
+                evenement = "nouvelle" if ancienne is None else "modification"
+                stats["nouvelles" if ancienne is None else "modifiees"] += 1
+                self.conn.execute(
+                    "INSERT INTO offres (id, date_actualisation, content_hash, premiere_vue, derniere_vue, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET date_actualisation = excluded.date_actualisation, "
+                    "content_hash = excluded.content_hash, derniere_vue = excluded.derniere_vue, "
+                    "supprimee_le = NULL, payload = excluded.payload",
+                    (offer_id, offer.get("dateActualisation"), empreinte, collecte, collecte,
+                     json.dumps(offer, ensure_ascii=False)))
+                self.conn.execute(
+                    "INSERT INTO historique (id, collecte, evenement, date_actualisation, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (offer_id, collecte, evenement, offer.get("dateActualisation"), empreinte))
+                connues[offer_id] = empreinte
+        return stats
+
+    def mark_deleted(self, collecte):
+        """Marquer comme supprimées les offres actives absentes d'une collecte complète"""
+        with self.conn:
+            disparues = [row[0] for row in self.conn.execute(
+                "SELECT id FROM offres WHERE supprimee_le IS NULL AND derniere_vue < ?", (collecte,))]
+            self.conn.executemany("UPDATE offres SET supprimee_le = ? WHERE id = ?",
+                                  ((collecte, i) for i in disparues))
+            self.conn.executemany(
+                "INSERT INTO historique (id, collecte, evenement) VALUES (?, ?, 'suppression')",
+                ((i, collecte) for i in disparues))
+        return len(disparues)
+
+    def iter_offers(self, include_deleted=False):
+        """Parcourir les offres stockées (actives par défaut)"""
+        query = "SELECT payload FROM offres"
+        if not include_deleted:
+            query += " WHERE supprimee_le IS NULL"
+        for (payload,) in self.conn.execute(query + " ORDER BY premiere_vue, id"):
+            yield json.loads(payload)
+
+    def count(self, include_deleted=False):
+        query = "SELECT COUNT(*) FROM offres"
+        if not include_deleted:
+            query += " WHERE supprimee_le IS NULL"
+        return self.conn.execute(query).fetchone()[0]
+
+    def _known_hashes(self, ids):
+        connues = {}
+        ids = list(dict.fromkeys(ids))
+        for i in range(0, len(ids), 500):
+            lot = ids[i:i + 500]
+            placeholders = ",".join("?" * len(lot))
+            connues.update(self.conn.execute(
+                f"SELECT id, content_hash FROM offres WHERE id IN ({placeholders})", lot))
+        return connues
@@ -0,0 +1,257 @@
+import base64
+import json
+import os
+from datetime import datetime
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from checkpoint import atomic_write_json
+from geo import PRECISIONS
+from normalisation import TEXTE, TYPES
+
+# ==============================================================
+#  Entrepôt colonnaire des offres : fichiers Arrow partitionnés par
+#  mois de collecte et source, ouverts par projection de mémoire
+# ==============================================================
+
+OFFER_STORE_DIR = 'data/pipeline/store'
+MANIFEST = 'manifest.json'
+# Arrow IPC non compressé : les colonnes sont lues sans copie depuis le
+# fichier projeté en mémoire. Parquet (zstd) est plus compact mais se décode.
+FORMATS = {'arrow': '.arrow', 'parquet': '.parquet'}
+COLLECTE = 'Date de collecte'
+EMPREINTE = '_empreinte'
+DICTIONNAIRE = pa.dictionary(pa.int32(), pa.string())
+
+
+def _slug(valeur):
+    return quote(str(valeur), safe='')
+
+
+def _table(df):
+    """DataFrame -> table Arrow aux types stables d'un fichier à l'autre (catégories en dictionnaires int32)"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    champs = [pa.field(f.name, DICTIONNAIRE) if pa.types.is_dictionary(f.type)
+              else pa.field(f.name, pa.string()) if pa.types.is_large_string(f.type) else f
+              for f in table.schema]
+    return table.cast(pa.schema(champs))
+
+
+def fingerprints(df):
+    """Empreinte de contenu de chaque offre (toutes colonnes hors date de collecte)"""
+    colonnes = [c for c in df.columns if c not in (COLLECTE, EMPREINTE)]
+    return pd.util.hash_pandas_object(df[colonnes], index=False).to_numpy()
+
+
+class OfferStore:
+    """
+    Historique des offres en fichiers colonnaires :
+    `<racine>/mois=AAAA-MM/source=<Source>/part-*.arrow` et un manifeste
+    (fichiers, lignes, bornes des dates de publication, schéma commun).
+
+    Une offre est rangée dans le mois de sa première collecte ; une offre
+    dont le contenu change est réécrite dans son fichier d'origine. La
+    lecture part du manifeste : les mois et sources demandés sont élagués
+    sans lister ni ouvrir les autres fichiers, puis seules les colonnes
+    demandées sont lues, fichiers projetés en mémoire, le filtre étant
+    poussé dans le scanner Arrow.
+    """
+
+    def __init__(self, root=OFFER_STORE_DIR, format='arrow'):
+        if format not in FORMATS:
+            raise ValueError(f"Format inconnu : {format}")
+        self.root = root
+        self.format = format
+        self.filesystem = pafs.LocalFileSystem(use_mmap=True)
+        self.manifest = self._read_manifest()
+
+    # ---------------------------------------------------------- manifeste
+
+    def _read_manifest(self):
+        chemin = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(chemin):
+            return {"format": self.format, "schema": None, "fichiers": {}}
+        with open(chemin, encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.format = manifest["format"]
+        return manifest
+
+    def _save_manifest(self):
+        self.manifest["mise_a_jour"] = datetime.now().isoformat()
+        atomic_write_json(os.path.join(self.root, MANIFEST), self.manifest)
+
+    @property
+    def schema(self):
+        encode = self.manifest["schema"]
+        return pa.ipc.read_schema(pa.py_buffer(base64.b64decode(encode))) if encode else None
+
+    def _merge_schema(self, schema):
+        """Schéma commun à tous les fichiers (une colonne ajoutée par une étape récente est nulle ailleurs)"""
+        schema = schema.remove_metadata()
+        if self.schema is not None:
+            schema = pa.unify_schemas([self.schema, schema])
+        self.manifest["schema"] = base64.b64encode(schema.serialize().to_pybytes()).decode('ascii')
+        return schema
+
+    def __len__(self):
+        return sum(f["lignes"] for f in self.manifest["fichiers"].values())
+
+    @property
+    def months(self):
+        return sorted({f["mois"] for f in self.manifest["fichiers"].values()})
+
+    @property
+    def sources(self):
+        return sorted({f["source"] for f in self.manifest["fichiers"].values()})
+
+    def files(self, months=None, sources=None, since=None, until=None):
+        """Fichiers des mois / sources demandés et dont les dates de publication recoupent [since, until]"""
+        # Bornes comparées en dates, comme le filtre du scanner (pas en chaînes : « 2024-01-05 00:00:00 » > « 2024-01-05 »)
+        since = pd.Timestamp(since) if since is not None else None
+        until = pd.Timestamp(until) if until is not None else None
+        retenus = []
+        for nom, f in sorted(self.manifest["fichiers"].items()):
+            if months is not None and f["mois"] not in months:
+                continue
+            if sources is not None and f["source"] not in sources:
+                continue
+            if since is not None and f["publication_max"] and pd.Timestamp(f["publication_max"]) < since:
+                continue
+            if until is not None and f["publication_min"] and pd.Timestamp(f["publication_min"]) > until:
+                continue
+            retenus.append(nom)
+        return retenus
+
+    # ---------------------------------------------------------- écriture
+
+    def _write_file(self, table, mois, source):
+        relatif = os.path.join(f"mois={mois}", f"source={_slug(source)}",
+                               f"part-{datetime.now():%Y%m%d%H%M%S%f}{FORMATS[self.format]}")
+        chemin = os.path.join(self.root, relatif)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        if self.format == 'arrow':
+            with pa.OSFile(chemin, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(table, chemin, compression='zstd')
+        bornes = pc.min_max(table.column('Date de publication')).as_py()
+        self.manifest["fichiers"][relatif] = {
+            "mois": mois, "source": source, "lignes": table.num_rows, "octets": os.path.getsize(chemin),
+            "publication_min": pd.Timestamp(bornes["min"]).isoformat() if bornes["min"] is not None else None,
+            "publication_max": pd.Timestamp(bornes["max"]).isoformat() if bornes["max"] is not None else None,
+        }
+        return relatif
+
+    def _stored(self):
+        """Identifiants (Arrow), empreintes et fichiers des offres déjà rangées (deux colonnes lues par fichier)"""
+        identifiants, empreintes, fichiers = [], [], []
+        for nom in self.manifest["fichiers"]:
+            table = self._dataset([nom]).to_table(columns=['Identifiant', EMPREINTE])
+            identifiants.extend(table.column('Identifiant').chunks)
+            empreintes.append(table.column(EMPREINTE).to_numpy())
+            fichiers.append(np.full(table.num_rows, nom, dtype=object))
+        if not fichiers:
+            return pa.array([], type=pa.string()), np.array([], dtype=np.uint64), np.array([], dtype=object)
+        return pa.concat_arrays(identifiants), np.concatenate(empreintes), np.concatenate(fichiers)
+
+    def write(self, df, collected=None):
+        """
+        Ranger les offres de `df` (schéma commun du pipeline) collectées le
+        `collected` (maintenant par défaut). Retourne les effectifs
+        {"nouvelles", "modifiees", "inchangees"}.
+        """
+        collected = pd.Timestamp(collected or datetime.now()).floor('s')
+        df = df.drop_duplicates('Identifiant', keep='last').reset_index(drop=True)
+        df[EMPREINTE] = fingerprints(df)
+        identifiants, empreintes, rangees = self._stored()
+        # Position de chaque offre parmi celles déjà rangées (-1 : nouvelle), calculée en Arrow
+        rangs = pc.index_in(pa.array(df['Identifiant'], type=pa.string()),
+                            value_set=identifiants).fill_null(-1).to_numpy()
+        connues = rangs >= 0
+        fichiers = np.full(len(df), None, dtype=object)
+        fichiers[connues] = rangees[rangs[connues]]
+        modifiees = np.zeros(len(df), dtype=bool)
+        modifiees[connues] = empreintes[rangs[connues]] != df[EMPREINTE].to_numpy()[connues]
+
+        # Offres modifiées : leur fichier d'origine est réécrit avec la nouvelle version
+        for nom in pd.unique(fichiers[modifiees]):
+            self._rewrite(nom, df[modifiees & (fichiers == nom)])
+
+        # Nouvelles offres : un fichier par (mois de collecte, source)
+        nouvelles = df[~connues].assign(**{COLLECTE: collected})
+        if len(nouvelles):
+            table = self._conform(_table(nouvelles))
+            sources = nouvelles['Source'].astype(str).to_numpy()
+            for source in sorted(set(sources)):
+                self._write_file(table.take(np.flatnonzero(sources == source)), collected.strftime('%Y-%m'), source)
+        self._save_manifest()
+        return {"nouvelles": int((~connues).sum()), "modifiees": int(modifiees.sum()),
+                "inchangees": int(connues.sum() - modifiees.sum())}
+
+    def _conform(self, table):
+        """Convertir `table` aux types du schéma commun, étendu à ses nouvelles colonnes"""
+        connu = self.schema
+        if connu is not None:
+            table = table.cast(pa.schema([connu.field(f.name) if f.name in connu.names else f for f in table.schema]))
+        self._merge_schema(table.schema)
+        return table
+
+    def _rewrite(self, nom, remplacantes):
+        """Remplacer dans le fichier `nom` les offres de `remplacantes` (leur date de collecte est conservée)"""
+        infos = self.manifest["fichiers"][nom]
+        ancien = self._dataset([nom]).to_table().to_pandas(types_mapper=_types_mapper)
+        collecte = ancien.set_index('Identifiant')[COLLECTE]
+        remplacantes = remplacantes.assign(**{COLLECTE: collecte.reindex(remplacantes['Identifiant']).to_numpy()})
+        garde = ancien[~ancien['Identifiant'].isin(remplacantes['Identifiant'])]
+        table = self._conform(_table(pd.concat([garde, remplacantes], ignore_index=True)))
+        self._write_file(table, infos["mois"], infos["source"])
+        del self.manifest["fichiers"][nom]
+        os.remove(os.path.join(self.root, nom))
+
+    # ---------------------------------------------------------- lecture
+
+    def _dataset(self, fichiers):
+        return ds.dataset([os.path.join(self.root, nom) for nom in fichiers], schema=self.schema,
+                          format='ipc' if self.format == 'arrow' else 'parquet', filesystem=self.filesystem)
+
+    def scan(self, columns=None, filter=None, months=None, sources=None, since=None, until=None):
+        """
+        Table Arrow des offres retenues. `filter` : expression pyarrow
+        (`ds.field('Type de contrat') == 'CDI'`) ou filtres à la pandas
+        (`[('Type de contrat', '=', 'CDI')]`) ; since / until bornent la date
+        de publication et élaguent les fichiers via le manifeste.
+        """
+        if isinstance(filter, list):
+            filter = pq.filters_to_expression(filter)
+        for borne, operateur in ((since, '>='), (until, '<=')):
+            if borne is not None:
+                condition = pq.filters_to_expression([('Date de publication', operateur, pd.Timestamp(borne))])
+                filter = condition if filter is None else filter & condition
+        if self.schema is None:
+            return pa.table({})
+        if columns is None:
+            columns = [nom for nom in self.schema.names if nom != EMPREINTE]
+        fichiers = self.files(months, sources, since, until)
+        if not fichiers:
+            return self.schema.empty_table().select(columns)
+        return self._dataset(fichiers).to_table(columns=columns, filter=filter)
+
+    def load(self, columns=None, filter=None, months=None, sources=None, since=None, until=None):
+        """Comme `scan`, en DataFrame aux types du pipeline (chaînes Arrow sans copie, catégories d'origine)"""
+        df = self.scan(columns, filter, months, sources, since, until).to_pandas(types_mapper=_types_mapper,
+                                                                                 self_destruct=True)
+        for colonne, dtype in dict(TYPES, **{'Précision géo': PRECISIONS}).items():
+            if colonne in df and isinstance(dtype, pd.CategoricalDtype):
+                df[colonne] = df[colonne].cat.set_categories(dtype.categories)
+        return df
+
+
+def _types_mapper(type_):
+    return TEXTE if type_ in (pa.string(), pa.large_string()) else None
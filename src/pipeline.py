@@ -0,0 +1,549 @@
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pandas as pd
+
+from analytics import market_analytics
+from cdc import CurrentOffers, capture
+from checkpoint import atomic_write_json
+from dedup import match_to_reference
+from geo import COLONNES_GEO, REFERENCE_DIR, geocode, region_summary
+from modeling import OfferModel, parquet_chunks
+from normalisation import NON_SPECIFIE, SOURCE_API, TEXTE, load_normalised, memory_mb
+from offer_store import MANIFEST as STORE_MANIFEST, OfferStore
+from salary_parsing import EXPERIENCE_PARSER, SALARY_PARSER, parsing_report
+from search_index import SearchIndex
+from similar import META as SIMILAR_META, OfferEmbedder, SimilarityIndex, content_fingerprints
+from skills import DEFAULT_EXTRACTOR
+from storage import JsonlWriter
+
+# ==============================================================
+#  Pipeline : collecte -> normalisation -> dédoublonnage -> géographie -> enrichissement
+#             -> analyse / index / entrepôt / modèle -> similaires
+# ==============================================================
+
+PIPELINE_DIR = 'data/pipeline'
+MANIFEST = 'manifest.json'
+
+
+@dataclass
+class Stage:
+    """
+    Étape du pipeline : `func(inputs, output, **params)` lit les sorties des
+    étapes `deps` ({nom: chemin}) et écrit `output`.
+
+    La clé de cache combine le code de la fonction, `params`, l'empreinte
+    du contenu des entrées et celle des `sources` : modules importables
+    ("skills") ou fichiers / dossiers de données dont le résultat dépend
+    (taxonomie, motifs de parsing, référentiels). Une étape dont rien n'a
+    changé n'est pas rejouée. Les étapes sans dépendance (collectes) sont
+    rejouées au-delà de `max_age` heures. Une étape `optional` peut échouer
+    sans bloquer les suivantes, qui reçoivent alors None pour cette entrée.
+
+    Une étape `in_place` met à jour sa sortie (index, base SQLite) et peut
+    légitimement la laisser intacte quand ses entrées n'apportent rien de
+    nouveau ; les autres doivent la réécrire à chaque exécution.
+    """
+    name: str
+    func: object
+    output: str
+    deps: tuple = ()
+    params: dict = field(default_factory=dict)
+    max_age: float = None
+    optional: bool = False
+    sources: tuple = ()
+    in_place: bool = False
+
+    def key(self, input_hashes):
+        try:
+            source = inspect.getsource(self.func)
+        except (OSError, TypeError):  # fonction définie dynamiquement
+            source = getattr(self.func, '__qualname__', repr(self.func))
+        payload = json.dumps({"etape": self.name, "code": source, "params": self.params,
+                              "entrees": input_hashes,
+                              "sources": {nom: sources_hash(nom) for nom in self.sources}},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def sources_hash(source):
+    """
+    Empreinte d'une source d'étape : fichier ou dossier (tous ses fichiers,
+    dans l'ordre des chemins), sinon module importable depuis src/.
+    """
+    if os.path.isdir(source):
+        chemins = sorted(os.path.join(racine, nom) for racine, _, noms in os.walk(source)
+                         for nom in noms if not nom.endswith('.pyc'))
+    elif os.path.isfile(source):
+        chemins = [source]
+    else:
+        spec = importlib.util.find_spec(source)
+        if spec is None or not spec.origin:
+            raise ValueError(f"Source d'étape introuvable : {source}")
+        chemins = [spec.origin]
+    digest = hashlib.sha256()
+    for chemin in chemins:
+        nom = os.path.relpath(chemin, source) if os.path.isdir(source) else os.path.basename(chemin)
+        digest.update(f"{nom}:{file_hash(chemin)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Empreinte SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """
+    Exécute un DAG d'étapes : les étapes indépendantes (collecte API et
+    scraping) tournent en parallèle, chaque sortie est suivie dans un
+    manifeste (clé de cache, empreinte, date).
+    """
+
+    def __init__(self, stages, workdir=PIPELINE_DIR, workers=2):
+        self.stages = {stage.name: stage for stage in stages}
+        self.workdir = workdir
+        self.workers = workers
+        self.manifest_path = os.path.join(workdir, MANIFEST)
+        self._lock = threading.Lock()
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        if len(self.stages) != len(stages):
+            raise ValueError("Noms d'étapes en double")
+        for stage in stages:
+            unknown = [dep for dep in stage.deps if dep not in self.stages]
+            if unknown:
+                raise ValueError(f"Étape '{stage.name}' : dépendance inconnue {unknown}")
+        cycle = self._cycle()
+        if cycle:
+            raise ValueError(f"Dépendances circulaires : {' -> '.join(cycle)}")
+
+    def _cycle(self):
+        """Un cycle de dépendances ([a, b, a]), None si le graphe est acyclique"""
+        terminees = set()
+
+        def visit(chemin):
+            for dep in self.stages[chemin[-1]].deps:
+                if dep in chemin:
+                    return chemin[chemin.index(dep):] + [dep]
+                if dep not in terminees:
+                    cycle = visit(chemin + [dep])
+                    if cycle:
+                        return cycle
+            terminees.add(chemin[-1])
+            return None
+
+        for name in self.stages:
+            cycle = None if name in terminees else visit([name])
+            if cycle:
+                return cycle
+        return None
+
+    # ---------------------------------------------------------- cache
+
+    def _output_hash(self, stage):
+        """Empreinte de la sortie, recalculée seulement si le fichier a bougé"""
+        if not os.path.exists(stage.output):
+            return None
+        entry = self.manifest.get(stage.name) or {}
+        stat = os.stat(stage.output)
+        if entry.get("taille") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry.get("empreinte")
+        return file_hash(stage.output)
+
+    def _is_fresh(self, stage, key):
+        entry = self.manifest.get(stage.name)
+        if not entry or entry.get("cle") != key:
+            return False
+        if self._output_hash(stage) != entry.get("empreinte"):
+            return False
+        if stage.max_age is not None:
+            age = time.time() - entry.get("termine_le", 0)
+            return age < stage.max_age * 3600
+        return True
+
+    def _record(self, stage, key, duration):
+        stat = os.stat(stage.output)
+        entry = {
+            "cle": key,
+            "sortie": stage.output,
+            "empreinte": file_hash(stage.output),
+            "taille": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "termine_le": time.time(),
+            "date": datetime.now().isoformat(),
+            "duree_s": round(duration, 3),
+        }
+        with self._lock:
+            self.manifest[stage.name] = entry
+            atomic_write_json(self.manifest_path, self.manifest)
+
+    # ---------------------------------------------------------- exécution
+
+    def _selection(self, targets):
+        """Étapes demandées et tous leurs ancêtres"""
+        if not targets:
+            return set(self.stages)
+        selected, todo = set(), list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in self.stages:
+                raise ValueError(f"Étape inconnue : {name}")
+            if name not in selected:
+                selected.add(name)
+                todo.extend(self.stages[name].deps)
+        return selected
+
+    def _run_stage(self, stage, inputs, key, force):
+        if not force and self._is_fresh(stage, key):
+            print(f"⏭ Étape '{stage.name}' inchangée (cache)")
+            return "cache"
+        print(f"▶ Étape '{stage.name}'...")
+        os.makedirs(os.path.dirname(stage.output) or '.', exist_ok=True)
+        avant = os.stat(stage.output) if os.path.exists(stage.output) else None
+        started = time.time()
+        stage.func(inputs, stage.output, **stage.params)
+        if not os.path.exists(stage.output):
+            raise RuntimeError(f"l'étape '{stage.name}' n'a pas produit {stage.output}")
+        apres = os.stat(stage.output)
+        # Sortie laissée telle quelle : ancienne version servie par erreur, sauf mise à jour sur place
+        if (not stage.in_place and avant is not None
+                and (avant.st_mtime_ns, avant.st_size) == (apres.st_mtime_ns, apres.st_size)):
+            raise RuntimeError(f"l'étape '{stage.name}' n'a pas réécrit {stage.output}")
+        self._record(stage, key, time.time() - started)
+        print(f"✅ Étape '{stage.name}' terminée en {time.time() - started:.1f}s")
+        return "execute"
+
+    def run(self, targets=None, force=(), refresh=False):
+        """
+        Exécuter les étapes nécessaires à `targets` (toutes par défaut).
+
+        `force` : étapes à rejouer même si leur cache est valide ;
+        `refresh` : rejouer les collectes. Retourne {étape: "cache" | "execute" | "echec"}.
+        """
+        selected = self._selection(targets)
+        force = set(force)
+        if refresh:
+            force |= {name for name in selected if not self.stages[name].deps}
+        status = {}
+        running = {}
+
+        def ready(name):
+            return (name not in status and name not in running.values()
+                    and all(dep in status for dep in self.stages[name].deps))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while len(status) < len(selected):
+                avant = len(status)
+                for name in sorted(selected):
+                    if not ready(name):
+                        continue
+                    stage = self.stages[name]
+                    failed = [dep for dep in stage.deps if status[dep] == "echec"
+                              and not self.stages[dep].optional]
+                    if failed:
+                        print(f"⛔ Étape '{name}' ignorée : échec de {', '.join(failed)}")
+                        status[name] = "echec"
+                        continue
+                    inputs = {dep: (None if status[dep] == "echec" else self.stages[dep].output)
+                              for dep in stage.deps}
+                    hashes = {dep: (None if status[dep] == "echec" else self.manifest[dep]["empreinte"])
+                              for dep in stage.deps}
+                    future = executor.submit(self._run_stage, stage, inputs, stage.key(hashes), name in force)
+                    running[future] = name
+                if not running:
+                    if len(status) == avant:  # garde-fou : le DAG est validé dans __init__
+                        raise RuntimeError(f"Étapes bloquées : {sorted(set(selected) - set(status))}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        status[name] = future.result()
+                    except Exception as e:
+                        print(f"❌ Étape '{name}' en échec : {e}")
+                        status[name] = "echec"
+        return status
+
+    def describe(self):
+        """État du cache de chaque étape (pour la commande `status`)"""
+        rows = []
+        for name, stage in self.stages.items():
+            entry = self.manifest.get(name) or {}
+            rows.append({
+                "etape": name,
+                "depend_de": ", ".join(stage.deps) or "-",
+                "derniere_execution": entry.get("date", "jamais"),
+                "duree_s": entry.get("duree_s"),
+                "sortie": stage.output,
+                "presente": os.path.exists(stage.output),
+            })
+        return rows
+
+
+# --------------------------------------------------------------
+#  Étapes du projet
+# --------------------------------------------------------------
+
+def collect_api(inputs, output, workers=1, max_results=None, incremental=False):
+    """Collecte France Travail (cf. collect_data_api_franceTravail.main)"""
+    import collect_data_api_franceTravail as api
+    argv = ["--workers", str(workers)]
+    if max_results:
+        argv += ["--max-results", str(max_results)]
+    if incremental:
+        argv.append("--incremental")
+    api.main(argv)
+
+
+def collect_scraping(inputs, output):
+    """Scraping LinkedIn / Glassdoor / ChooseYourBoss (données de démonstration en secours)"""
+    import collect_data_scrapping as scraping
+    offers = scraping.scrape_accessible_sites() or scraping.create_demo_data()
+    with JsonlWriter(output) as writer:
+        writer.write_batch(offers)
+
+
+def normalise(inputs, output):
+    """Les deux sources vers le schéma commun, en colonnes typées"""
+    api_path, scraping_path = inputs.get("collect_api"), inputs.get("collect_scraping")
+    if not api_path and not scraping_path:
+        raise RuntimeError("aucune collecte disponible")
+    for engine in (SALARY_PARSER, EXPERIENCE_PARSER):
+        engine.reset()
+    df = load_normalised(api_path, scraping_path)
+    print(f"   💾 {len(df)} offres normalisées, {memory_mb(df):.1f} Mo en mémoire")
+    for engine in (SALARY_PARSER, EXPERIENCE_PARSER):
+        engine.print_summary()
+    # Taux de libellés non reconnus : à surveiller quand un site change de format
+    atomic_write_json(os.path.join(os.path.dirname(output), 'rapport_parsing.json'), parsing_report())
+    df.to_parquet(output, index=False)
+
+
+def dedup(inputs, output, threshold=0.5):
+    """
+    Doublons exacts (même identifiant) puis offres scrapées quasi identiques
+    à une offre France Travail (MinHash sur titre + entreprise + ville).
+    """
+    df = pd.read_parquet(inputs["normalise"]).drop_duplicates('Identifiant')
+    api_mask = df['Source'] == 'France Travail'
+    reference = df[api_mask].to_dict('records')
+    records = df[~api_mask].to_dict('records')
+    doublons = {record['Identifiant'] for record, match, _ in
+                match_to_reference(records, reference, threshold, key='Identifiant') if match}
+    print(f"   🧹 {len(doublons)} offres scrapées déjà présentes côté France Travail")
+    df[~df['Identifiant'].isin(doublons)].to_parquet(output, index=False)
+
+
+def geo(inputs, output):
+    """Lieux libres résolus sur le référentiel embarqué : commune, département, région, coordonnées"""
+    df = pd.read_parquet(inputs["dedup"])
+    df = df.drop(columns=[c for c in COLONNES_GEO if c in df]).join(geocode(df))
+    precision = df['Précision géo'].value_counts(normalize=True)
+    print("   📍 Lieux résolus : " + ", ".join(f"{niveau} {part:.0%}" for niveau, part in precision.items()))
+    df.to_parquet(output, index=False)
+
+
+def enrich(inputs, output):
+    """Compétences extraites du titre et de la description, fusionnées avec celles déclarées"""
+    df = pd.read_parquet(inputs["geo"])
+    texte = df['Intitulé du poste'].fillna('') + '\n' + df['Description du poste'].fillna('')
+    extraites = DEFAULT_EXTRACTOR.tag_column(texte)
+    declarees = df['Compétences mentionnées'].fillna(NON_SPECIFIE)
+
+    def fusion(declared, found):
+        skills = [s.strip().lower() for s in declared.split(',') if s.strip() and declared != NON_SPECIFIE]
+        merged = list(dict.fromkeys(found + [s for s in skills if s not in found]))
+        return ', '.join(merged) if merged else NON_SPECIFIE
+
+    df['Compétences mentionnées'] = pd.Series([fusion(d, f) for d, f in zip(declarees, extraites)],
+                                              index=df.index, dtype=TEXTE)
+    df.to_parquet(output, index=False)
+
+
+def complete_sources(df, inputs):
+    """
+    Sources dont les offres absentes de `df` peuvent être retirées : France
+    Travail si sa dernière collecte a tout vu (ni --max-results ni requête en
+    échec ou tronquée), les sites scrapés si le scraping a abouti. Une
+    source partielle, en échec ou non collectée garde ses offres.
+    """
+    sources = set()
+    if inputs.get("collect_api"):
+        import collect_data_api_franceTravail as api
+        metadata = os.path.join(os.path.dirname(inputs["collect_api"]), os.path.basename(api.METADATA_PATH))
+        if api.last_run_complete(metadata):
+            sources.add(SOURCE_API)
+    if inputs.get("collect_scraping"):
+        sources |= set(df['Source'].dropna().astype(str)) - {SOURCE_API}
+    if SOURCE_API not in sources:
+        print("   ⚠ Collecte France Travail partielle ou absente : ses offres manquantes sont conservées")
+    return sources
+
+
+def index_offers(inputs, output):
+    """
+    Index plein texte (FTS5) aligné sur les offres enrichies ; seules les
+    offres modifiées sont réindexées, seules celles des sources collectées
+    en entier sont retirées (cf. complete_sources).
+    """
+    df = pd.read_parquet(inputs["enrich"])
+    with SearchIndex(output) as index:
+        stats = index.sync(df, complete_sources(df, inputs))
+    print(f"   🔍 Index : {stats['nouvelles']} nouvelles, {stats['modifiees']} modifiées, "
+          f"{stats['inchangees']} inchangées, {stats['supprimees']} retirées")
+
+
+def store_offers(inputs, output):
+    """Offres enrichies rangées dans l'entrepôt colonnaire ; seules les nouvelles et les modifiées sont écrites"""
+    df = pd.read_parquet(inputs["enrich"])
+    stats = OfferStore(os.path.dirname(output)).write(df)
+    print(f"   🗄️ Entrepôt : {stats['nouvelles']} nouvelles, {stats['modifiees']} modifiées, "
+          f"{stats['inchangees']} inchangées")
+
+
+def capture_changes(inputs, output):
+    """
+    Changeset JSONL de la collecte par rapport à la précédente (insertions,
+    modifications champ par champ, suppressions), appliqué à la table des
+    offres courantes. Les changesets sont rangés à côté de la table. Seules
+    les offres des sources collectées en entier sont supprimées (cf.
+    complete_sources) : une collecte partielle ne vide pas la table.
+    """
+    df = pd.read_parquet(inputs["enrich"])
+    with CurrentOffers(output) as offres:
+        entete = capture(df, offres, os.path.join(os.path.dirname(output), 'changesets'),
+                         sources=complete_sources(df, inputs))
+        courantes = offres.count()
+    if entete is None:
+        print(f"   🔁 Changements : aucun, {courantes} offres courantes")
+    else:
+        print(f"   🔁 Changeset {entete['seq']} : {entete['insertions']} insertions, "
+              f"{entete['modifications']} modifications, {entete['suppressions']} suppressions "
+              f"({courantes} offres courantes)")
+
+
+def model(inputs, output, n_clusters=12):
+    """Familles de métiers et classifieurs séniorité / contrat, appris par lots sur les offres enrichies"""
+    modele = OfferModel(n_clusters=n_clusters).fit(parquet_chunks(inputs["enrich"]),
+                                                   workdir=os.path.dirname(output) or None)
+    modele.save(output)
+    report = modele.report()
+    atomic_write_json(os.path.splitext(output)[0] + '.json', report)
+    precision = ", ".join(f"{cible} {p:.0%}" for cible, p in report["precision_validation"].items() if p is not None)
+    print(f"   🧠 {len(report['familles'])} familles de métiers sur {report['documents']} offres"
+          + (f" (précision : {precision})" if precision else ""))
+
+
+def similar_offers(inputs, output):
+    """
+    Index des offres similaires : plongements des offres enrichies absentes
+    de l'index ou dont le texte a changé (cf. content_fingerprints), ajoutés
+    par lots. Les offres retirées de l'index plein texte le sont aussi d'ici :
+    une collecte partielle garde donc ses offres (cf. complete_sources).
+
+    Les plongements gardent l'IDF figée par OfferEmbedder.frozen malgré le
+    réentraînement du modèle ; quand elle est renouvelée, ou que la
+    configuration change, la clé change et l'index est reconstruit.
+    """
+    embedder = OfferEmbedder.frozen(OfferModel.load(inputs["model"]), os.path.dirname(output), update=True)
+    index = SimilarityIndex(os.path.dirname(output), model_key=embedder.key)
+    ecrites = 0
+    for df in parquet_chunks(inputs["enrich"]):
+        empreintes = content_fingerprints(df)
+        a_plonger = index.outdated(df['Identifiant'].tolist(), empreintes)
+        if a_plonger.any():
+            df = df[a_plonger]
+            ecrites += index.add(df['Identifiant'].tolist(), embedder.embed(df), empreintes[a_plonger])
+    with SearchIndex(inputs["index"]) as recherche:
+        retirees = index.remove(set(index.rangs) - recherche.ids())
+    index.save()
+    print(f"   🧭 Offres similaires : {ecrites} plongées, {retirees} retirées, {len(index)} indexées")
+
+
+def _effectifs(serie, top=None):
+    """Effectifs non nuls (les catégories absentes sont omises)"""
+    counts = serie.value_counts()
+    counts = counts[counts > 0]
+    return (counts.head(top) if top else counts).to_dict()
+
+
+def analyse(inputs, output, top=20, workers=None):
+    """
+    Indicateurs du README : compétences (fréquences, co-occurrences, croisements
+    ville / contrat / séniorité, tendances hebdomadaires), contrats, géographie,
+    séniorité, salaires, sources. La matrice de co-occurrence complète est
+    écrite à côté du rapport.
+    """
+    df = pd.read_parquet(inputs["enrich"])
+    marche = market_analytics(df, workers=workers)
+    marche.save_cooccurrences(os.path.join(os.path.dirname(output) or '.', 'cooccurrences_competences.npz'))
+    salaires = df.groupby('Type de contrat', observed=True)[['Salaire annuel min', 'Salaire annuel max']].median()
+    report = {
+        "date": datetime.now().isoformat(),
+        "total_offres": len(df),
+        **marche.report(top),
+        "types_contrat": _effectifs(df['Type de contrat']),
+        "villes": _effectifs(df['Ville ou région'], top),
+        "regions": {code: {"nom": ligne['nom'], "offres": int(ligne['offres'])}
+                    for code, ligne in region_summary(df).iterrows()},
+        "seniorite": _effectifs(df['Niveau de seniorité']),
+        "teletravail": _effectifs(df['Télétravail']),
+        "sources": _effectifs(df['Source']),
+        "salaire_annuel_median": {
+            contrat: {"min": float(row['Salaire annuel min']), "max": float(row['Salaire annuel max'])}
+            for contrat, row in salaires.dropna().iterrows()
+        },
+    }
+    atomic_write_json(output, report)
+
+
+def default_stages(workers=1, max_results=None, incremental=False, max_age=24, api=True, scraping=True,
+                   workdir=PIPELINE_DIR):
+    """DAG du projet ; les collectes désactivées ne sont simplement pas déclarées"""
+    collectes = []
+    stages = []
+    if api:
+        collectes.append("collect_api")
+        stages.append(Stage("collect_api", collect_api, 'data/raw/offres_it.jsonl',
+                            params={"workers": workers, "max_results": max_results, "incremental": incremental},
+                            max_age=max_age, optional=scraping, sources=("collect_data_api_franceTravail", "dedup")))
+    if scraping:
+        collectes.append("collect_scraping")
+        stages.append(Stage("collect_scraping", collect_scraping, os.path.join(workdir, 'scraping.jsonl'),
+                            max_age=max_age, optional=api,
+                            sources=("collect_data_scrapping", "sites", "html_parsing", "skills")))
+    stages += [
+        Stage("normalise", normalise, os.path.join(workdir, 'offres_normalisees.parquet'), tuple(collectes),
+              sources=("normalisation", "salary_parsing")),
+        Stage("dedup", dedup, os.path.join(workdir, 'offres_dedupliquees.parquet'), ("normalise",),
+              sources=("dedup",)),
+        Stage("geo", geo, os.path.join(workdir, 'offres_geo.parquet'), ("dedup",), sources=("geo", REFERENCE_DIR)),
+        Stage("enrich", enrich, os.path.join(workdir, 'offres_enrichies.parquet'), ("geo",), sources=("skills",)),
+        Stage("analyse", analyse, os.path.join(workdir, 'analyse.json'), ("enrich",), sources=("analytics",)),
+        Stage("index", index_offers, os.path.join(workdir, 'recherche.sqlite'), ("enrich", *collectes),
+              sources=("search_index",), in_place=True),
+        Stage("store", store_offers, os.path.join(workdir, 'store', STORE_MANIFEST), ("enrich",),
+              sources=("offer_store",)),
+        Stage("cdc", capture_changes, os.path.join(workdir, 'offres_courantes.sqlite'), ("enrich", *collectes),
+              sources=("cdc",), in_place=True),
+        Stage("model", model, os.path.join(workdir, 'modele_offres.joblib'), ("enrich",),
+              sources=("modeling", "search_index")),
+        Stage("similar", similar_offers, os.path.join(workdir, 'similaires', SIMILAR_META),
+              ("enrich", "model", "index"), sources=("similar", "modeling", "search_index")),
+    ]
+    return stages
@@ -0,0 +1,238 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# ==============================================================
+#  Moteur d'analyse des salaires et de l'expérience (texte libre)
+# ==============================================================
+
+# Montant : « 40 000 », « 40000.0 », « 1800,50 »
+NOMBRE = r"\d{1,3}(?:[ \u00a0\u202f]\d{3})+(?![\d.,])|\d+(?:[.,]\d+)?"
+DEVISE = r"(?:€|euros?|eur\b)"
+# Période en suffixe : « / mois », « par an », « brut annuel », « /h »
+PAR = (r"(?:\s*(?:brut|net)?\s*(?:/|par\s)?\s*"
+       r"(?P<par>annuel(?:le)?|an(?:née)?|mensuel(?:le)?|mois|heure|h|jour|journalier)\b)?")
+
+# Montants annuels : 151,67 h payées par mois, 218 jours travaillés par an (forfait jours)
+MULTIPLICATEURS = {
+    'annuel': 1, 'annuelle': 1, 'an': 1, 'année': 1,
+    'mensuel': 12, 'mensuelle': 12, 'mois': 12,
+    'horaire': 151.67 * 12, 'heure': 151.67 * 12, 'h': 151.67 * 12,
+    'journalier': 218, 'jour': 218,
+}
+# Sans période explicite, un montant inférieur est considéré comme mensuel
+SEUIL_MENSUEL = 10000
+SALAIRE_ANNUEL_MIN, SALAIRE_ANNUEL_MAX = 1000, 1000000
+# Gratification minimale de stage : 4,35 €/h (15 % du plafond horaire de la Sécurité sociale)
+GRATIFICATION_ANNUELLE = round(4.35 * 151.67 * 12)
+
+
+@dataclass(frozen=True)
+class Pattern:
+    """
+    Motif de la cascade : `regex` (groupes nommés) est appliquée par
+    Series.str.extract, puis `convert(parts)` calcule les colonnes de sortie.
+
+    Sans `convert`, le libellé est reconnu mais ne porte pas de valeur
+    (« Non spécifié », « Salaire alternance »).
+    """
+    name: str
+    regex: re.Pattern
+    convert: object = None
+
+
+class PatternEngine:
+    """
+    Cascade de motifs appliquée aux valeurs d'une colonne.
+
+    Seules les valeurs distinctes sont analysées (les libellés se répètent
+    énormément) ; chaque motif ne voit que les valeurs restées sans
+    correspondance. Les compteurs par motif sont pondérés par le nombre de
+    lignes et cumulés d'un appel à l'autre jusqu'à `reset()`.
+    """
+
+    def __init__(self, patterns, columns, label):
+        self.patterns = list(patterns)
+        self.columns = list(columns)
+        self.label = label
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.missing = 0
+        self.hits = Counter()
+        self.unparsed = Counter()
+
+    def parse(self, values):
+        """Série de libellés -> DataFrame des colonnes de sortie + colonne `motif`"""
+        values = pd.Series(values)
+        codes, uniques = pd.factorize(values)
+        texts = pd.Series([u if isinstance(u, str) else str(u) for u in uniques], dtype=object)
+        counts = np.bincount(codes[codes >= 0], minlength=len(texts))
+
+        table = np.full((len(texts), len(self.columns)), np.nan)
+        motifs = np.full(len(texts), -1, dtype=np.int16)
+        remaining = texts.index
+        for number, pattern in enumerate(self.patterns):
+            if remaining.empty:
+                break
+            parts = texts.loc[remaining].str.extract(pattern.regex)
+            matched = parts.index[parts.notna().any(axis=1).to_numpy()]
+            if pattern.convert is not None and len(matched):
+                converted = pattern.convert(parts.loc[matched])[self.columns]
+                matched = converted.index[converted.iloc[:, 0].notna().to_numpy()]
+                table[matched] = converted.loc[matched].to_numpy(dtype='float64')
+            motifs[matched] = number
+            self.hits[pattern.name] += int(counts[matched].sum())
+            remaining = remaining.difference(matched)
+
+        for position in remaining:
+            self.unparsed[texts[position]] += int(counts[position])
+        self.rows += len(values)
+        self.missing += int((codes < 0).sum())
+
+        present = codes >= 0
+        result = np.full((len(values), len(self.columns)), np.nan)
+        result[present] = table[codes[present]]
+        row_motifs = np.where(present, motifs[np.where(present, codes, 0)], -1)
+        df = pd.DataFrame(result, columns=self.columns, index=values.index).astype('float32')
+        df['motif'] = pd.Categorical.from_codes(row_motifs, categories=[p.name for p in self.patterns])
+        return df
+
+    # ---------------------------------------------------------- rapport
+
+    def report(self, top=10):
+        """Lignes reconnues par motif, taux de libellés non reconnus et exemples"""
+        renseignees = self.rows - self.missing
+        non_reconnues = sum(self.unparsed.values())
+        return {
+            "lignes": self.rows,
+            "vides": self.missing,
+            "par_motif": {p.name: self.hits[p.name] for p in self.patterns},
+            "non_reconnues": non_reconnues,
+            "taux_non_reconnu": round(non_reconnues / renseignees, 4) if renseignees else None,
+            "exemples_non_reconnus": dict(self.unparsed.most_common(top)),
+        }
+
+    def print_summary(self):
+        report = self.report(top=3)
+        taux = report["taux_non_reconnu"]
+        print(f"   🔎 {self.label} : {report['lignes'] - report['vides']} libellés, "
+              f"{100 * (taux or 0):.1f}% non reconnus")
+        for libelle, n in report["exemples_non_reconnus"].items():
+            print(f"      ? {libelle!r} ({n})")
+
+
+# --------------------------------------------------------------
+#  Salaires
+# --------------------------------------------------------------
+
+def _nombre(serie):
+    """« 40 000,50 » / « 40000.0 » -> float (NaN sinon)"""
+    nettoyee = serie.str.replace(r"\s", "", regex=True).str.replace(",", ".", regex=False)
+    return pd.to_numeric(nettoyee, errors='coerce').astype('float64')
+
+
+def _groupe(parts, nom):
+    return parts[nom] if nom in parts else pd.Series(np.nan, index=parts.index, dtype=object)
+
+
+def _salaire(parts):
+    """Groupes min / max / k / periode / par / mois -> salaire annuel en euros"""
+    bas, haut = _nombre(_groupe(parts, 'min')), _nombre(_groupe(parts, 'max'))
+    # « 40-45 k€ » : le k s'applique aux deux bornes
+    kilo = _groupe(parts, 'k').notna().to_numpy()
+    bas = bas.where(~(kilo & (bas < 1000)), bas * 1000)
+    haut = haut.where(~(kilo & (haut < 1000)), haut * 1000)
+
+    periode = _groupe(parts, 'periode').fillna(_groupe(parts, 'par')).str.lower()
+    multiplicateur = periode.map(MULTIPLICATEURS).astype('float64')
+    # « Mensuel de 2000 Euros sur 13 mois »
+    mois = _nombre(_groupe(parts, 'mois'))
+    multiplicateur = multiplicateur.mask((multiplicateur == 12) & mois.notna(), mois)
+    multiplicateur = multiplicateur.fillna(pd.Series(np.where(bas < SEUIL_MENSUEL, 12, 1), index=parts.index))
+
+    bas, haut = bas * multiplicateur, (haut * multiplicateur).fillna(bas * multiplicateur)
+    plausible = bas.between(SALAIRE_ANNUEL_MIN, SALAIRE_ANNUEL_MAX) & (haut >= bas)
+    return pd.DataFrame({'salaire_min': bas.where(plausible), 'salaire_max': haut.where(plausible)})
+
+
+def _gratification(parts):
+    return pd.DataFrame({'salaire_min': GRATIFICATION_ANNUELLE, 'salaire_max': GRATIFICATION_ANNUELLE},
+                        index=parts.index, dtype='float64')
+
+
+SALARY_PATTERNS = [
+    # France Travail : « Annuel de 40000.0 Euros à 45000.0 Euros sur 12.0 mois »
+    Pattern("france_travail", re.compile(
+        rf"(?P<periode>annuel|mensuel|horaire|journalier)\s+de\s+(?P<min>{NOMBRE})\s*euros?"
+        rf"(?:\s+à\s+(?P<max>{NOMBRE})\s*euros?)?(?:\s+sur\s+(?P<mois>\d+(?:[.,]\d+)?)\s*mois)?", re.I), _salaire),
+    # « 45k€ - 55k€ », « 40-45 k€ », « entre 40 et 45K »
+    Pattern("fourchette_k", re.compile(
+        rf"(?P<min>{NOMBRE})\s*k?\s*{DEVISE}?\s*(?:à|-|–|et)\s*(?P<max>{NOMBRE})\s*(?P<k>k)\s*{DEVISE}?{PAR}", re.I),
+        _salaire),
+    # « 35 000 € - 45 000 € », « 1 800 à 2 200 € / mois »
+    Pattern("fourchette", re.compile(
+        rf"(?P<min>{NOMBRE})\s*{DEVISE}?\s*(?:à|-|–|et)\s*(?P<max>{NOMBRE})\s*{DEVISE}{PAR}", re.I), _salaire),
+    # « 45k€ », « 45 K brut annuel »
+    Pattern("montant_k", re.compile(rf"(?P<min>{NOMBRE})\s*(?P<k>k)\s*{DEVISE}?{PAR}", re.I), _salaire),
+    # « 1 450 € / mois », « 45000 € brut annuel »
+    Pattern("montant", re.compile(rf"(?P<min>{NOMBRE})\s*{DEVISE}{PAR}", re.I), _salaire),
+    Pattern("gratification", re.compile(r"(?P<libelle>gratification)", re.I), _gratification),
+    Pattern("non_communique", re.compile(
+        r"(?P<libelle>non\s+sp[ée]cifi[ée]|non\s+communiqu[ée]|non\s+renseign[ée]|selon\s+(?:profil|exp[ée]rience)"
+        r"|[àa]\s+n[ée]gocier|n[ée]gociable|salaire\s+alternance|comp[ée]titif|attractif|selon\s+grille)", re.I)),
+]
+
+
+# --------------------------------------------------------------
+#  Expérience
+# --------------------------------------------------------------
+
+def _annees(parts):
+    """Groupes n / unite -> années (« 6 Mois » -> 0.5) ; un intervalle garde sa borne basse"""
+    valeur = _nombre(_groupe(parts, 'n'))
+    mois = _groupe(parts, 'unite').str.lower().str.startswith('mois').fillna(False).astype(bool)
+    valeur = valeur.where(~mois, (valeur / 12).round(1))
+    return pd.DataFrame({'annees': valeur.where(valeur.between(0, 50))})
+
+
+def _debutant(parts):
+    return pd.DataFrame({'annees': 0.0}, index=parts.index)
+
+
+EXPERIENCE_PATTERNS = [
+    # « 3 à 5 ans », « 2-3 ans d'expérience »
+    Pattern("intervalle", re.compile(
+        r"(?P<n>\d+(?:[.,]\d+)?)\s*(?:ans?\s*)?(?:à|-|–)\s*\d+(?:[.,]\d+)?\s*(?P<unite>ans?|mois)\b", re.I), _annees),
+    # France Travail : « 2 An(s) », « Expérience exigée de 6 Mois », « 5 ans minimum »
+    Pattern("duree", re.compile(r"(?P<n>\d+(?:[.,]\d+)?)\s*(?P<unite>an|mois)", re.I), _annees),
+    Pattern("debutant", re.compile(
+        r"(?P<libelle>d[ée]butant|sans\s+exp[ée]rience|premi[èe]re\s+exp[ée]rience|aucune\s+exp[ée]rience)", re.I),
+        _debutant),
+    # Offres scrapées : nombre d'années seul (« 0 »)
+    Pattern("nombre", re.compile(r"^\s*(?P<n>\d+(?:[.,]\d+)?)\s*$"), _annees),
+    Pattern("non_communique", re.compile(r"(?P<libelle>non\s+sp[ée]cifi[ée]|non\s+communiqu[ée]|non\s+renseign[ée])",
+                                         re.I)),
+]
+
+# Moteurs partagés par la normalisation (leurs compteurs couvrent toute l'exécution)
+SALARY_PARSER = PatternEngine(SALARY_PATTERNS, ['salaire_min', 'salaire_max'], "Salaires")
+EXPERIENCE_PARSER = PatternEngine(EXPERIENCE_PATTERNS, ['annees'], "Expérience")
+
+
+def parse_salaries(values, engine=SALARY_PARSER):
+    """Libellés de salaire -> salaire_min / salaire_max annuels en euros (float32) + motif"""
+    return engine.parse(values)
+
+
+def parse_experience(values, engine=EXPERIENCE_PARSER):
+    """Libellés d'expérience -> années demandées (float32) + motif"""
+    return engine.parse(values)
+
+
+def parsing_report(engines=(SALARY_PARSER, EXPERIENCE_PARSER), top=10):
+    return {engine.label: engine.report(top) for engine in engines}
@@ -0,0 +1,161 @@
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
+
+# ==============================================================
+#  Analyse HTML : backend interchangeable + sélecteurs précompilés
+# ==============================================================
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+
+def available_backends():
+    backends = []
+    if HTMLParser is not None:
+        backends.append("selectolax")
+    if HAS_LXML:
+        backends.append("lxml")
+    backends.append("html.parser")
+    return backends
+
+
+# Backend le plus rapide disponible, surchargeable par variable d'environnement
+DEFAULT_BACKEND = os.getenv("SCRAPER_HTML_BACKEND") or available_backends()[0]
+
+
+class Selector:
+    """Sélecteur CSS compilé une fois (soupsieve pour BeautifulSoup, texte pour selectolax)"""
+
+    __slots__ = ("css", "compiled")
+
+    def __init__(self, css):
+        self.css = css
+        self.compiled = soupsieve.compile(css)
+
+    def __repr__(self):
+        return f"Selector({self.css!r})"
+
+
+def compile_selectors(selectors):
+    """{nom: css} -> {nom: Selector}"""
+    return {name: Selector(css) for name, css in selectors.items()}
+
+
+class Node:
+    """
+    Élément HTML indépendant du backend : les fonctions de parsing des
+    sites n'utilisent que cette interface.
+    """
+
+    __slots__ = ("_node", "_bs4")
+
+    def __init__(self, node, bs4):
+        self._node = node
+        self._bs4 = bs4
+
+    def select_one(self, selector):
+        if self._bs4:
+            found = selector.compiled.select_one(self._node)
+        else:
+            found = self._node.css_first(selector.css)
+        return Node(found, self._bs4) if found is not None else None
+
+    def select(self, selector):
+        if self._bs4:
+            found = selector.compiled.select(self._node)
+        else:
+            found = self._node.css(selector.css)
+        return [Node(node, self._bs4) for node in found]
+
+    def text(self):
+        if self._bs4:
+            return self._node.get_text(strip=True)
+        return self._node.text(strip=True)
+
+    def attr(self, name):
+        if self._bs4:
+            value = self._node.get(name)
+            return " ".join(value) if isinstance(value, list) else value
+        return self._node.attributes.get(name)
+
+    @property
+    def key(self):
+        """Identifiant stable de l'élément sous-jacent"""
+        return id(self._node) if self._bs4 else self._node.mem_id
+
+    def ancestor_keys(self):
+        node = self._node.parent
+        while node is not None:
+            yield id(node) if self._bs4 else node.mem_id
+            node = node.parent
+
+    def contains_any(self, keywords):
+        """
+        Chercher des mots-clés (en minuscules) dans le texte et les classes CSS
+        de l'élément, sans re-sérialiser le HTML.
+        """
+        if self._bs4:
+            parts = list(self._node.stripped_strings)
+            for tag in [self._node, *self._node.find_all(class_=True)]:
+                parts.extend(tag.get("class") or [])
+        else:
+            parts = [self._node.text(separator=" ")]
+            for tag in [self._node, *self._node.css("[class]")]:
+                parts.append(tag.attributes.get("class") or "")
+        haystack = " ".join(parts).lower()
+        return any(keyword in haystack for keyword in keywords)
+
+
+def parse_document(html, backend=None, strainer=None):
+    """
+    Construire l'arbre d'un document.
+
+    Avec BeautifulSoup, `strainer` (SoupStrainer) limite l'arbre à la liste de
+    résultats ; selectolax, bien plus rapide, analyse le document entier.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == "selectolax":
+        if HTMLParser is None:
+            raise ImportError("Le backend 'selectolax' nécessite le paquet 'selectolax'")
+        return Node(HTMLParser(html).root, bs4=False)
+    return Node(BeautifulSoup(html, backend, parse_only=strainer), bs4=True)
+
+
+def parse_cards(html, card_selector, strainer=None, backend=None):
+    """Retourner les cartes d'offres d'une page de résultats"""
+    root = parse_document(html, backend, strainer)
+    if root._node is None:
+        return []
+    cards = root.select(card_selector)
+    if len(cards) < 2:
+        return cards
+    # Sélecteurs alternatifs imbriqués (conteneur + bloc d'infos) : une carte
+    # ne doit compter qu'une fois, on garde l'élément le plus interne
+    keys = {card.key for card in cards}
+    nested = {key for card in cards for key in card.ancestor_keys() if key in keys}
+    return [card for card in cards if card.key not in nested] if nested else cards
+
+
+def class_strainer(tags, classes):
+    """SoupStrainer ne conservant que les balises `tags` portant l'une des `classes`"""
+    wanted = set(classes)
+
+    # Pendant le parsing, l'attribut class arrive brut (« job-item remote ») :
+    # une liste de valeurs ne correspondrait qu'aux balises à classe unique
+    def has_class(value):
+        return bool(value) and not wanted.isdisjoint(value.split() if isinstance(value, str) else value)
+
+    return SoupStrainer(tags, class_=has_class)
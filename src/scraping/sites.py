@@ -0,0 +1,257 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from http_client import get_client
+from metrics import METRICS
+from skills import extract_skills
+from html_parsing import class_strainer, compile_selectors, parse_cards
+
+# ==============================================================
+#  Registre déclaratif des sites scrapés + moteur commun
+# ==============================================================
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+# Redirige tous les sites vers un même hôte (serveur bouchon, cf. stub_server.py)
+SCRAPER_BASE_URL = os.getenv("SCRAPER_BASE_URL")
+
+
+@dataclass
+class SiteAdapter:
+    """
+    Description d'un site d'offres : URLs, pagination, sélecteurs, valeurs par
+    défaut des champs et politesse (délai minimal entre deux requêtes vers
+    l'hôte, nombre de requêtes simultanées autorisées).
+
+    Chaque recherche de `searches` est un dict {'path', 'contract_type', 'label'} ;
+    `path` peut contenir {page} et {offset} lorsque `pages` > 1.
+    """
+    name: str
+    base_url: str
+    searches: list
+    selectors: dict
+    strainer: object = None
+    headers: dict = field(default_factory=lambda: {'User-Agent': USER_AGENT})
+    max_cards: int = 10
+    pages: int = 1
+    page_size: int = 25
+    delay: float = 2.0
+    concurrency: int = 1
+    default_title: str = "{contract_type} Informatique"
+    default_company: str = "Entreprise IT"
+    seniority: str = 'Étudiant'
+    url_mode: str = 'fixed'      # 'search' (URL de recherche), 'fixed' (base_url) ou 'card_link'
+    detect_remote: bool = False
+
+    @property
+    def host(self):
+        return urlsplit(self.base_url).netloc
+
+    def page_urls(self, search):
+        for page in range(self.pages):
+            path = search['path'].format(page=page + 1, offset=page * self.page_size)
+            yield self.base_url + path
+
+    def rebased(self, base_url, **changes):
+        """Copie de l'adaptateur pointant vers un autre hôte (tests, bouchon local)"""
+        return replace(self, base_url=base_url.rstrip('/'), **changes)
+
+
+SITES = {}
+
+
+def register_site(adapter):
+    """Ajouter (ou remplacer) un site dans le registre"""
+    if SCRAPER_BASE_URL:
+        adapter = adapter.rebased(SCRAPER_BASE_URL)
+    SITES[adapter.name] = adapter
+    return adapter
+
+
+def node_text(card, selector, default):
+    """Texte du premier élément correspondant, ou valeur par défaut"""
+    if selector is None:
+        return default
+    elem = card.select_one(selector)
+    return elem.text() if elem else default
+
+
+def detect_teletravail(card):
+    teletravail_keywords = ['remote', 'télétravail', 'hybride', 'flexible']
+    return 'Oui' if card.contains_any(teletravail_keywords) else 'Non'
+
+
+def map_card(adapter, card, contract_type, url):
+    """Transformer une carte en offre au format commun du projet"""
+    selectors = adapter.selectors
+    title = node_text(card, selectors.get('title'), adapter.default_title.format(contract_type=contract_type))
+    company = node_text(card, selectors.get('company'), adapter.default_company)
+    location = node_text(card, selectors.get('location'), "France")
+    salaire = node_text(card, selectors.get('salary'), "Non spécifié")
+
+    if adapter.url_mode == 'search':
+        offer_url = url
+    elif adapter.url_mode == 'card_link':
+        link = card.select_one(selectors['link'])
+        href = link.attr('href') if link else None
+        offer_url = adapter.base_url + href if href else "Non disponible"
+    else:
+        offer_url = adapter.base_url
+
+    skills = extract_skills(title)
+    return {
+        'Intitulé du poste': title,
+        'Nom de l entreprise': company,
+        'Ville ou région': location,
+        'Date de publication': datetime.now().strftime("%d/%m/%Y"),
+        'Type de contrat': contract_type,
+        'Nombre d années d expérience demandées': '0',
+        'Niveau de seniorité': adapter.seniority,
+        'Description du poste': f"Offre {adapter.name} - {title} chez {company}",
+        'Source': adapter.name,
+        'Télétravail': detect_teletravail(card) if adapter.detect_remote else 'Non spécifié',
+        'Compétences mentionnées': ', '.join(skills) if skills else 'Non spécifié',
+        'Fourchette salariale': salaire,
+        'URL': offer_url
+    }
+
+
+def parse_page(adapter, html, contract_type, url):
+    """Extraire les offres d'une page de résultats"""
+    offers = []
+    for card in parse_cards(html, adapter.selectors['card'], adapter.strainer)[:adapter.max_cards]:
+        try:
+            offers.append(map_card(adapter, card, contract_type, url))
+        except Exception as e:
+            print(f"   ⚠ Erreur parsing {adapter.name}: {e}")
+    return offers
+
+
+def fetch_page(adapter, search, url, client=None):
+    client = client or get_client()
+    try:
+        print(f"   🔍 {adapter.name} - Recherche: {search['label']}")
+        response = client.get(url, headers=adapter.headers, timeout=10, label=adapter.name)
+        if response.status_code == 200:
+            start = time.perf_counter()
+            offers = parse_page(adapter, response.text, search['contract_type'], url)
+            METRICS.record_parse(adapter.name, time.perf_counter() - start, len(offers))
+            return offers
+    except Exception as e:
+        print(f"   ❌ Erreur {adapter.name}: {e}")
+    return []
+
+
+def scrape_site(adapter, client=None):
+    """
+    Scraper toutes les recherches d'un site, dans l'ordre déclaré.
+
+    Le délai de politesse est appliqué par hôte via le limiteur du client HTTP ;
+    jusqu'à `adapter.concurrency` pages peuvent être en vol simultanément.
+    """
+    client = client or get_client()
+    client.set_rate_limit(adapter.host, 1 / adapter.delay if adapter.delay else None, burst=1)
+    tasks = [(search, url) for search in adapter.searches for url in adapter.page_urls(search)]
+    with METRICS.timed(adapter.name):
+        if adapter.concurrency <= 1:
+            pages = [fetch_page(adapter, search, url, client) for search, url in tasks]
+        else:
+            with ThreadPoolExecutor(max_workers=adapter.concurrency) as executor:
+                pages = list(executor.map(lambda task: fetch_page(adapter, *task, client), tasks))
+    return [offer for page in pages for offer in page]
+
+
+def scrape_sites(adapters=None, client=None):
+    """
+    Scraper plusieurs sites en parallèle (un worker par site, chacun avec sa
+    propre limite de débit) : la durée totale est celle du site le plus lent.
+
+    Retourne {nom du site: offres}, dans l'ordre des sites.
+    """
+    adapters = list(adapters if adapters is not None else SITES.values())
+    if not adapters:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(adapters)) as executor:
+        results = list(executor.map(lambda adapter: scrape_site(adapter, client), adapters))
+    return {adapter.name: offers for adapter, offers in zip(adapters, results)}
+
+
+# --------------------------------------------------------------
+#  Sites déclarés
+# --------------------------------------------------------------
+
+LINKEDIN = register_site(SiteAdapter(
+    name='LinkedIn',
+    base_url='https://www.linkedin.com',
+    searches=[
+        {'path': '/jobs/search/?keywords=stage%20informatique&location=France',
+         'contract_type': 'Stage', 'label': 'stage informatique'},
+        {'path': '/jobs/search/?keywords=alternance%20informatique&location=France',
+         'contract_type': 'Alternance', 'label': 'alternance informatique'},
+    ],
+    selectors=compile_selectors({
+        'card': 'div.base-search-card__info, div.job-search-card',
+        'title': 'h3.base-search-card__title, h3.job-title, a.base-search-card__title, a.job-title',
+        'company': 'h4.base-search-card__subtitle, h4.company-name, a.base-search-card__subtitle, a.company-name',
+        'location': 'span.job-search-card__location, span.location, div.job-search-card__location, div.location',
+    }),
+    strainer=class_strainer(['div'], ['base-search-card__info', 'job-search-card']),
+    headers={'User-Agent': USER_AGENT, 'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8'},
+    max_cards=8,
+    delay=3,
+    default_title="Stage/Alternance Informatique",
+    url_mode='search',
+))
+
+GLASSDOOR = register_site(SiteAdapter(
+    name='Glassdoor',
+    base_url='https://www.glassdoor.fr',
+    searches=[
+        {'path': '/Emploi/stage-informatique-emplois-SRCH_KO0,18.htm',
+         'contract_type': 'Stage', 'label': 'Stage'},
+        {'path': '/Emploi/alternance-informatique-emplois-SRCH_KO0,20.htm',
+         'contract_type': 'Alternance', 'label': 'Alternance'},
+    ],
+    selectors=compile_selectors({
+        'card': 'li.react-job-listing, li.jobListing',
+        'title': 'a.jobLink, a.job-title, h3.jobLink, h3.job-title',
+        'company': 'span.employer-name, span.company, div.employer-name, div.company',
+        'location': 'span.location, span.loc, div.location, div.loc',
+    }),
+    strainer=class_strainer(['li'], ['react-job-listing', 'jobListing']),
+    max_cards=6,
+    delay=4,
+    default_company="Entreprise Tech",
+    seniority='Junior',
+))
+
+CHOOSEYOURBOSS = register_site(SiteAdapter(
+    name='ChooseYourBoss',
+    base_url='https://www.chooseyourboss.com',
+    searches=[
+        {'path': '/offres/stage?q=informatique', 'contract_type': 'Stage', 'label': 'Stage'},
+        {'path': '/offres/stage?q=d%C3%A9veloppement', 'contract_type': 'Stage', 'label': 'Stage'},
+        {'path': '/offres/alternance?q=informatique', 'contract_type': 'Alternance', 'label': 'Alternance'},
+        {'path': '/offres/alternance?q=d%C3%A9veloppement', 'contract_type': 'Alternance', 'label': 'Alternance'},
+    ],
+    selectors=compile_selectors({
+        'card': 'div.job-item, div.offer-card',
+        'title': 'h3.title, h3.job-title, h2.title, h2.job-title',
+        'company': 'div.company, div.employer, span.company, span.employer',
+        'location': 'div.location, div.city, span.location, span.city',
+        'salary': 'div.salary, div.compensation, span.salary, span.compensation',
+        'link': 'a',
+    }),
+    strainer=class_strainer(['div'], ['job-item', 'offer-card']),
+    headers={'User-Agent': USER_AGENT, 'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8'},
+    max_cards=10,
+    delay=2,
+    default_company="Startup Tech",
+    url_mode='card_link',
+    detect_remote=True,
+))
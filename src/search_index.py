@@ -0,0 +1,361 @@
+import os
+import re
+import sqlite3
+import unicodedata
+from datetime import date, datetime
+from functools import lru_cache
+
+import pandas as pd
+
+# ==============================================================
+#  Index plein texte des offres (SQLite FTS5)
+# ==============================================================
+
+SEARCH_INDEX_PATH = 'data/pipeline/recherche.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS offres (
+    rowid INTEGER PRIMARY KEY,
+    identifiant TEXT NOT NULL UNIQUE,
+    titre TEXT,
+    entreprise TEXT,
+    ville TEXT,
+    contrat TEXT,
+    date_publication TEXT,
+    teletravail TEXT,
+    source TEXT,
+    competences TEXT,
+    salaire_min REAL,
+    salaire_max REAL,
+    url TEXT,
+    empreinte TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_offres_contrat ON offres(contrat);
+CREATE INDEX IF NOT EXISTS idx_offres_date ON offres(date_publication);
+CREATE VIRTUAL TABLE IF NOT EXISTS offres_fts USING fts5(
+    titre, entreprise, ville, competences, description,
+    tokenize = "unicode61 remove_diacritics 2"
+);
+"""
+
+# Colonnes du schéma commun -> colonnes de la table offres
+COLONNES = {
+    'Identifiant': 'identifiant',
+    'Intitulé du poste': 'titre',
+    'Nom de l entreprise': 'entreprise',
+    'Ville ou région': 'ville',
+    'Type de contrat': 'contrat',
+    'Date de publication': 'date_publication',
+    'Télétravail': 'teletravail',
+    'Source': 'source',
+    'Compétences mentionnées': 'competences',
+    'Salaire annuel min': 'salaire_min',
+    'Salaire annuel max': 'salaire_max',
+    'URL': 'url',
+}
+# Poids BM25 des colonnes de offres_fts (dans l'ordre de déclaration)
+POIDS = (8.0, 2.0, 1.0, 4.0, 1.0)
+TELETRAVAIL_OUI = ('Oui', 'Hybride')
+
+# --------------------------------------------------------------
+#  Analyse du texte (identique à l'indexation et à la recherche)
+# --------------------------------------------------------------
+
+LIGATURES = (("œ", "oe"), ("æ", "ae"))
+# Noms de technologies que le découpage en mots détruirait (c++ -> c) ; motifs
+# compatibles avec re (requêtes) et RE2 (indexation par Arrow)
+TECHNOS = [
+    (r"c\+\+", " cplusplus "),
+    (r"c#", " csharp "),
+    (r"(^|[^a-z0-9])\.net([^a-z0-9]|$)", r"\1 dotnet \2"),
+    (r"([a-z0-9]+)\.js([^a-z0-9]|$)", r" \1js \2"),
+]
+TECHNOS_RE = [(re.compile(motif), remplacement) for motif, remplacement in TECHNOS]
+TECHNOS_PROTEGEES = frozenset(("cplusplus", "csharp", "dotnet"))
+SEPARATEUR = r"[^a-z0-9]+"
+MOT_RE = re.compile(r"[a-z0-9]+")
+MOTS_VIDES = frozenset(
+    "a au aux avec ce ces dans de des du en et l la le les leur d un une ou par pour sur se sa son "
+    "ses qui que nous vous il elle ils est sont chez h f".split())
+
+# Suffixes ramenés au masculin singulier (racinisation légère, sans dictionnaire)
+SUFFIXES = [
+    ("trice", "teur"), ("euse", "eur"), ("ienne", "ien"), ("enne", "en"), ("ive", "if"),
+    ("iere", "ier"), ("ere", "er"), ("ee", "e"), ("e", ""),
+]
+
+
+@lru_cache(maxsize=200_000)
+def stem(mot):
+    """Racine légère d'un mot déjà en minuscules sans accents : pluriel puis féminin"""
+    if len(mot) <= 3 or mot.isdigit() or mot in TECHNOS_PROTEGEES or mot.endswith("js"):
+        return mot
+    if mot.endswith("eaux"):
+        mot = mot[:-1]
+    elif mot.endswith("aux") and len(mot) > 4:
+        mot = mot[:-3] + "al"
+    elif mot[-1] in "sx" and not mot.endswith("ss"):
+        mot = mot[:-1]
+    for suffixe, remplacement in SUFFIXES:
+        if mot.endswith(suffixe) and len(mot) - len(suffixe) >= 3:
+            return mot[:-len(suffixe)] + remplacement
+    return mot
+
+
+def _normalise(text):
+    """Minuscules, sans accents (décomposition NFKD), ligatures et technologies réécrites"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    for ligature, remplacement in LIGATURES:
+        text = text.replace(ligature, remplacement)
+    for pattern, remplacement in TECHNOS_RE:
+        text = pattern.sub(remplacement, text)
+    return text
+
+
+def tokenize(text):
+    """Texte libre -> racines indexables (minuscules, sans accents ni mots vides)"""
+    if not isinstance(text, str) or not text:
+        return []
+    return [stem(mot) for mot in MOT_RE.findall(_normalise(text)) if mot not in MOTS_VIDES]
+
+
+def analyse_text(text):
+    return " ".join(tokenize(text))
+
+
+def analyse_column(values):
+    """
+    analyse_text sur toute une colonne, en Arrow : les opérations de texte
+    sont vectorisées et chaque mot distinct n'est racinisé qu'une fois.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    text = pc.utf8_lower(pa.array(pd.Series(values, dtype=object), type=pa.string(), from_pandas=True))
+    text = pc.replace_substring_regex(pc.utf8_normalize(text, "NFKD"), r"\p{Mn}", "")
+    for ligature, remplacement in LIGATURES:
+        text = pc.replace_substring(text, ligature, remplacement)
+    for motif, remplacement in TECHNOS:
+        text = pc.replace_substring_regex(text, motif, remplacement)
+    mots = pc.split_pattern_regex(text, SEPARATEUR)
+    encodes = pc.dictionary_encode(mots.flatten())
+    racines = pa.array(["" if not mot or mot in MOTS_VIDES else stem(mot)
+                        for mot in encodes.dictionary.to_pylist()], type=pa.string())
+    listes = pa.ListArray.from_arrays(mots.offsets, pc.take(racines, encodes.indices), mask=mots.is_null())
+    # Les mots vides laissent des espaces multiples, sans effet sur le tokenizer de FTS5
+    return [None if t is None else " ".join(t.split()) or None for t in pc.binary_join(listes, " ").to_pylist()]
+
+
+def _phrase(text):
+    """Requête FTS5 : les racines de `text` en expression exacte (None si vide)"""
+    tokens = tokenize(text)
+    return '"' + " ".join(tokens) + '"' if tokens else None
+
+
+def _sql(serie):
+    """Colonne pandas -> valeurs Python liables par sqlite3 (None pour les manquants)"""
+    return [None if pd.isna(valeur) else valeur for valeur in serie.tolist()]
+
+
+def _date(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+class SearchIndex:
+    """
+    Index plein texte des offres normalisées (titre, entreprise, ville,
+    compétences, description) avec filtres sur la ville, le contrat, la
+    compétence, le télétravail, la source et la date de publication.
+
+    Le texte est analysé en Python (accents, mots vides, racinisation
+    légère) avant d'être confié à FTS5, si bien que « développeuses » trouve
+    « Développeur ». La mise à jour est incrémentale : une offre dont
+    l'empreinte n'a pas changé n'est pas réindexée.
+    """
+
+    def __init__(self, path=SEARCH_INDEX_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------------------------------------------------- indexation
+
+    def upsert(self, df):
+        """
+        Indexer un DataFrame au schéma commun (cf. normalisation).
+
+        Retourne le nombre d'offres nouvelles, modifiées et inchangées ; seules
+        les deux premières sont analysées et écrites, par lots.
+        """
+        df = df.drop_duplicates('Identifiant', keep='last')[list(COLONNES) + ['Description du poste']]
+        df = df.reset_index(drop=True)
+        empreintes = pd.util.hash_pandas_object(df.iloc[:, 1:], index=False).map('{:016x}'.format)
+        connues = pd.DataFrame.from_dict(self._known(df['Identifiant'].tolist()), orient='index',
+                                         columns=['rowid', 'empreinte']).reindex(df['Identifiant'].astype(object))
+        connue = connues['rowid'].notna().to_numpy()
+        inchangee = connue & (connues['empreinte'].to_numpy() == empreintes.to_numpy())
+        stats = {"nouvelles": int((~connue).sum()), "modifiees": int((connue & ~inchangee).sum()),
+                 "inchangees": int(inchangee.sum())}
+
+        a_ecrire = ~inchangee
+        df, empreintes = df[a_ecrire], empreintes[a_ecrire]
+        prochain = self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM offres").fetchone()[0] + 1
+        rowids = connues['rowid'].to_numpy()[a_ecrire].copy()
+        rowids[pd.isna(rowids)] = range(prochain, prochain + stats["nouvelles"])
+        rowids = rowids.astype('int64').tolist()
+        modifiees = [(rowid,) for rowid, deja in zip(rowids, connue[a_ecrire]) if deja]
+
+        valeurs = {colonne: _sql(df[source]) for source, colonne in COLONNES.items()}
+        valeurs['date_publication'] = _sql(pd.to_datetime(df['Date de publication'], errors='coerce')
+                                           .dt.strftime('%Y-%m-%d'))
+        offres = zip(rowids, *valeurs.values(), empreintes.tolist())
+        textes = zip(rowids, *(analyse_column(df[colonne]) for colonne in (
+            'Intitulé du poste', 'Nom de l entreprise', 'Ville ou région', 'Compétences mentionnées', 'Description du poste')))
+
+        colonnes = ", ".join(COLONNES.values())
+        with self.conn:
+            self.conn.executemany("DELETE FROM offres_fts WHERE rowid = ?", modifiees)
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO offres (rowid, {colonnes}, empreinte) "
+                f"VALUES ({', '.join('?' * (len(COLONNES) + 2))})", offres)
+            self.conn.executemany(
+                "INSERT INTO offres_fts (rowid, titre, entreprise, ville, competences, description) "
+                "VALUES (?, ?, ?, ?, ?, ?)", textes)
+        return stats
+
+    def remove(self, identifiants):
+        """Retirer des offres de l'index"""
+        identifiants = list(identifiants)
+        with self.conn:
+            for i in range(0, len(identifiants), 500):
+                lot = identifiants[i:i + 500]
+                placeholders = ",".join("?" * len(lot))
+                self.conn.execute(
+                    f"DELETE FROM offres_fts WHERE rowid IN "
+                    f"(SELECT rowid FROM offres WHERE identifiant IN ({placeholders}))", lot)
+                self.conn.execute(f"DELETE FROM offres WHERE identifiant IN ({placeholders})", lot)
+        return len(identifiants)
+
+    def sync(self, df, sources=None):
+        """
+        Aligner l'index sur `df` : upsert, puis retrait des offres absentes.
+
+        `sources` limite les retraits aux sources collectées en entier ; les
+        offres des autres sont conservées. None : toutes les sources.
+        """
+        stats = self.upsert(df)
+        presentes = set(df['Identifiant'])
+        requete, params = "SELECT identifiant FROM offres", []
+        if sources is not None:
+            params = sorted(sources)
+            requete += f" WHERE source IN ({', '.join('?' * len(params))})"
+        stats["supprimees"] = self.remove(
+            [row[0] for row in self.conn.execute(requete, params) if row[0] not in presentes])
+        # Fusion des segments FTS après un gros chargement (l'automerge suffit sinon)
+        if stats["nouvelles"] + stats["modifiees"] + stats["supprimees"] > self.count() // 10:
+            with self.conn:
+                self.conn.execute("INSERT INTO offres_fts (offres_fts) VALUES ('optimize')")
+        return stats
+
+    def ids(self):
+        """Identifiants des offres indexées"""
+        return {row[0] for row in self.conn.execute("SELECT identifiant FROM offres")}
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM offres").fetchone()[0]
+
+    # ---------------------------------------------------------- recherche
+
+    def search(self, query=None, city=None, contract=None, skill=None, since=None, until=None,
+               remote=None, source=None, limit=20):
+        """
+        Offres correspondant à tous les critères, les plus pertinentes d'abord
+        (BM25, le titre et les compétences comptant davantage), ou les plus
+        récentes s'il n'y a pas de mots-clés.
+
+        `query` : mots-clés (tous requis) ; `city` et `skill` sont cherchés dans
+        les colonnes ville et compétences ; `since` / `until` bornent la date
+        de publication ; `remote=True` garde le télétravail total ou partiel.
+        """
+        match = []
+        if query:
+            match += [f'"{token}"' for token in tokenize(query)]
+        for colonne, valeur in (("ville", city), ("competences", skill)):
+            phrase = _phrase(valeur) if valeur else None
+            if phrase:
+                match.append(f"{colonne} : {phrase}")
+
+        conditions, params = [], []
+        if match:
+            conditions.append("offres_fts MATCH ?")
+            params.append(" AND ".join(match))
+        if contract:
+            contrats = [contract] if isinstance(contract, str) else list(contract)
+            conditions.append(f"o.contrat IN ({', '.join('?' * len(contrats))})")
+            params += contrats
+        if since:
+            conditions.append("o.date_publication >= ?")
+            params.append(_date(since))
+        if until:
+            conditions.append("o.date_publication <= ?")
+            params.append(_date(until))
+        if remote is not None:
+            conditions.append(f"o.teletravail {'' if remote else 'NOT '}IN ({', '.join('?' * len(TELETRAVAIL_OUI))})")
+            params += TELETRAVAIL_OUI
+        if source:
+            conditions.append("o.source = ?")
+            params.append(source)
+
+        if match:
+            sql = (f"SELECT o.*, bm25(offres_fts, {', '.join(map(str, POIDS))}) AS score "
+                   f"FROM offres_fts JOIN offres o ON o.rowid = offres_fts.rowid")
+            ordre = "score, o.date_publication DESC"
+        else:
+            sql = "SELECT o.*, NULL AS score FROM offres o"
+            ordre = "o.date_publication DESC, o.rowid"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {ordre} LIMIT ?"
+        params.append(limit)
+        return [{k: row[k] for k in row.keys() if k not in ('rowid', 'empreinte')}
+                for row in self.conn.execute(sql, params)]
+
+    def get(self, identifiants):
+        """Offres indexées, dans l'ordre de `identifiants` (les absentes sont omises)"""
+        identifiants = list(identifiants)
+        offres = {}
+        for i in range(0, len(identifiants), 500):
+            lot = identifiants[i:i + 500]
+            offres.update((row['identifiant'], {k: row[k] for k in row.keys() if k not in ('rowid', 'empreinte')})
+                          for row in self.conn.execute(
+                              f"SELECT * FROM offres WHERE identifiant IN ({','.join('?' * len(lot))})", lot))
+        return [offres[identifiant] for identifiant in identifiants if identifiant in offres]
+
+    def _known(self, identifiants):
+        """identifiant -> (rowid, empreinte) des offres déjà indexées"""
+        connues = {}
+        identifiants = list(dict.fromkeys(identifiants))
+        for i in range(0, len(identifiants), 500):
+            lot = identifiants[i:i + 500]
+            placeholders = ",".join("?" * len(lot))
+            connues.update((identifiant, (rowid, empreinte)) for identifiant, rowid, empreinte in self.conn.execute(
+                f"SELECT identifiant, rowid, empreinte FROM offres WHERE identifiant IN ({placeholders})", lot))
+        return connues
@@ -0,0 +1,424 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from checkpoint import atomic_write_json
+
+# ==============================================================
+#  Offres similaires : plongements denses + index LSH (SimHash)
+# ==============================================================
+
+SIMILAR_INDEX_DIR = 'data/pipeline/similaires'
+DIMENSION = 256
+COMPOSANTES_PAR_TERME = 4
+# SimHash : TABLES tables de hachage de BITS bits ; PROBES bits les moins sûrs
+# inversés un à un pour sonder les seaux voisins (multi-probe)
+TABLES = 24
+BITS = 14
+PROBES = 8
+# Renouveler l'IDF figée des plongements (et reconstruire l'index) quand le
+# corpus du modèle a été multiplié par ce facteur depuis qu'elle a été figée
+REFIT_RATIO = 2
+# Réordonner les tables quand la queue non triée dépasse cette fraction de l'index
+COMPACT_RATIO = 0.1
+
+VECTEURS = 'vecteurs.f32'
+SIGNATURES = 'signatures.u32'
+EMPREINTES = 'empreintes.u64'
+SUPPRIMEES = 'supprimees.u32'
+IDENTIFIANTS = 'identifiants.txt'
+ORDRE = 'ordre.npy'
+CODES_TRIES = 'codes_tries.npy'
+META = 'meta.json'
+IDF = 'idf.npz'
+
+
+# --------------------------------------------------------------
+#  Plongements
+# --------------------------------------------------------------
+
+class OfferEmbedder:
+    """
+    Offre -> vecteur dense de `dim` composantes, normé : TF-IDF du modèle
+    (cf. modeling.OfferModel, titre + compétences + description) réduit par
+    une projection aléatoire creuse qui conserve approximativement les
+    similarités cosinus. Chaque colonne hachée contribue à COMPOSANTES_PAR_TERME
+    composantes de signe aléatoire ; la projection ne dépend que de `seed`.
+
+    `idf` remplace les pondérations du modèle : cf. `frozen`, qui les fige
+    d'un réentraînement à l'autre.
+    """
+
+    def __init__(self, model, dim=DIMENSION, seed=0, idf=None):
+        self.model = model
+        self.dim = dim
+        self.seed = seed
+        self.idf = np.asarray(model.idf if idf is None else idf, dtype=np.float32)
+        n_features = model.vectorizer.n_features
+        rng = np.random.default_rng(seed)
+        c = COMPOSANTES_PAR_TERME
+        self.projection = sparse.csr_matrix(
+            (rng.choice(np.array([-1, 1], dtype=np.float32), n_features * c) / np.float32(np.sqrt(c)),
+             (np.repeat(np.arange(n_features), c), rng.integers(0, dim, n_features * c))),
+            shape=(n_features, dim), dtype=np.float32)
+
+    @classmethod
+    def frozen(cls, model, path=SIMILAR_INDEX_DIR, update=False, **kwargs):
+        """
+        Plongements à l'IDF figée dans `path` : le modèle réentraîné à chaque
+        collecte calcule une nouvelle IDF, qui placerait les nouveaux vecteurs
+        dans un autre espace que les anciens. Avec `update`, l'IDF est figée
+        (ou renouvelée, ce qui change la clé et reconstruit l'index) quand
+        elle manque ou que le corpus du modèle a été multiplié par REFIT_RATIO.
+        """
+        chemin = os.path.join(path, IDF)
+        if os.path.exists(chemin):
+            with np.load(chemin) as figee:
+                idf, documents = figee["idf"], int(figee["documents"])
+            if len(idf) == len(model.idf) and not (update and model.n_documents >= REFIT_RATIO * documents):
+                return cls(model, idf=idf, **kwargs)
+        if update:
+            os.makedirs(path, exist_ok=True)
+            tmp = os.path.join(path, 'idf.tmp.npz')
+            np.savez(tmp, idf=model.idf, documents=model.n_documents)
+            os.replace(tmp, chemin)
+            print(f"   🧭 IDF des plongements figée sur {model.n_documents} offres")
+        return cls(model, **kwargs)
+
+    @property
+    def key(self):
+        """
+        Identifiant de l'espace des plongements : hachage du texte, IDF et
+        projection. Un index construit sous une autre clé est reconstruit.
+        """
+        config = {"vectorizer": self.model.vectorizer.get_params(), "dimension": self.dim, "graine": self.seed,
+                  "composantes": COMPOSANTES_PAR_TERME, "idf": hashlib.sha256(self.idf.tobytes()).hexdigest()}
+        return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+    def embed(self, df):
+        """Offres au schéma commun -> matrice (offres x dim) float32, lignes normées"""
+        vecteurs = (self.model.transform(df, self.idf).astype(np.float32) @ self.projection).toarray()
+        normes = np.linalg.norm(vecteurs, axis=1, keepdims=True)
+        return vecteurs / np.where(normes > 0, normes, 1)
+
+    def embed_skills(self, competences):
+        """Liste de compétences (ex. celles d'un CV) -> vecteur requête"""
+        if not isinstance(competences, str):
+            competences = ", ".join(competences)
+        requete = pd.DataFrame({'Intitulé du poste': [""], 'Compétences mentionnées': [competences],
+                                'Description du poste': [""]})
+        return self.embed(requete)[0]
+
+
+def content_fingerprints(df):
+    """Empreinte (uint64) du texte plongé de chaque offre : elle change quand l'offre doit être replongée"""
+    colonnes = ['Intitulé du poste', 'Compétences mentionnées', 'Description du poste']
+    return pd.util.hash_pandas_object(df[colonnes].astype(str), index=False).to_numpy(np.uint64)
+
+
+# --------------------------------------------------------------
+#  Index
+# --------------------------------------------------------------
+
+class SimilarityIndex:
+    """
+    Index des plus proches voisins (cosinus) sur les plongements des offres.
+
+    Chaque vecteur reçoit une signature SimHash par table (signe de BITS
+    projections aléatoires). Une requête lit, dans chaque table, son seau et
+    les seaux voisins obtenus en inversant ses bits les moins sûrs ; les
+    candidats sont ensuite reclassés exactement par produit scalaire.
+
+    Tout est stocké dans `path` sous forme de tableaux bruts relus en
+    mémoire projetée (np.memmap) : l'ouverture est quasi instantanée quelle
+    que soit la taille de l'index. Les ajouts sont écrits en fin de fichier
+    et cherchés par balayage tant qu'ils restent peu nombreux ; au-delà de
+    COMPACT_RATIO, les tables sont retriées.
+
+    Une offre retirée ou dont l'empreinte change (texte modifié) laisse une
+    ligne morte, écartée des résultats, que le compactage efface une fois
+    les lignes mortes au-delà de COMPACT_RATIO.
+    """
+
+    def __init__(self, path=SIMILAR_INDEX_DIR, dim=DIMENSION, tables=TABLES, bits=BITS, seed=0, model_key=None):
+        """
+        `model_key` identifie l'espace des plongements (cf. OfferEmbedder.key) :
+        un index construit avec une autre clé est vidé.
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, META)
+        self.meta = None
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                self.meta = json.load(f)
+            if (model_key is not None and self.meta.get("modele") != model_key) or not self._complete():
+                for name in (VECTEURS, SIGNATURES, EMPREINTES, SUPPRIMEES, IDENTIFIANTS, ORDRE, CODES_TRIES, META):
+                    if os.path.exists(self._file(name)):
+                        os.remove(self._file(name))
+                self.meta = None
+        if self.meta is None:
+            self.meta = {"dimension": dim, "tables": tables, "bits": bits, "graine": seed, "modele": model_key,
+                         "offres": 0, "triees": 0, "supprimees": 0, "octets_identifiants": 0}
+        self.dim, self.tables, self.bits = self.meta["dimension"], self.meta["tables"], self.meta["bits"]
+        if self.bits > 32:
+            raise ValueError("32 bits au plus par table")
+        rng = np.random.default_rng(self.meta["graine"])
+        self.hyperplans = rng.standard_normal((self.dim, self.tables * self.bits)).astype(np.float32)
+        self._poids = (np.uint32(1) << np.arange(self.bits, dtype=np.uint32))
+        self._open()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _complete(self):
+        """Fichiers au moins aussi longs que le méta l'annonce (sinon : compactage interrompu, index à refaire)"""
+        n = self.meta["offres"]
+        if "supprimees" not in self.meta:  # index antérieur aux empreintes
+            return False
+        tailles = {VECTEURS: n * self.meta["dimension"] * 4, SIGNATURES: n * self.meta["tables"] * 4,
+                   EMPREINTES: n * 8, SUPPRIMEES: self.meta["supprimees"] * 4,
+                   IDENTIFIANTS: self.meta["octets_identifiants"]}
+        return all(not taille or (os.path.exists(self._file(name)) and os.path.getsize(self._file(name)) >= taille)
+                   for name, taille in tailles.items())
+
+    def _open(self):
+        """Projeter les fichiers en mémoire et relire les identifiants"""
+        self._map()
+        self.identifiants = []
+        if self.meta["offres"]:
+            with open(self._file(IDENTIFIANTS), encoding='utf-8') as f:
+                self.identifiants = f.read().splitlines()[:self.meta["offres"]]
+        self._rangs = None
+
+    def _map(self):
+        """(Re)projeter les tableaux en mémoire, selon les tailles du méta"""
+        n, triees = self.meta["offres"], self.meta["triees"]
+        self.vecteurs = (np.memmap(self._file(VECTEURS), dtype=np.float32, mode='r', shape=(n, self.dim))
+                         if n else np.zeros((0, self.dim), dtype=np.float32))
+        self.signatures = (np.memmap(self._file(SIGNATURES), dtype=np.uint32, mode='r', shape=(n, self.tables))
+                           if n else np.zeros((0, self.tables), dtype=np.uint32))
+        self.empreintes = (np.memmap(self._file(EMPREINTES), dtype=np.uint64, mode='r', shape=(n,))
+                           if n else np.zeros(0, dtype=np.uint64))
+        self.vivantes = np.ones(n, dtype=bool)
+        if self.meta["supprimees"]:
+            self.vivantes[np.fromfile(self._file(SUPPRIMEES), dtype=np.uint32, count=self.meta["supprimees"])] = False
+        if triees:
+            self.ordre = np.load(self._file(ORDRE), mmap_mode='r')
+            self.codes_tries = np.load(self._file(CODES_TRIES), mmap_mode='r')
+        else:
+            self.ordre = self.codes_tries = np.zeros((self.tables, 0), dtype=np.uint32)
+
+    def __len__(self):
+        """Nombre d'offres indexées (lignes mortes exclues)"""
+        return self.meta["offres"] - self.meta["supprimees"]
+
+    @property
+    def rangs(self):
+        """identifiant -> ligne vivante (construit à la première demande)"""
+        if self._rangs is None:
+            self._rangs = {identifiant: i for i, identifiant in enumerate(self.identifiants) if self.vivantes[i]}
+        return self._rangs
+
+    # ---------------------------------------------------------- signatures
+
+    def _projections(self, vecteurs):
+        return (np.asarray(vecteurs, dtype=np.float32) @ self.hyperplans).reshape(-1, self.tables, self.bits)
+
+    def _codes(self, projections):
+        return ((projections > 0) * self._poids).sum(axis=2, dtype=np.uint32)
+
+    # ---------------------------------------------------------- écriture
+
+    def add(self, identifiants, vecteurs, empreintes=None):
+        """
+        Ajouter des offres (vecteurs normés, cf. OfferEmbedder). Un
+        identifiant déjà présent avec la même empreinte (cf. content_fingerprints)
+        est ignoré ; avec une autre, son ancien vecteur est remplacé.
+        Retourne le nombre de vecteurs écrits.
+        """
+        vecteurs = np.asarray(vecteurs, dtype=np.float32).reshape(-1, self.dim)
+        empreintes = (np.zeros(len(identifiants), dtype=np.uint64) if empreintes is None
+                      else np.asarray(empreintes, dtype=np.uint64))
+        a_ecrire, remplacees = [], []
+        # Dernière occurrence de chaque identifiant du lot
+        for identifiant, i in {identifiant: i for i, identifiant in enumerate(identifiants)}.items():
+            ligne = self.rangs.get(identifiant)
+            if ligne is None or self.empreintes[ligne] != empreintes[i]:
+                a_ecrire.append(i)
+                if ligne is not None:
+                    remplacees.append(ligne)
+        if not a_ecrire:
+            return 0
+        vecteurs = np.ascontiguousarray(vecteurs[a_ecrire])
+        # Le méta fait foi : un ajout interrompu avant son écriture est effacé
+        n = self.meta["offres"]
+        lignes = "".join(f"{identifiants[i]}\n" for i in a_ecrire).encode('utf-8')
+        for name, taille, contenu in (
+                (VECTEURS, n * self.dim * 4, vecteurs.tobytes()),
+                (SIGNATURES, n * self.tables * 4, self._codes(self._projections(vecteurs)).tobytes()),
+                (EMPREINTES, n * 8, empreintes[a_ecrire].tobytes()),
+                (IDENTIFIANTS, self.meta["octets_identifiants"], lignes)):
+            self._append(name, taille, contenu)
+        self._tombstone(remplacees)
+        self.meta["offres"] += len(a_ecrire)
+        self.meta["octets_identifiants"] += len(lignes)
+        for i in a_ecrire:
+            self.identifiants.append(identifiants[i])
+        self._commit()
+        return len(a_ecrire)
+
+    def outdated(self, identifiants, empreintes):
+        """Masque des offres absentes de l'index ou indexées avec une autre empreinte"""
+        lignes = [self.rangs.get(identifiant, -1) for identifiant in identifiants]
+        lignes = np.asarray(lignes, dtype=np.int64)
+        connues = lignes >= 0
+        masque = ~connues
+        masque[connues] = self.empreintes[lignes[connues]] != np.asarray(empreintes, dtype=np.uint64)[connues]
+        return masque
+
+    def remove(self, identifiants):
+        """Retirer des offres (les absentes sont ignorées) ; retourne le nombre de retraits"""
+        lignes = [self.rangs[identifiant] for identifiant in set(identifiants) if identifiant in self.rangs]
+        if lignes:
+            self._tombstone(lignes)
+            self._commit()
+        return len(lignes)
+
+    def _append(self, name, taille, contenu):
+        with open(self._file(name), 'ab') as f:
+            f.truncate(taille)
+            f.write(contenu)
+
+    def _tombstone(self, lignes):
+        """Marquer des lignes mortes (écrit avant le méta, comme les ajouts)"""
+        if lignes:
+            self._append(SUPPRIMEES, self.meta["supprimees"] * 4, np.asarray(lignes, dtype=np.uint32).tobytes())
+            self.meta["supprimees"] += len(lignes)
+
+    def _commit(self):
+        """Écrire le méta, puis compacter ou reprojeter les fichiers"""
+        n, triees, mortes = self.meta["offres"], self.meta["triees"], self.meta["supprimees"]
+        if n - triees > COMPACT_RATIO * triees or mortes > COMPACT_RATIO * n:
+            self.save()
+            self.compact()
+        else:
+            self.save()
+            self._map()
+        self._rangs = None
+
+    def save(self):
+        """Écrire le méta (les données sont déjà sur disque)"""
+        atomic_write_json(self._file(META), self.meta)
+
+    def compact(self, block=100_000):
+        """
+        Effacer les lignes mortes puis retrier chaque table sur l'ensemble des
+        signatures (la queue non triée disparaît). Un compactage interrompu
+        laisse des fichiers plus courts que le méta : l'index est alors vidé
+        à la réouverture et reconstruit par l'étape similar.
+        """
+        self._map()
+        if self.meta["supprimees"]:
+            garde = np.flatnonzero(self.vivantes)
+            for name, tableau in ((VECTEURS, self.vecteurs), (SIGNATURES, self.signatures),
+                                  (EMPREINTES, self.empreintes)):
+                with open(self._file(name + '.tmp'), 'wb') as f:
+                    for debut in range(0, len(garde), block):
+                        f.write(np.ascontiguousarray(tableau[garde[debut:debut + block]]).tobytes())
+            self.identifiants = [self.identifiants[i] for i in garde]
+            lignes = "".join(f"{identifiant}\n" for identifiant in self.identifiants).encode('utf-8')
+            with open(self._file(IDENTIFIANTS + '.tmp'), 'wb') as f:
+                f.write(lignes)
+            self.vecteurs = self.signatures = self.empreintes = None  # libérer les projections
+            for name in (VECTEURS, SIGNATURES, EMPREINTES, IDENTIFIANTS):
+                os.replace(self._file(name + '.tmp'), self._file(name))
+            os.remove(self._file(SUPPRIMEES))
+            self.meta.update(offres=len(garde), supprimees=0, octets_identifiants=len(lignes))
+            self._rangs = None
+        n = self.meta["offres"]
+        signatures = np.fromfile(self._file(SIGNATURES), dtype=np.uint32, count=n * self.tables)
+        signatures = np.ascontiguousarray(signatures.reshape(n, self.tables).T)
+        ordre = np.argsort(signatures, axis=1, kind='stable').astype(np.uint32)
+        codes = np.take_along_axis(signatures, ordre.astype(np.intp), axis=1)
+        del signatures
+        for name, tableau in ((ORDRE, ordre), (CODES_TRIES, codes)):
+            tmp = self._file(name + '.tmp.npy')
+            np.save(tmp, tableau)
+            os.replace(tmp, self._file(name))
+        self.meta["triees"] = n
+        self.save()
+        self._map()
+
+    # ---------------------------------------------------------- recherche
+
+    def candidates(self, vecteur, probes=PROBES):
+        """Lignes vivantes partageant un seau (ou un seau voisin) avec `vecteur` dans au moins une table"""
+        projections = self._projections(vecteur)[0]
+        codes = self._codes(projections[None])[0]
+        # Seau de la requête, puis seaux voisins : inversion d'un des `probes` bits les plus proches de 0
+        incertains = np.argsort(np.abs(projections), axis=1)[:, :probes]
+        sondes = np.concatenate([codes[:, None], codes[:, None] ^ self._poids[incertains]], axis=1)
+        morceaux = []
+        n, triees = self.meta["offres"], self.meta["triees"]
+        for t in range(self.tables):
+            if triees:
+                debuts = np.searchsorted(self.codes_tries[t], sondes[t], side='left')
+                fins = np.searchsorted(self.codes_tries[t], sondes[t], side='right')
+                morceaux += [self.ordre[t, d:f] for d, f in zip(debuts, fins) if f > d]
+            if n > triees:
+                queue = np.flatnonzero(np.isin(self.signatures[triees:, t], sondes[t])) + triees
+                morceaux.append(queue.astype(np.uint32))
+        if not morceaux:
+            return np.zeros(0, dtype=np.uint32)
+        lignes = np.unique(np.concatenate(morceaux))
+        return lignes[self.vivantes[lignes]]
+
+    def _top(self, lignes, scores, k, exclude):
+        garde = self.vivantes[lignes]
+        if exclude is not None:
+            garde &= lignes != exclude
+        lignes, scores = lignes[garde], scores[garde]
+        if len(scores) > k:
+            meilleurs = np.argpartition(-scores, k - 1)[:k]
+            lignes, scores = lignes[meilleurs], scores[meilleurs]
+        ordre = np.argsort(-scores, kind='stable')
+        return [(self.identifiants[i], float(s)) for i, s in zip(lignes[ordre], scores[ordre])]
+
+    def search(self, vecteur, k=20, probes=PROBES, exclude=None):
+        """
+        Les `k` offres les plus proches de `vecteur` : [(identifiant, cosinus)],
+        approximatif (seuls les candidats LSH sont comparés).
+        """
+        vecteur = np.asarray(vecteur, dtype=np.float32).ravel()
+        lignes = self.candidates(vecteur, probes).astype(np.int64)
+        if len(lignes) < k + (exclude is not None):
+            return self.exact(vecteur, k, exclude)
+        return self._top(lignes, self.vecteurs[lignes] @ vecteur, k, exclude)
+
+    def exact(self, vecteur, k=20, exclude=None, block=100_000):
+        """Recherche exhaustive (référence du benchmark rappel / latence)"""
+        vecteur = np.asarray(vecteur, dtype=np.float32).ravel()
+        n = self.meta["offres"]
+        scores = np.concatenate([self.vecteurs[i:i + block] @ vecteur for i in range(0, n, block)]
+                                or [np.zeros(0, dtype=np.float32)])
+        return self._top(np.arange(n), scores, k, exclude)
+
+    def similar_to(self, identifiant, k=20, probes=PROBES):
+        """Les `k` offres les plus proches d'une offre déjà indexée (elle-même exclue)"""
+        ligne = self.rangs[identifiant]
+        return self.search(self.vecteurs[ligne], k, probes, exclude=ligne)
+
+
+def recall_at_k(index, requetes, k=20, probes=PROBES):
+    """Rappel moyen des k voisins approximatifs par rapport à la recherche exacte"""
+    rappels = []
+    for vecteur in requetes:
+        exacts = {identifiant for identifiant, _ in index.exact(vecteur, k)}
+        approches = {identifiant for identifiant, _ in index.search(vecteur, k, probes)}
+        rappels.append(len(exacts & approches) / max(len(exacts), 1))
+    return float(np.mean(rappels)) if rappels else None
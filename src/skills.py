@@ -0,0 +1,222 @@
+import json
+import re
+import unicodedata
+
+# ==============================================================
+#  Extraction des compétences (taxonomie + regex compilée unique)
+# ==============================================================
+
+# Compétence canonique -> synonymes / variantes d'écriture.
+# L'ordre des clés est celui des résultats.
+SKILL_TAXONOMY = {
+    # Langages
+    "python": [],
+    "java": [],
+    "javascript": ["js", "ecmascript"],
+    "typescript": [],
+    "php": [],
+    "c#": ["csharp", "c sharp"],
+    "c++": ["cpp"],
+    "golang": [],
+    "rust": [],
+    "kotlin": [],
+    "swift": [],
+    "scala": [],
+    "dart": [],
+    "ruby": ["ruby on rails", "rails"],
+    "sql": ["t-sql", "pl/sql", "plsql"],
+    "bash": ["shell", "scripting shell"],
+    "powershell": [],
+    "html": ["html5"],
+    "css": ["css3", "sass", "scss"],
+    # Frameworks
+    "react": ["reactjs", "react.js", "react native"],
+    "angular": ["angularjs"],
+    "vue.js": ["vuejs", "vue js", "nuxt"],
+    "node.js": ["nodejs", "node js"],
+    "symfony": [],
+    "laravel": [],
+    "django": [],
+    "flask": [],
+    "fastapi": [],
+    "spring": ["spring boot", "springboot"],
+    ".net": ["dotnet", "asp.net", ".net core"],
+    "flutter": [],
+    "graphql": [],
+    # Données
+    "mongodb": ["mongo"],
+    "postgresql": ["postgres"],
+    "mysql": ["mariadb"],
+    "oracle": [],
+    "nosql": [],
+    "redis": [],
+    "elasticsearch": ["elastic search", "elk"],
+    "spark": ["apache spark", "pyspark"],
+    "hadoop": [],
+    "kafka": [],
+    "airflow": [],
+    "databricks": [],
+    "snowflake": [],
+    "bigquery": [],
+    "etl": ["talend"],
+    "power bi": ["powerbi"],
+    "excel": [],
+    "pandas": [],
+    "machine learning": ["apprentissage automatique"],
+    "deep learning": ["apprentissage profond"],
+    "data science": [],
+    "nlp": ["traitement automatique du langage"],
+    "tensorflow": [],
+    "pytorch": [],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    # Cloud, DevOps, systèmes
+    "docker": [],
+    "kubernetes": ["k8s"],
+    "aws": ["amazon web services"],
+    "azure": ["microsoft azure"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "devops": [],
+    "cloud": [],
+    "terraform": [],
+    "ansible": [],
+    "jenkins": [],
+    "ci/cd": ["ci cd", "intégration continue", "gitlab ci", "github actions"],
+    "git": ["github", "gitlab"],
+    "linux": ["unix", "debian", "ubuntu", "red hat", "redhat"],
+    "windows server": [],
+    "vmware": [],
+    "active directory": [],
+    "cisco": [],
+    "microservices": ["micro services", "microservice"],
+    "api rest": ["rest api", "restful", "api restful"],
+    # Sécurité, méthodes, outils
+    "cybersécurité": ["sécurité informatique", "cybersecurity"],
+    "pentest": ["pentesting", "test d'intrusion", "tests d'intrusion"],
+    "sap": [],
+    "salesforce": [],
+    "agile": ["méthodes agiles", "méthodologie agile"],
+    "scrum": [],
+    "jira": [],
+    "itil": [],
+    "figma": [],
+    "ux/ui": ["ux", "ui", "ui/ux", "ux design", "ui design"],
+    "selenium": [],
+    "cypress": [],
+}
+
+_ACCENTS = {
+    "a": "aàâä", "e": "eéèêë", "i": "iîï", "o": "oôö", "u": "uùûü", "c": "cç",
+}
+# Caractères pouvant faire partie d'un nom de compétence : aucune correspondance
+# ne doit être collée à l'un d'eux (« java » dans « javascript », « c » dans « c# »...)
+_WORD = r"[\w+#]"
+_SEPARATOR = r"[\s\-_]+"
+
+
+def normalise_skill(text):
+    """Forme canonique de comparaison : minuscules, sans accents, séparateurs unifiés"""
+    text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[\s\-_]+", " ", text).strip()
+
+
+def _units(word):
+    """Découper un terme normalisé en fragments de regex (tolérants aux accents/séparateurs)"""
+    units = []
+    for ch in word:
+        if ch == " ":
+            units.append(_SEPARATOR)
+        elif ch in _ACCENTS:
+            units.append(f"[{_ACCENTS[ch]}]")
+        else:
+            units.append(re.escape(ch))
+    return units
+
+
+def _trie_regex(words):
+    """
+    Alternance factorisée en trie (préfixes communs partagés) : le moteur
+    de regex teste au plus une branche par caractère au lieu de tous les termes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for unit in _units(word):
+            node = node.setdefault(unit, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [unit + build(child) for unit, child in sorted(node.items()) if unit]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class SkillExtractor:
+    """
+    Extracteur de compétences compilé une seule fois pour toute la taxonomie.
+
+    Toutes les variantes sont fusionnées dans une regex unique, factorisée en
+    trie, insensible à la casse et aux accents, avec des frontières de mot
+    adaptées aux noms techniques (« c# », « node.js », « .net »).
+    """
+
+    def __init__(self, taxonomy=None):
+        self.taxonomy = taxonomy or SKILL_TAXONOMY
+        self._canonical = {}
+        self._rank = {}
+        for rank, (skill, synonyms) in enumerate(self.taxonomy.items()):
+            self._rank[skill] = rank
+            for variant in [skill, *synonyms]:
+                self._canonical.setdefault(normalise_skill(variant), skill)
+        body = _trie_regex(sorted(self._canonical))
+        # Le texte est passé en minuscules avant la recherche : plus rapide que re.IGNORECASE
+        self.pattern = re.compile(f"(?<!{_WORD})(?:{body})(?!{_WORD})")
+        self._match_cache = {}
+
+    @classmethod
+    def from_json(cls, path):
+        """Charger une taxonomie {compétence: [synonymes]} depuis un fichier JSON"""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _canonicalise(self, matches):
+        cache = self._match_cache
+        found = set()
+        for match in matches:
+            skill = cache.get(match)
+            if skill is None:
+                skill = cache[match] = self._canonical.get(normalise_skill(match), "")
+            found.add(skill)
+        found.discard("")
+        return sorted(found, key=self._rank.__getitem__)
+
+    def extract(self, text):
+        """Compétences canoniques présentes dans `text`, dans l'ordre de la taxonomie"""
+        if not text:
+            return []
+        return self._canonicalise(self.pattern.findall(text.lower()))
+
+    def extract_many(self, texts):
+        return [self.extract(text) for text in texts]
+
+    def tag_column(self, series):
+        """Version vectorisée sur une colonne pandas : Series de listes de compétences"""
+        return series.fillna("").astype(str).str.lower().str.findall(self.pattern).map(self._canonicalise)
+
+    def tag_offers(self, offers, fields=("intitule", "description"), target="competences_extraites"):
+        """Ajouter à chaque offre brute la liste des compétences trouvées dans `fields`"""
+        for offer in offers:
+            text = "\n".join(str(offer.get(field) or "") for field in fields)
+            offer[target] = self.extract(text)
+        return offers
+
+
+# Instance partagée, construite une fois à l'import
+DEFAULT_EXTRACTOR = SkillExtractor()
+
+
+def extract_skills(text):
+    return DEFAULT_EXTRACTOR.extract(text)
@@ -0,0 +1,222 @@
+import gzip
+import io
+import json
+import os
+from datetime import datetime
+from itertools import islice
+
+# ==============================================================
+#  Écriture en flux : JSONL (compressé ou non) et Parquet
+# ==============================================================
+
+EXTENSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def batched(iterable, size):
+    """Découper un itérable en listes de `size` éléments"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("La compression zstd nécessite le paquet 'zstandard'") from e
+    return zstandard
+
+
+def compression_from_path(path):
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+class JsonlWriter:
+    """
+    Ajout d'enregistrements JSONL par lots, au fil de la collecte.
+
+    Chaque lot est écrit puis vidé sur disque immédiatement ; en mode
+    compressé il forme un membre gzip / une trame zstd autonome, si bien que
+    le fichier reste lisible après un arrêt brutal et que `offset` (position
+    après le dernier lot) est toujours une frontière valide.
+    """
+
+    def __init__(self, path, compression=None, mode="w", fsync=False):
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Compression inconnue: {compression}")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.compression = compression
+        self.fsync = fsync
+        self.rows = 0
+        self._file = open(path, mode + "b")
+        self._compressor = _zstd().ZstdCompressor(level=3) if compression == "zstd" else None
+
+    @property
+    def offset(self):
+        return self._file.tell()
+
+    def write_batch(self, records):
+        if not records:
+            return self.offset
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        if self.compression == "gzip":
+            data = gzip.compress(data, compresslevel=6)
+        elif self.compression == "zstd":
+            data = self._compressor.compress(data)
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.rows += len(records)
+        return self.offset
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl(path, compression=None):
+    """Relire un fichier JSONL (compression déduite de l'extension par défaut)"""
+    compression = compression or compression_from_path(path)
+    if compression == "gzip":
+        stream = gzip.open(path, "rt", encoding="utf-8")
+    elif compression == "zstd":
+        raw = open(path, "rb")
+        reader = _zstd().ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        stream = io.TextIOWrapper(reader, encoding="utf-8")
+    else:
+        stream = open(path, encoding="utf-8")
+    with stream:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+# --------------------------------------------------------------
+#  Conversion colonnaire (Parquet)
+# --------------------------------------------------------------
+
+def _date(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _libelles(items, key="libelle"):
+    return [item.get(key) for item in items or [] if isinstance(item, dict) and item.get(key)]
+
+
+def flatten_offer(offer):
+    """Aplatir une offre brute France Travail en colonnes typées"""
+    lieu = offer.get("lieuTravail") or {}
+    entreprise = offer.get("entreprise") or {}
+    salaire = offer.get("salaire") or {}
+    origine = offer.get("origineOffre") or {}
+    metiers = offer.get("metier_recherche")
+    return {
+        "id": offer.get("id"),
+        "intitule": offer.get("intitule"),
+        "description": offer.get("description"),
+        "date_creation": _date(offer.get("dateCreation")),
+        "date_actualisation": _date(offer.get("dateActualisation")),
+        "lieu_libelle": lieu.get("libelle"),
+        "lieu_code_postal": lieu.get("codePostal"),
+        "lieu_commune": lieu.get("commune"),
+        "lieu_latitude": _float(lieu.get("latitude")),
+        "lieu_longitude": _float(lieu.get("longitude")),
+        "entreprise_nom": entreprise.get("nom"),
+        "entreprise_adaptee": entreprise.get("entrepriseAdaptee"),
+        "rome_code": offer.get("romeCode"),
+        "rome_libelle": offer.get("romeLibelle"),
+        "appellation_libelle": offer.get("appellationlibelle"),
+        "type_contrat": offer.get("typeContrat"),
+        "type_contrat_libelle": offer.get("typeContratLibelle"),
+        "nature_contrat": offer.get("natureContrat"),
+        "experience_exige": offer.get("experienceExige"),
+        "experience_libelle": offer.get("experienceLibelle"),
+        "competences": _libelles(offer.get("competences")),
+        "qualites_professionnelles": _libelles(offer.get("qualitesProfessionnelles")),
+        "formations": _libelles(offer.get("formations"), "domaineLibelle"),
+        "langues": _libelles(offer.get("langues")),
+        "salaire_libelle": salaire.get("libelle"),
+        "salaire_commentaire": salaire.get("commentaire"),
+        "duree_travail_libelle": offer.get("dureeTravailLibelle"),
+        "alternance": offer.get("alternance"),
+        "nombre_postes": offer.get("nombrePostes"),
+        "accessible_th": offer.get("accessibleTH"),
+        "qualification_libelle": offer.get("qualificationLibelle"),
+        "secteur_activite_libelle": offer.get("secteurActiviteLibelle"),
+        "origine_url": origine.get("urlOrigine"),
+        "metier_recherche": metiers if isinstance(metiers, list) else [metiers] if metiers else [],
+    }
+
+
+def offer_schema():
+    import pyarrow as pa
+
+    texte = pa.string()
+    liste = pa.list_(pa.string())
+    date = pa.timestamp("s", tz="UTC")
+    return pa.schema([
+        ("id", texte), ("intitule", texte), ("description", texte),
+        ("date_creation", date), ("date_actualisation", date),
+        ("lieu_libelle", texte), ("lieu_code_postal", texte), ("lieu_commune", texte),
+        ("lieu_latitude", pa.float64()), ("lieu_longitude", pa.float64()),
+        ("entreprise_nom", texte), ("entreprise_adaptee", pa.bool_()),
+        ("rome_code", texte), ("rome_libelle", texte), ("appellation_libelle", texte),
+        ("type_contrat", texte), ("type_contrat_libelle", texte), ("nature_contrat", texte),
+        ("experience_exige", texte), ("experience_libelle", texte),
+        ("competences", liste), ("qualites_professionnelles", liste),
+        ("formations", liste), ("langues", liste),
+        ("salaire_libelle", texte), ("salaire_commentaire", texte),
+        ("duree_travail_libelle", texte), ("alternance", pa.bool_()),
+        ("nombre_postes", pa.int32()), ("accessible_th", pa.bool_()),
+        ("qualification_libelle", texte), ("secteur_activite_libelle", texte),
+        ("origine_url", texte), ("metier_recherche", liste),
+    ])
+
+
+def jsonl_to_parquet(jsonl_path, parquet_path, batch_size=10000, flatten=flatten_offer, schema=None):
+    """
+    Convertir un JSONL en Parquet par lots (un row group par lot).
+
+    La mémoire utilisée est celle d'un lot, indépendamment de la taille du
+    fichier. Retourne le nombre de lignes écrites.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = schema or offer_schema()
+    if os.path.dirname(parquet_path):
+        os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    rows = 0
+    with pq.ParquetWriter(parquet_path, schema, compression="zstd") as writer:
+        for batch in batched(iter_jsonl(jsonl_path), batch_size):
+            table = pa.Table.from_pylist([flatten(r) for r in batch], schema=schema)
+            writer.write_table(table)
+            rows += len(batch)
+    return rows
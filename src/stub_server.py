@@ -0,0 +1,330 @@
+import argparse
+import hashlib
+import html
+import json
+import random
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# ==============================================================
+#  Serveur local imitant France Travail et les sites scrapés
+# ==============================================================
+#
+#  - POST /connexion/oauth2/access_token   token OAuth2
+#  - GET  /partenaire/offresdemploi/v2/offres/search
+#         pagination `range` + Content-Range, plafond de 3150 résultats,
+#         filtres departement / minCreationDate / maxCreationDate / publieeDepuis
+#  - GET  /jobs/search/..., /Emploi/..., /offres/...
+#         pages de résultats LinkedIn, Glassdoor et ChooseYourBoss
+#
+#  Les données sont synthétiques mais déterministes : une même requête
+#  renvoie toujours la même réponse (ETag compris) pour un jour donné.
+
+TOKEN_PATH = "/connexion/oauth2/access_token"
+API_PATH = "/partenaire/offresdemploi/v2"
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+MAX_WINDOW = 150
+MAX_START = 3000
+MAX_END = 3149
+
+INTITULES = ["Développeur Python", "Développeur Java / Spring Boot", "Data Engineer Spark",
+             "Ingénieur DevOps AWS", "Administrateur systèmes Linux", "Data Analyst Power BI",
+             "Développeur React / Node.js", "Ingénieur cybersécurité", "Chef de projet informatique",
+             "Technicien support informatique"]
+ENTREPRISES = ["Capgemini", "Sopra Steria", "Atos", "Orange", "Thales", "Startup Tech", "OVHcloud"]
+VILLES = [("75", "Paris"), ("69", "Lyon"), ("31", "Toulouse"), ("33", "Bordeaux"), ("44", "Nantes"),
+          ("59", "Lille"), ("13", "Marseille"), ("35", "Rennes"), ("67", "Strasbourg"), ("06", "Nice")]
+CONTRATS = [("CDI", "Contrat à durée indéterminée"), ("CDD", "Contrat à durée déterminée - 12 Mois"),
+            ("MIS", "Mission intérimaire - 6 Mois"), ("LIB", "Profession libérale")]
+COMPETENCES = ["Python", "Java", "SQL", "Docker", "Kubernetes", "AWS", "Linux", "Git", "React",
+               "Angular", "Spark", "Power BI", "Scrum", "Terraform", "PostgreSQL"]
+
+
+def _seed(*parts):
+    return zlib.crc32("|".join(str(part) for part in parts).encode("utf-8"))
+
+
+def keyword_total(keyword):
+    """Nombre d'offres par défaut d'un mot-clé (stable d'un lancement à l'autre)"""
+    return 20 + _seed(keyword) % 300
+
+
+def make_offer(number, reference):
+    """Offre synthétique au format de l'API, entièrement déterminée par son numéro"""
+    rng = random.Random(number)
+    code, ville = rng.choice(VILLES)
+    contrat, contrat_libelle = rng.choice(CONTRATS)
+    creation = reference - timedelta(days=rng.uniform(0, 90))
+    intitule = rng.choice(INTITULES)
+    competences = rng.sample(COMPETENCES, 3)
+    salaire_min = rng.randrange(30, 55)
+    return {
+        "id": f"{number:07d}",
+        "intitule": intitule,
+        "description": f"{intitule} : vous travaillerez avec {', '.join(competences)} au sein d'une équipe agile.",
+        "dateCreation": creation.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "dateActualisation": creation.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "lieuTravail": {"libelle": f"{code} - {ville}", "codePostal": f"{code}000"},
+        "romeCode": "M1805",
+        "entreprise": {"nom": rng.choice(ENTREPRISES)},
+        "typeContrat": contrat,
+        "typeContratLibelle": contrat_libelle,
+        "experienceLibelle": rng.choice(["Débutant accepté", "2 An(s)", "5 An(s)"]),
+        "salaire": {"libelle": f"Annuel de {salaire_min}000 Euros à {salaire_min + 10}000 Euros"},
+        "competences": [{"libelle": libelle} for libelle in competences],
+        "dureeTravailLibelle": "35H Horaires normaux",
+    }
+
+
+def keyword_offers(keyword, total, reference):
+    """Offres d'un mot-clé ; les mots-clés se recouvrent en partie (doublons réalistes)"""
+    pool = max(5000, total)
+    start = _seed(keyword) % pool
+    return [make_offer((start + 7 * i) % pool, reference) for i in range(total)]
+
+
+def filter_offers(offers, params, reference):
+    """Appliquer les filtres de l'API gérés par le bouchon"""
+    if "departement" in params:
+        offers = [o for o in offers if o["lieuTravail"]["libelle"].startswith(params["departement"] + " ")]
+    if "publieeDepuis" in params:
+        params = dict(params, minCreationDate=(reference - timedelta(days=int(params["publieeDepuis"])))
+                      .strftime(DATE_FORMAT), maxCreationDate=reference.strftime(DATE_FORMAT))
+    if "minCreationDate" in params:
+        debut, fin = params["minCreationDate"], params.get("maxCreationDate", "9999")
+        offers = [o for o in offers if debut <= o["dateCreation"][:19] + "Z" <= fin]
+    return offers
+
+
+# --------------------------------------------------------------
+#  Pages HTML des sites
+# --------------------------------------------------------------
+
+def _cards(site, path, count):
+    rng = random.Random(_seed(site, path))
+    contract = "Stage" if "stage" in path.lower() else "Alternance"
+    for i in range(count):
+        title = f"{contract} {rng.choice(INTITULES)}"
+        company = rng.choice(ENTREPRISES)
+        city = rng.choice(VILLES)[1]
+        remote = rng.random() < 0.3
+        yield i, html.escape(title), html.escape(company), city, remote
+
+
+def linkedin_page(path, count=25):
+    cards = "".join(
+        f'<li><div class="base-card job-search-card"><div class="base-search-card__info">'
+        f'<h3 class="base-search-card__title">{title}</h3>'
+        f'<h4 class="base-search-card__subtitle"><a href="/company/{i}">{company}</a></h4>'
+        f'<div class="base-search-card__metadata"><span class="job-search-card__location">{city}</span></div>'
+        f'</div></div></li>'
+        for i, title, company, city, _ in _cards("linkedin", path, count))
+    return f'<html><body><header>LinkedIn</header><ul class="jobs-search__results-list">{cards}</ul></body></html>'
+
+
+def glassdoor_page(path, count=25):
+    cards = "".join(
+        f'<li class="react-job-listing" data-id="{i}"><div class="jobCard">'
+        f'<a class="jobLink" href="/job/{i}">{title}</a>'
+        f'<div class="employer-name">{company}</div><span class="location">{city}</span>'
+        f'</div></li>'
+        for i, title, company, city, _ in _cards("glassdoor", path, count))
+    return f'<html><body><nav>Glassdoor</nav><ul class="jobsList">{cards}</ul></body></html>'
+
+
+def chooseyourboss_page(path, count=25):
+    cards = "".join(
+        f'<div class="job-item{" remote" if remote else ""}"><h3 class="title">{title}</h3>'
+        f'<div class="company">{company}</div><div class="location">{city}</div>'
+        f'<div class="salary">{1000 + 50 * (i % 10)} € / mois</div>'
+        f'<a href="/offre/{i}">Voir l\'offre</a>{"<span>Télétravail partiel</span>" if remote else ""}</div>'
+        for i, title, company, city, remote in _cards("chooseyourboss", path, count))
+    return f'<html><body><main class="offers">{cards}</main></body></html>'
+
+
+SITE_PAGES = {"/jobs/search": linkedin_page, "/Emploi/": glassdoor_page, "/offres/": chooseyourboss_page}
+
+
+# --------------------------------------------------------------
+#  Serveur
+# --------------------------------------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        headers = dict(headers or {})
+        if status in (200, 206) and body:
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+            headers["ETag"] = etag
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status not in (204, 304):
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status not in (204, 304):
+            self.wfile.write(body)
+
+    def _json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+    def do_POST(self):
+        stub = self.server.stub
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        stub.record("POST", self.path)
+        if urlsplit(self.path).path != TOKEN_PATH:
+            return self._json(404, {"error": "not_found"})
+        stub.tokens_issued += 1
+        self._json(200, {"access_token": f"stub-token-{stub.tokens_issued}",
+                         "token_type": "Bearer", "expires_in": 1499})
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.record("GET", self.path)
+        url = urlsplit(self.path)
+        if url.path == API_PATH + "/offres/search":
+            return self._search({k: v[0] for k, v in parse_qs(url.query).items()})
+        for prefix, render in SITE_PAGES.items():
+            if url.path.startswith(prefix):
+                body = render(self.path, stub.cards_per_page).encode("utf-8")
+                return self._send(200, body, "text/html; charset=utf-8")
+        self._send(404, b"<html><body>Not found</body></html>", "text/html; charset=utf-8")
+
+    def _search(self, params):
+        stub = self.server.stub
+        if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+            return self._json(401, {"message": "Token manquant"})
+        debut, _, fin = params.get("range", "0-149").partition("-")
+        debut, fin = int(debut), int(fin)
+        if fin < debut or fin - debut >= MAX_WINDOW or debut > MAX_START or fin > MAX_END:
+            return self._json(400, {"message": f"Plage incorrecte : {debut}-{fin}"})
+
+        keyword = params.get("motsCles", "")
+        failure = stub.failure(keyword)
+        if failure:
+            headers = {"Retry-After": stub.retry_after} if stub.retry_after is not None else None
+            return self._json(failure, {"message": "Erreur simulée"}, headers)
+        offers = filter_offers(stub.offers(keyword), params, stub.reference)
+        total = len(offers)
+        if total == 0:
+            return self._send(204)
+        if debut >= total:
+            return self._json(400, {"message": f"Plage incorrecte : {debut}-{fin}"})
+        page = offers[debut:fin + 1]
+        status = 200 if debut == 0 and fin + 1 >= total else 206
+        self._json(status, {"resultats": page},
+                   {"Content-Range": f"offres {debut}-{debut + len(page) - 1}/{total}",
+                    "Accept-Range": "offres 150"})
+
+
+class StubServer:
+    """
+    Serveur bouchon démarré dans un thread (port aléatoire par défaut).
+
+    `totals` fixe le nombre d'offres de certains mots-clés, `failures` le
+    code d'erreur renvoyé pour d'autres : un code renvoyé à chaque requête,
+    ou une liste de codes renvoyés un par un avant les réponses normales.
+    Les erreurs portent l'en-tête Retry-After `retry_after` s'il est fixé.
+    `requests` garde la trace des requêtes reçues (méthode, chemin).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, totals=None, cards_per_page=25, reference=None, failures=None,
+                 retry_after=None):
+        self.totals = dict(totals or {})
+        self.failures = {keyword: list(codes) if isinstance(codes, (list, tuple)) else codes
+                         for keyword, codes in (failures or {}).items()}
+        self.retry_after = retry_after
+        self.cards_per_page = cards_per_page
+        # Date de référence des offres : début de la journée, pour des réponses stables sur 24 h
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.reference = reference or now.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.requests = []
+        self.tokens_issued = 0
+        self._lock = threading.Lock()
+        self._offers = {}
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def token_url(self):
+        return self.url + TOKEN_PATH
+
+    @property
+    def api_url(self):
+        return self.url + API_PATH
+
+    def offers(self, keyword):
+        with self._lock:
+            if keyword not in self._offers:
+                total = self.totals.get(keyword, keyword_total(keyword))
+                self._offers[keyword] = keyword_offers(keyword, total, self.reference)
+            return self._offers[keyword]
+
+    def failure(self, keyword):
+        """Code d'erreur à renvoyer pour ce mot-clé (None : réponse normale)"""
+        with self._lock:
+            codes = self.failures.get(keyword)
+            if isinstance(codes, list):
+                return codes.pop(0) if codes else None
+            return codes
+
+    def record(self, method, path):
+        with self._lock:
+            self.requests.append((method, path))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur local imitant France Travail et les sites scrapés")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cards", type=int, default=25, help="Nombre de cartes par page HTML")
+    args = parser.parse_args(argv)
+
+    stub = StubServer(args.host, args.port, cards_per_page=args.cards)
+    print(f"🧪 Serveur bouchon sur {stub.url}")
+    print(f"   FRANCE_TRAVAIL_TOKEN_URL={stub.token_url}")
+    print(f"   FRANCE_TRAVAIL_API_URL={stub.api_url}")
+    print(f"   SCRAPER_BASE_URL={stub.url}")
+    try:
+        stub._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
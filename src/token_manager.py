@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+from http_client import get_client
+
+# ==============================================================
+#  Gestion du token OAuth2 (client credentials)
+# ==============================================================
+
+
+class TokenManager:
+    """
+    Cache d'un token OAuth2 « client credentials ».
+
+    Le token est gardé en mémoire (et optionnellement sur disque, indexé par
+    client ID + scope), rafraîchi avant expiration par un timer en arrière-plan
+    et partageable entre threads : un seul rafraîchissement a lieu même si
+    plusieurs workers reçoivent un 401 en même temps.
+    """
+
+    def __init__(self, client_id, client_secret, scope, token_url, realm="/partenaire",
+                 cache_path=None, refresh_margin=60, auto_refresh=True, client=None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+        self.token_url = token_url
+        self.realm = realm
+        self.cache_path = cache_path
+        self.refresh_margin = refresh_margin
+        self.auto_refresh = auto_refresh
+        self.client = client or get_client()
+
+        self.cache_key = hashlib.sha256(f"{client_id}|{scope}".encode("utf-8")).hexdigest()
+        self._lock = threading.Lock()
+        self._timer = None
+        self._token = None
+        self._expires_at = 0.0
+        self._load_cache()
+
+    # ---------------------------------------------------------- API publique
+
+    def get_token(self):
+        """Retourner un token valide (None si l'authentification échoue)"""
+        with self._lock:
+            if self._is_valid():
+                return self._token
+            return self._refresh_locked()
+
+    def refresh(self, stale_token=None):
+        """
+        Forcer un rafraîchissement (après un 401 par exemple).
+
+        Si `stale_token` a déjà été remplacé par un autre thread, le nouveau
+        token est retourné sans nouvel appel au serveur d'authentification.
+        """
+        with self._lock:
+            if stale_token is not None and self._token != stale_token and self._is_valid():
+                return self._token
+            return self._refresh_locked()
+
+    def close(self):
+        """Arrêter le rafraîchissement en arrière-plan"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    # ---------------------------------------------------------- interne
+
+    def _is_valid(self):
+        return self._token is not None and time.time() < self._expires_at - self.refresh_margin
+
+    def _refresh_locked(self):
+        params = {"realm": self.realm}
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "scope": self.scope
+        }
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+        print("🔐 Authentification en cours...")
+        try:
+            response = self.client.post(self.token_url, params=params, data=data, headers=headers,
+                                        label="authentification")
+        except requests.RequestException as e:
+            # Serveur injoignable : même traitement qu'un refus, le timer reste programmé
+            print(f"❌ Erreur d'authentification ({type(e).__name__}): {e}")
+            return None
+
+        if response.status_code != 200:
+            print(f"❌ Erreur d'authentification ({response.status_code}): {response.text}")
+            return None
+
+        payload = response.json()
+        print("✅ Authentification réussie !")
+        self._token = payload["access_token"]
+        self._expires_at = time.time() + float(payload.get("expires_in", 1499))
+        self._save_cache()
+        self._schedule()
+        return self._token
+
+    def _schedule(self):
+        """Programmer le prochain rafraîchissement juste avant l'expiration"""
+        if not self.auto_refresh:
+            return
+        if self._timer:
+            self._timer.cancel()
+        delay = max(1.0, self._expires_at - self.refresh_margin - time.time())
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        with self._lock:
+            if self._refresh_locked() is None and self._token and time.time() < self._expires_at:
+                # Échec : on réessaie bientôt tant que l'ancien token reste valable
+                self._timer = threading.Timer(30, self._background_refresh)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                entry = json.load(f).get(self.cache_key)
+        except (OSError, ValueError):
+            return
+        if entry:
+            self._token = entry["access_token"]
+            self._expires_at = entry["expires_at"]
+            if self._is_valid():
+                self._schedule()
+
+    def _save_cache(self):
+        """Écriture atomique (fichier temporaire + rename), lisible par le seul utilisateur"""
+        if not self.cache_path:
+            return
+        cache = {}
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, encoding="utf-8") as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                cache = {}
+        cache[self.cache_key] = {"access_token": self._token, "expires_at": self._expires_at}
+
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".token-")
+        try:
+            os.chmod(tmp_path, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
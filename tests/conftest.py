@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Les scripts sont lancés depuis src/ : on reproduit leurs chemins d'import
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "src", "scraping"))
+
+from stub_server import StubServer  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def stub():
+    """Serveur bouchon partagé par les tests (France Travail + sites scrapés)"""
+    with StubServer(totals={"python": 400, "big data": 3500, "rien": 0}) as server:
+        yield server
@@ -0,0 +1,1158 @@
+import importlib.util
+import json
+import os
+import socket
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import requests
+
+import collect_data_api_franceTravail as api
+import http_client
+from analytics import market_analytics
+from cdc import CurrentOffers, capture, changeset_path
+from checkpoint import Checkpoint, atomic_write_json
+from dedup import MinHashLSH, dedup_offers, match_to_reference
+from geo import GeoIndex, default_reference, geocode
+from html_parsing import available_backends, parse_cards
+from http_cache import REDACTED, CacheMiss, HttpCache
+from http_client import HttpClient, RateLimiter, parse_retry_after
+from metrics import RunMetrics
+from modeling import OfferModel, dataframe_chunks
+from normalisation import load_normalised, normalise_api, read_api_records
+from offer_index import OfferIndex, content_hash
+from offer_store import OfferStore
+from pipeline import Pipeline, Stage, capture_changes, default_stages, index_offers, model, similar_offers
+from salary_parsing import EXPERIENCE_PATTERNS, SALARY_PATTERNS, PatternEngine
+from search_index import SearchIndex, analyse_column, analyse_text
+from similar import SimilarityIndex, recall_at_k
+from skills import DEFAULT_EXTRACTOR, SkillExtractor
+from sites import CHOOSEYOURBOSS, GLASSDOOR, LINKEDIN, map_card, scrape_sites
+from storage import EXTENSIONS, JsonlWriter, flatten_offer, iter_jsonl, jsonl_to_parquet, offer_schema
+from stub_server import StubServer, chooseyourboss_page, glassdoor_page, linkedin_page, make_offer
+from token_manager import TokenManager
+
+
+@pytest.fixture
+def stub_api(stub, monkeypatch):
+    monkeypatch.setattr(api, "API_BASE_URL", stub.api_url)
+    return stub
+
+
+def closed_port():
+    """Port local sur lequel rien n'écoute (connexion refusée)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --------------------------------------------------------------
+#  Scraping
+# --------------------------------------------------------------
+
+def test_scrape_sites_against_stub(stub):
+    adapters = [site.rebased(stub.url, delay=0) for site in (LINKEDIN, GLASSDOOR, CHOOSEYOURBOSS)]
+    results = scrape_sites(adapters, client=HttpClient())
+
+    assert {name: len(offers) for name, offers in results.items()} == {
+        'LinkedIn': 2 * 8, 'Glassdoor': 2 * 6, 'ChooseYourBoss': 4 * 10}
+    for name, offers in results.items():
+        for offer in offers:
+            assert offer['Source'] == name
+            assert offer['Intitulé du poste'].startswith(offer['Type de contrat'])
+            assert offer['Nom de l entreprise'] and offer['Ville ou région'] != "France"
+    cyb = results['ChooseYourBoss']
+    assert all(offer['URL'].startswith(stub.url + '/offre/') for offer in cyb)
+    assert {offer['Télétravail'] for offer in cyb} == {'Oui', 'Non'}
+    assert all(offer['Fourchette salariale'].endswith('€ / mois') for offer in cyb)
+
+
+@pytest.mark.parametrize("site, render", [
+    (LINKEDIN, linkedin_page), (GLASSDOOR, glassdoor_page), (CHOOSEYOURBOSS, chooseyourboss_page)])
+def test_html_backends_agree(site, render):
+    html = render('/offres/stage?q=informatique', count=30)
+    parsed = {
+        backend: [map_card(site, card, 'Stage', 'url')
+                  for card in parse_cards(html, site.selectors['card'], site.strainer, backend)]
+        for backend in available_backends()
+    }
+    reference = parsed.pop('html.parser')
+    assert len(reference) == 30
+    for offers in parsed.values():
+        assert offers == reference
+
+
+# --------------------------------------------------------------
+#  API France Travail
+# --------------------------------------------------------------
+
+def test_token_manager_against_stub(stub):
+    manager = TokenManager("id", "secret", "scope", stub.token_url, auto_refresh=False, client=HttpClient())
+    assert manager.get_token().startswith("stub-token-")
+
+
+def test_background_refresh_survives_network_errors():
+    port = closed_port()
+    manager = TokenManager("id", "secret", "scope", f"http://127.0.0.1:{port}/token",
+                           client=HttpClient(max_retries=0))
+    manager._token, manager._expires_at = "ancien", time.time() + 300
+    try:
+        manager._background_refresh()
+        # Le token courant reste servi et un nouvel essai est programmé
+        assert manager._token == "ancien"
+        assert manager._timer is not None and manager._timer.is_alive()
+    finally:
+        manager.close()
+
+
+def test_failed_authentication_sends_no_bearer_none(stub_api, tmp_path, monkeypatch):
+    # Le serveur d'authentification répond 404 : aucun token
+    manager = TokenManager("id", "secret", "scope", stub_api.url + "/introuvable", auto_refresh=False,
+                           client=HttpClient())
+    before = len(stub_api.requests)
+    assert api.fetch_page(manager, "python", 0) == (401, [], 0)
+    assert [path for _, path in stub_api.requests[before:] if "/offres/search" in path] == []
+
+    monkeypatch.setattr(api, "_token_manager", None)
+    premier = api.get_token_manager(str(tmp_path / "a.json"))
+    assert api.get_token_manager(str(tmp_path / "a.json")) is premier
+    autre = api.get_token_manager(str(tmp_path / "b.json"))
+    assert autre is not premier and autre.cache_path == str(tmp_path / "b.json")
+    autre.close()
+
+
+def test_search_offers_reads_content_range(stub_api):
+    before = len(stub_api.requests)
+    pages = api.search_offers("tok", "python")
+    offers = [offer for _, page in pages for offer in page]
+
+    assert len(offers) == 400
+    assert len({offer["id"] for offer in offers}) == 400
+    assert all(offer["metier_recherche"] == "python" for offer in offers)
+    # 400 offres = 3 fenêtres de 150
+    assert len(stub_api.requests) - before == 3
+
+
+def test_search_offers_respects_max_results(stub_api):
+    offers = [offer for _, page in api.search_offers("tok", "python", max_results=42) for offer in page]
+    assert len(offers) == 42
+
+
+def test_search_offers_splits_above_api_cap(stub_api, monkeypatch):
+    incidents = []
+    offers = [offer for _, page in api.search_offers("tok", "big data", incidents=incidents) for offer in page]
+    assert len({offer["id"] for offer in offers}) == 3500 and incidents == []
+
+    # Les offres parisiennes échappent au découpage par département : l'écart est signalé
+    monkeypatch.setattr(api, "DEPARTEMENTS", [code for code in api.DEPARTEMENTS if code != "75"])
+    paris = sum(o["lieuTravail"]["libelle"].startswith("75 ") for o in stub_api.offers("big data"))
+    offers = [offer for _, page in api.search_offers("tok", "big data", incidents=incidents) for offer in page]
+    assert len(offers) == 3500 - paris
+    assert len(incidents) == 1 and incidents[0].startswith(f"{paris} offres de 'big data'")
+
+
+def test_collect_offers_concurrent_matches_serial(stub_api):
+    metiers = ["python", "devops", "rien"]
+    serial = api.collect_offers("tok", metiers, rate=0)
+    concurrent = api.collect_offers("tok", metiers, workers=4, rate=0)
+    assert serial == concurrent
+    assert serial["rien"] == []
+
+
+def test_offer_index_upsert_hash_and_publiee_depuis(tmp_path):
+    offre = {"id": "1", "intitule": "Développeur", "dateActualisation": "2024-05-02"}
+    # Le mot-clé de recherche n'entre pas dans l'empreinte ; l'ordre des champs non plus
+    assert content_hash(dict(offre, metier_recherche="python")) == content_hash(dict(reversed(offre.items())))
+    assert content_hash(offre) != content_hash(dict(offre, intitule="Développeur senior"))
+
+    with OfferIndex(str(tmp_path / "index.sqlite")) as index:
+        premiere = index.start_run("complete")
+        assert index.upsert([offre, {"id": "2", "intitule": "DBA"}], premiere) == \
+            {"nouvelles": 2, "modifiees": 0, "inchangees": 0}
+        index.finish_run(premiere, {})
+        seconde = index.start_run("complete")
+        assert index.upsert([dict(offre, intitule="Développeur senior"), {"id": "2", "intitule": "DBA"}],
+                            seconde) == {"nouvelles": 0, "modifiees": 1, "inchangees": 1}
+        assert [o["intitule"] for o in index.iter_offers()] == ["Développeur senior", "DBA"]
+        evenements = index.conn.execute("SELECT evenement FROM historique WHERE id = '1' ORDER BY rowid").fetchall()
+        assert [e for (e,) in evenements] == ["nouvelle", "modification"]
+
+    now = datetime(2024, 5, 10, 12)
+    assert api.publiee_depuis(None) is None
+    assert api.publiee_depuis(datetime(2024, 5, 10, 6), now) == 1
+    assert api.publiee_depuis(datetime(2024, 5, 5), now) == 7
+    assert api.publiee_depuis(datetime(2024, 3, 1), now) is None  # au-delà de 31 jours : collecte complète
+
+
+def test_failed_keyword_does_not_delete_offers(tmp_path, monkeypatch):
+    metiers = ["python", "devops"]
+    with OfferIndex(str(tmp_path / "index.sqlite")) as index:
+        with StubServer() as server:
+            monkeypatch.setattr(api, "API_BASE_URL", server.api_url)
+            premiere = index.start_run("complete")
+            incidents = {}
+            for _, offers in api.iter_collect("tok", metiers, rate=0, incidents=incidents):
+                index.upsert(offers, premiere)
+            assert incidents == {"python": [], "devops": []}
+            assert api.record_deletions(index, premiere, incidents=incidents) == 0
+        actives = index.count()
+
+        # Le mot-clé "devops" échoue : ses offres ne sont pas pour autant supprimées
+        with StubServer(failures={"devops": 403}) as server:
+            monkeypatch.setattr(api, "API_BASE_URL", server.api_url)
+            seconde = index.start_run("complete")
+            incidents = {}
+            collectees = dict(api.iter_collect("tok", metiers, rate=0, incidents=incidents))
+            for offers in collectees.values():
+                index.upsert(offers, seconde)
+        assert collectees["devops"] == [] and len(incidents["devops"]) == 1 and "403" in incidents["devops"][0]
+        assert api.record_deletions(index, seconde, incidents=incidents) is None
+        assert api.record_deletions(index, seconde, max_results=10) is None
+        assert index.count() == actives
+        assert index.conn.execute("SELECT COUNT(*) FROM historique WHERE evenement = 'suppression'").fetchone()[0] == 0
+
+
+class Interruption(Exception):
+    pass
+
+
+def test_atomic_write_json_keeps_previous_file_on_error(tmp_path):
+    chemin = tmp_path / "etat.json"
+    atomic_write_json(str(chemin), {"offset": 10})
+    with pytest.raises(TypeError):
+        atomic_write_json(str(chemin), {"offset": object()})
+    assert json.loads(chemin.read_text(encoding="utf-8")) == {"offset": 10}
+    assert os.listdir(tmp_path) == ["etat.json"]  # pas de fichier temporaire orphelin
+
+
+def test_collect_resume_after_interruption(tmp_path, monkeypatch):
+    metiers = ["python", "devops", "data engineer"]
+    brut = os.path.join("data", "raw", "offres_it_brutes.jsonl")
+
+    def collecte(dossier, *options):
+        dossier.mkdir()
+        monkeypatch.chdir(dossier)
+        api.main(["--rps", "0", *options])
+
+    with StubServer(totals={"python": 400, "devops": 320, "data engineer": 200}) as server:
+        monkeypatch.setattr(api, "API_BASE_URL", server.api_url)
+        monkeypatch.setattr(api, "TOKEN_URL", server.token_url)
+        monkeypatch.setattr(api, "METIERS_IT", metiers)
+        monkeypatch.setattr(api, "_token_manager", None)
+        collecte(tmp_path / "reference")
+        reference = [(o["id"], o["metier_recherche"]) for o in iter_jsonl(brut)]
+
+        # Arrêt brutal sur la 2e page de "devops" : écrite dans le JSONL brut, absente du point de reprise
+        page_done, pages = Checkpoint.page_done, []
+
+        def interrompue(self, *args):
+            pages.append(args)
+            if len(pages) == 5:
+                raise Interruption
+            page_done(self, *args)
+
+        monkeypatch.setattr(Checkpoint, "page_done", interrompue)
+        with pytest.raises(Interruption):
+            collecte(tmp_path / "interrompue")
+        etat = Checkpoint.load(api.CHECKPOINT_PATH)
+        assert etat.progress["python"]["termine"] and etat.progress["python"]["incidents"] == []
+        assert etat.progress["devops"] == {"plages": ["#0"], "offres": 150, "termine": False}
+        assert os.path.getsize(brut) > etat["offset"] and etat["rows"] == 550
+
+        monkeypatch.setattr(Checkpoint, "page_done", page_done)
+        api.main(["--rps", "0", "--resume"])
+        reprise = [(o["id"], o["metier_recherche"]) for o in iter_jsonl(brut)]
+        api._token_manager.close()
+
+    assert reprise == reference  # ni doublon ni trou
+    assert len(reference) == 920 and not os.path.exists(api.CHECKPOINT_PATH)
+
+
+def test_collect_appends_run_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with StubServer(totals={"python": 40, "devops": 30}) as server:
+        monkeypatch.setattr(api, "API_BASE_URL", server.api_url)
+        monkeypatch.setattr(api, "TOKEN_URL", server.token_url)
+        monkeypatch.setattr(api, "METIERS_IT", ["python", "devops"])
+        monkeypatch.setattr(api, "_token_manager", None)
+        api.main(["--rps", "0"])
+        api.main(["--rps", "0", "--max-results", "10"])
+        api._token_manager.close()
+
+    historique = list(iter_jsonl(api.HISTORY_PATH))
+    assert [run["total_offres_brutes"] for run in historique] == [70, 20]
+    # --max-results : collecte partielle, l'aval ne doit rien en déduire sur les offres absentes
+    assert [run["collecte_complete"] for run in historique] == [True, False]
+    assert not api.last_run_complete()
+    assert all("python" in run["metriques"]["par_source"] for run in historique)
+    with open(api.METADATA_PATH, encoding="utf-8") as f:
+        assert json.load(f) == historique[-1]
+
+
+# --------------------------------------------------------------
+#  Déduplication
+# --------------------------------------------------------------
+
+def test_dedup_offers_merges_keywords(tmp_path):
+    offres = [{"id": "1", "intitule": "Dev Python", "metier_recherche": "python"},
+              {"id": "2", "intitule": "DBA", "metier_recherche": "DBA"},
+              {"id": "1", "intitule": "Dev Python", "metier_recherche": "développeur"},
+              {"id": "1", "intitule": "Dev Python", "metier_recherche": "python"}]
+    uniques = list(dedup_offers(offres, workdir=str(tmp_path), batch_size=2))
+    assert [o["id"] for o in uniques] == ["1", "2"]
+    assert uniques[0]["metier_recherche"] == ["python", "développeur"]
+    assert uniques[1]["metier_recherche"] == ["DBA"]
+
+
+def test_minhash_matches_across_sources_above_threshold():
+    api_offres = [
+        {"id": "A", "intitule": "Développeur Python H/F", "entreprise": {"nom": "Capgemini"},
+         "lieuTravail": {"libelle": "69 - Lyon"}},
+        {"id": "B", "intitule": "Administrateur systèmes Linux", "entreprise": {"nom": "Orange"},
+         "lieuTravail": {"libelle": "35 - Rennes"}},
+    ]
+    cartes = [
+        # Même offre vue sur LinkedIn : accents, casse, mention H/F et arrondissement diffèrent
+        {"Intitulé du poste": "developpeur python", "Nom de l entreprise": "CAPGEMINI", "Ville ou région": "Lyon 3e"},
+        {"Intitulé du poste": "Chef de projet marketing", "Nom de l entreprise": "Decathlon",
+         "Ville ou région": "Lille"},
+    ]
+    resultats = list(match_to_reference(cartes, api_offres))
+    assert resultats[0][1] == "A" and 0.5 <= resultats[0][2] < 1.0
+    assert resultats[1][1:] == (None, 0.0)
+
+    # Le même quasi-doublon passe sous un seuil plus exigeant
+    assert [cle for _, cle, _ in match_to_reference(cartes[:1], api_offres, threshold=0.9)] == [None]
+    lsh = MinHashLSH(threshold=0.9)
+    lsh.add("A", "developpeur python capgemini lyon")
+    assert lsh.query("developpeur python capgemini lyon") == [("A", 1.0)]
+    with pytest.raises(ValueError):
+        MinHashLSH(num_perm=64, bands=10)
+
+
+# --------------------------------------------------------------
+#  Stockage
+# --------------------------------------------------------------
+
+def test_flatten_offer_types_and_missing_fields():
+    offre = make_offer(3, datetime(2024, 5, 1))
+    offre.update(metier_recherche="python", lieuTravail={"libelle": "69 - Lyon", "latitude": "45.76"},
+                 formations=[{"domaineLibelle": "Informatique"}, {"niveauLibelle": "Bac+5"}])
+    ligne = flatten_offer(offre)
+    assert ligne["id"] == "0000003"
+    assert ligne["date_creation"].tzinfo is not None
+    assert ligne["lieu_latitude"] == 45.76 and ligne["lieu_longitude"] is None
+    assert ligne["competences"] == [c["libelle"] for c in offre["competences"]]
+    assert ligne["formations"] == ["Informatique"]
+    assert ligne["metier_recherche"] == ["python"]
+
+    vide = flatten_offer({"id": "X", "dateCreation": "pas une date", "competences": None})
+    assert vide["date_creation"] is None and vide["competences"] == [] and vide["metier_recherche"] == []
+    assert set(vide) == set(offer_schema().names)
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", pytest.param("zstd", marks=pytest.mark.skipif(
+    importlib.util.find_spec("zstandard") is None, reason="paquet 'zstandard' absent"))])
+def test_jsonl_to_parquet_round_trip(tmp_path, compression):
+    offres = [dict(make_offer(i, datetime(2024, 5, 1)), metier_recherche=["python", "devops"]) for i in range(25)]
+    chemin = str(tmp_path / ("offres.jsonl" + EXTENSIONS[compression]))
+    with JsonlWriter(chemin, compression=compression) as writer:
+        for debut in range(0, 25, 10):
+            writer.write_batch(offres[debut:debut + 10])
+    assert [o["id"] for o in iter_jsonl(chemin)] == [o["id"] for o in offres]
+
+    parquet = str(tmp_path / "offres.parquet")
+    assert jsonl_to_parquet(chemin, parquet, batch_size=8) == 25
+    fichier = pq.ParquetFile(parquet)
+    schema = fichier.schema_arrow
+    assert schema.names == offer_schema().names
+    assert schema.field("date_creation").type.tz == "UTC"
+    assert str(schema.field("lieu_latitude").type) == "double"
+    assert str(schema.field("nombre_postes").type) == "int32"
+    assert fichier.metadata.num_row_groups == 4
+    df = fichier.read().to_pandas()
+    assert df["id"].tolist() == [o["id"] for o in offres]
+    assert df["intitule"].tolist() == [o["intitule"] for o in offres]
+    assert list(df["competences"].iloc[0]) == [c["libelle"] for c in offres[0]["competences"]]
+    assert list(df["metier_recherche"].iloc[-1]) == ["python", "devops"]
+    assert str(df["date_creation"].dt.tz) == "UTC"
+
+
+# --------------------------------------------------------------
+#  Client HTTP
+# --------------------------------------------------------------
+
+class FakeClock:
+    """Horloge de http_client : les attentes font avancer le temps au lieu de bloquer"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    perf_counter = monotonic
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(http_client, "time", clock)
+    return clock
+
+
+def test_client_retries_transient_errors_then_gives_up(clock):
+    headers = {"Authorization": "Bearer tok"}
+    with StubServer(failures={"instable": [503, 429], "hors service": 503}) as server:
+        client = HttpClient(max_retries=3, backoff_base=0.5)
+        url = server.api_url + "/offres/search"
+
+        response = client.get(url, params={"motsCles": "instable"}, headers=headers)
+        assert response.status_code in (200, 206)
+        assert len(server.requests) == 3
+        assert len(clock.sleeps) == 2
+        assert all(0 <= delay <= 0.5 * 2 ** attempt for attempt, delay in enumerate(clock.sleeps))
+
+        # Tentatives épuisées : la dernière réponse en erreur est rendue telle quelle
+        clock.sleeps.clear()
+        response = client.get(url, params={"motsCles": "hors service"}, headers=headers)
+        assert response.status_code == 503
+        assert len(server.requests) == 3 + 4
+        assert len(clock.sleeps) == 3
+
+
+@pytest.mark.parametrize("retry_after, attente", [(7, 7.0), (600, 120.0)])
+def test_client_honours_retry_after(clock, retry_after, attente):
+    with StubServer(failures={"quota": [429]}, retry_after=retry_after) as server:
+        response = HttpClient(max_retry_after=120).get(
+            server.api_url + "/offres/search", params={"motsCles": "quota"},
+            headers={"Authorization": "Bearer tok"})
+    assert response.ok
+    assert clock.sleeps == [attente]
+
+
+def test_client_retries_connection_errors(clock):
+    port = closed_port()
+    with pytest.raises(requests.ConnectionError):
+        HttpClient(max_retries=2).get(f"http://127.0.0.1:{port}/")
+    assert len(clock.sleeps) == 2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("bientôt") is None
+    dans_30s = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert parse_retry_after(dans_30s) == pytest.approx(30, abs=2)
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_backoff_full_jitter(monkeypatch):
+    client = HttpClient(backoff_base=0.5, backoff_max=30)
+    delays = [client.backoff(3) for _ in range(500)]
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert min(delays) < 1 and max(delays) > 3
+    # Plafond exponentiel borné par backoff_max
+    monkeypatch.setattr(http_client.random, "uniform", lambda low, high: high)
+    assert [client.backoff(attempt) for attempt in range(8)] == [0.5, 1, 2, 4, 8, 16, 30, 30]
+
+
+def test_rate_limiter_token_bucket(clock):
+    limiter = RateLimiter(rate=8, burst=4)
+    for _ in range(4):
+        limiter.acquire()
+    assert clock.now == 0
+    # Au-delà de la rafale : 8 requêtes par seconde
+    for _ in range(16):
+        limiter.acquire()
+    assert clock.now == pytest.approx(2.0)
+    RateLimiter(rate=None).acquire()
+    assert clock.now == pytest.approx(2.0)
+
+
+# --------------------------------------------------------------
+#  Cache HTTP
+# --------------------------------------------------------------
+
+def test_cache_record_then_replay(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with StubServer() as server:
+        url = server.url + "/offres/stage?q=informatique"
+        recorded = HttpClient(cache=HttpCache(path, "record")).get(url)
+    assert recorded.status_code == 200
+
+    # Le serveur est arrêté : la réponse ne peut venir que du cache
+    replay = HttpClient(cache=HttpCache(path, "replay"))
+    replayed = replay.get(url)
+    assert replayed.from_cache
+    assert replayed.text == recorded.text
+    assert replayed.headers["Content-Type"] == recorded.headers["Content-Type"]
+    with pytest.raises(CacheMiss):
+        replay.get(server.url + "/offres/alternance?q=informatique")
+
+
+def test_cache_never_stores_oauth_tokens(tmp_path, stub):
+    path = tmp_path / "cache.sqlite"
+    manager = TokenManager("id", "secret", "scope", stub.token_url, auto_refresh=False,
+                           client=HttpClient(cache=HttpCache(path, "record")))
+    assert manager.get_token().startswith("stub-token-")
+    with HttpCache(path, "replay") as cache:
+        corps = cache.conn.execute("SELECT corps FROM reponses").fetchone()[0]
+        assert b"stub-token" not in zlib.decompress(corps)
+    # Le rejeu hors ligne s'authentifie toujours, avec un jeton masqué
+    rejeu = TokenManager("id", "secret", "scope", stub.token_url, auto_refresh=False,
+                         client=HttpClient(cache=HttpCache(path, "replay")))
+    assert rejeu.get_token() == REDACTED
+
+
+def test_cache_revalidates_with_etag(tmp_path, stub):
+    client = HttpClient(cache=HttpCache(tmp_path / "cache.sqlite", "record"))
+    url = stub.url + "/Emploi/stage-informatique-emplois-SRCH_KO0,18.htm"
+    first = client.get(url)
+    second = client.get(url)
+
+    assert not getattr(first, "from_cache", False)
+    assert second.from_cache and second.status_code == 200
+    assert second.text == first.text
+    assert client.cache.hits == 1
+
+
+def test_cache_auto_mode_skips_network(tmp_path, stub_api):
+    client = HttpClient(cache=HttpCache(tmp_path / "cache.sqlite", "auto"))
+    params = {"motsCles": "python", "range": "0-149"}
+    headers = {"Authorization": "Bearer tok"}
+    first = client.get(stub_api.api_url + "/offres/search", params=params, headers=headers)
+    before = len(stub_api.requests)
+    second = client.get(stub_api.api_url + "/offres/search", params=params, headers=headers)
+
+    assert len(stub_api.requests) == before
+    assert second.json() == first.json()
+    assert second.headers["Content-Range"] == "offres 0-149/400"
+
+
+# --------------------------------------------------------------
+#  Métriques
+# --------------------------------------------------------------
+
+def test_metrics_by_source(stub):
+    metrics = RunMetrics()
+    client = HttpClient(metrics=metrics)
+    site = CHOOSEYOURBOSS.rebased(stub.url, delay=0)
+    client.get(site.base_url + "/offres/stage?q=informatique", label=site.name)
+    client.get(stub.url + "/introuvable", label=site.name)
+    metrics.record_parse(site.name, 0.01, offers=10)
+
+    report = metrics.report()["par_source"][site.name]
+    assert report["requetes"] == 2
+    assert report["statuts"] == {"200": 1, "404": 1}
+    assert report["octets"] > 0 and report["offres"] == 10
+
+    prometheus = metrics.to_prometheus()
+    assert 'collecte_requetes_total{source="ChooseYourBoss",statut="200"} 1' in prometheus
+    assert 'collecte_latence_secondes_count{source="ChooseYourBoss"} 2' in prometheus
+
+
+# --------------------------------------------------------------
+#  Compétences
+# --------------------------------------------------------------
+
+@pytest.mark.parametrize("texte, attendu", [
+    ("Développeur Java / Spring", ["java", "spring"]),
+    ("Développeur JavaScript (ES6), TypeScript", ["javascript", "typescript"]),
+    ("Java et JS", ["java", "javascript"]),
+    ("Stack C# .NET, un peu de C++", ["c#", "c++", ".net"]),
+    ("ASP.NET Core et dotnet", [".net"]),
+    ("Excellent relationnel, esprit d'équipe", []),
+    ("Maîtrise d'Excel", ["excel"]),
+    ("", []),
+])
+def test_skill_extractor_word_boundaries(texte, attendu):
+    assert DEFAULT_EXTRACTOR.extract(texte) == attendu
+
+
+def test_skill_extractor_from_json(tmp_path):
+    chemin = tmp_path / "taxonomie.json"
+    chemin.write_text(json.dumps({"kubernetes": ["k8s"], "sécurité": ["cybersécurité"]}), encoding="utf-8")
+    extracteur = SkillExtractor.from_json(str(chemin))
+    assert extracteur.extract("Ingénieur Securite cloud, K8S en production") == ["kubernetes", "sécurité"]
+    assert extracteur.extract("Développeur Java") == []
+    assert extracteur.tag_column(pd.Series(["k8s", None])).tolist() == [["kubernetes"], []]
+
+
+# --------------------------------------------------------------
+#  Pipeline
+# --------------------------------------------------------------
+
+def test_pipeline_order_cache_and_failures(tmp_path):
+    executees, collecte = [], {"texte": "a"}
+    taxonomie = tmp_path / "taxonomie.txt"
+    taxonomie.write_text("v1", encoding="utf-8")
+
+    def collect(inputs, output):
+        executees.append("collect")
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(collecte["texte"])
+
+    def upper(inputs, output):
+        executees.append("upper")
+        with open(inputs["collect"], encoding="utf-8") as src, open(output, "w", encoding="utf-8") as f:
+            f.write(src.read().upper())
+
+    def broken(inputs, output):
+        executees.append("broken")
+        raise RuntimeError("panne")
+
+    def after(inputs, output):
+        executees.append("after")
+
+    def stale(inputs, output):
+        executees.append("stale")  # ne réécrit pas sa sortie
+
+    workdir = str(tmp_path / "pipeline")
+
+    def pipeline():
+        return Pipeline([
+            Stage("collect", collect, str(tmp_path / "collect.txt")),
+            Stage("upper", upper, str(tmp_path / "upper.txt"), ("collect",), sources=(str(taxonomie),)),
+            Stage("broken", broken, str(tmp_path / "broken.txt"), ("collect",)),
+            Stage("after", after, str(tmp_path / "after.txt"), ("broken",)),
+            Stage("stale", stale, str(tmp_path / "stale.txt"), ("collect",)),
+        ], workdir=workdir)
+
+    (tmp_path / "stale.txt").write_text("ancienne sortie", encoding="utf-8")
+    assert pipeline().run() == {"collect": "execute", "upper": "execute", "broken": "echec",
+                                "after": "echec", "stale": "echec"}
+    assert executees.index("collect") < executees.index("upper") and "after" not in executees
+    assert (tmp_path / "upper.txt").read_text(encoding="utf-8") == "A"
+
+    # Relu depuis le manifeste : rien n'a changé, seules les étapes en échec sont retentées
+    executees.clear()
+    assert pipeline().run(targets=["upper"]) == {"collect": "cache", "upper": "cache"}
+    assert executees == []
+
+    # Une source modifiée (taxonomie, motifs...) invalide l'étape qui en dépend
+    taxonomie.write_text("v2", encoding="utf-8")
+    assert pipeline().run(targets=["upper"]) == {"collect": "cache", "upper": "execute"}
+
+    # refresh rejoue les collectes ; une entrée inchangée laisse l'aval en cache
+    executees.clear()
+    assert pipeline().run(targets=["upper"], refresh=True) == {"collect": "execute", "upper": "cache"}
+    collecte["texte"] = "b"
+    assert pipeline().run(targets=["upper"], force=["collect"]) == {"collect": "execute", "upper": "execute"}
+    assert (tmp_path / "upper.txt").read_text(encoding="utf-8") == "B"
+    assert pipeline().run(targets=["upper"], force=["upper"])["upper"] == "execute"
+
+
+def test_pipeline_rejects_invalid_dags(tmp_path):
+    def etape(name, *deps):
+        return Stage(name, lambda inputs, output: None, str(tmp_path / name), deps)
+
+    with pytest.raises(ValueError, match="dépendance inconnue"):
+        Pipeline([etape("a"), etape("b", "absente")], workdir=str(tmp_path))
+    with pytest.raises(ValueError, match="circulaires : b -> d -> c -> b"):
+        Pipeline([etape("a"), etape("b", "a", "d"), etape("c", "b"), etape("d", "c")], workdir=str(tmp_path))
+    with pytest.raises(ValueError, match="circulaires : a -> a"):
+        Pipeline([etape("a", "a")], workdir=str(tmp_path))
+    with pytest.raises(ValueError, match="double"):
+        Pipeline([etape("a"), etape("a")], workdir=str(tmp_path))
+    Pipeline([etape("a"), etape("b", "a"), etape("c", "a", "b")], workdir=str(tmp_path))
+
+
+def test_cli_resolves_user_paths_from_caller_directory(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location(
+        "main", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py"))
+    cli = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(cli)
+
+    enrichies = str(tmp_path / "offres.parquet")
+    enriched_stage(str(tmp_path), {"precision": "commune"}).func({}, enrichies)
+    df = pd.read_parquet(enrichies)
+    with SearchIndex(str(tmp_path / "recherche.sqlite")) as index:
+        index.sync(df)
+    with CurrentOffers(str(tmp_path / "courantes.sqlite")) as courantes:
+        capture(df, courantes, str(tmp_path / "changesets"))
+    monkeypatch.setattr("cdc.CURRENT_OFFERS_PATH", str(tmp_path / "courantes.sqlite"))
+    monkeypatch.setattr("cdc.CHANGESET_DIR", str(tmp_path / "changesets"))
+
+    # main() se place dans src/ : les chemins relatifs restent ceux du répertoire de l'appelant
+    monkeypatch.chdir(tmp_path)
+    assert cli.main(["search", "--index", "recherche.sqlite"]) == 0
+    monkeypatch.chdir(tmp_path)
+    assert cli.main(["changes", "--replica", "copie.sqlite"]) == 0
+    assert not os.path.exists(os.path.join(cli.SRC, "copie.sqlite"))
+    with CurrentOffers(str(tmp_path / "copie.sqlite")) as copie:
+        assert copie.count() == 2
+
+
+# --------------------------------------------------------------
+#  Normalisation
+# --------------------------------------------------------------
+
+def test_normalisation_types_both_sources(tmp_path):
+    api_path, scraping_path = tmp_path / "api.jsonl.gz", tmp_path / "scraping.jsonl"
+    offers = [make_offer(n, datetime(2024, 6, 1)) for n in range(50)]
+    offers[0].update(alternance=True, experienceLibelle="6 Mois")
+    with JsonlWriter(str(api_path), compression="gzip") as writer:
+        writer.write_batch(offers[:20])
+        writer.write_batch(offers[20:])
+    scraped = {'Intitulé du poste': 'Stage Data', 'Nom de l entreprise': 'Orange', 'Ville ou région': 'Lyon',
+               'Date de publication': '15/01/2024', 'Type de contrat': 'Stage',
+               'Nombre d années d expérience demandées': '0', 'Niveau de seniorité': 'Étudiant',
+               'Description du poste': 'Offre LinkedIn', 'Source': 'LinkedIn', 'Télétravail': 'Hybride',
+               'Compétences mentionnées': 'python', 'Fourchette salariale': '1 450 € / mois',
+               'URL': 'https://www.linkedin.com/jobs/search/'}
+    with JsonlWriter(str(scraping_path)) as writer:
+        writer.write_batch([scraped, dict(scraped, **{'Intitulé du poste': 'Stage Web'})])
+
+    df = load_normalised(str(api_path), str(scraping_path))
+
+    assert len(df) == 52 and df['Identifiant'].is_unique
+    assert str(df['Date de publication'].dtype) == 'datetime64[ns]'
+    assert df['Nombre d années d expérience demandées'].dtype == 'float32'
+    for colonne in ('Type de contrat', 'Niveau de seniorité', 'Télétravail', 'Source'):
+        assert isinstance(df[colonne].dtype, pd.CategoricalDtype)
+    premiere = df.iloc[0]
+    assert premiere['Type de contrat'] == 'Alternance'
+    assert premiere['Nombre d années d expérience demandées'] == pytest.approx(0.5)
+    assert premiere['Salaire annuel max'] - premiere['Salaire annuel min'] == 10000
+    stage = df[df['Source'] == 'LinkedIn'].iloc[0]
+    assert stage['Date de publication'] == pd.Timestamp(2024, 1, 15)
+    assert stage['Salaire annuel min'] == 12 * 1450 and stage['Télétravail'] == 'Hybride'
+    # Le repli ligne à ligne produit les mêmes colonnes que le lecteur Arrow
+    repli = pd.concat([normalise_api(flat) for flat in read_api_records(str(api_path))], ignore_index=True)
+    pd.testing.assert_frame_equal(repli.drop(columns='Source'), df.iloc[:50].drop(columns='Source'))
+
+
+def test_salary_engine_formats_and_report():
+    engine = PatternEngine(SALARY_PATTERNS, ['salaire_min', 'salaire_max'], "Salaires")
+    libelles = pd.Series(["Annuel de 40000.0 Euros à 45000.0 Euros sur 12.0 mois", "Mensuel de 2000 Euros sur 13 mois",
+                          "45k€ - 55k€", "35 000 € - 45 000 €", "1 450 € / mois", "Gratification légale",
+                          "Salaire alternance", "Tickets resto", None] * 3)
+    result = engine.parse(libelles)
+
+    assert result['salaire_min'].iloc[:5].tolist() == [40000, 26000, 45000, 35000, 17400]
+    assert result['salaire_max'].iloc[:4].tolist() == [45000, 26000, 55000, 45000]
+    assert result['motif'].iloc[6] == 'non_communique' and pd.isna(result['motif'].iloc[7])
+    report = engine.report()
+    assert report['par_motif']['france_travail'] == 6 and report['vides'] == 3
+    assert report['exemples_non_reconnus'] == {'Tickets resto': 3}
+    assert report['taux_non_reconnu'] == pytest.approx(1 / 8)
+
+    experience = PatternEngine(EXPERIENCE_PATTERNS, ['annees'], "Expérience").parse(
+        pd.Series(["2 An(s)", "Expérience exigée de 6 Mois", "Débutant accepté", "3 à 5 ans", "0"]))
+    assert experience['annees'].tolist() == pytest.approx([2, 0.5, 0, 3, 0])
+
+
+def test_market_analytics_partitions_add_up():
+    df = pd.DataFrame({
+        'Compétences mentionnées': ["python, sql", "python, docker, python", "Non spécifié", "sql, python", "docker"],
+        'Ville ou région': ["Paris", "Lyon", "Paris", "Paris", None],
+        'Type de contrat': ["CDI", "CDI", "Stage", "CDD", "CDI"],
+        'Niveau de seniorité': ["Senior", "Junior", "Junior", "Senior", "Senior"],
+        'Date de publication': pd.to_datetime(["2024-01-03", "2024-01-05", "2024-01-10", "2024-02-14", None]),
+    })
+    marche = market_analytics(df, workers=1)
+
+    assert marche.frequence.to_dict() == {"python": 3, "sql": 2, "docker": 2}
+    assert marche.cooccurrences.toarray().tolist() == [[3, 2, 1], [2, 2, 0], [1, 0, 2]]
+    assert marche.top_pairs(1) == [{"competences": ["python", "sql"], "offres": 2, "lift": 1.67}]
+    assert marche.pivot('ville').loc["python"].to_dict() == {"Paris": 2, "Lyon": 1}
+    assert marche.top_by('contrat')["CDI"] == {"python": 2, "docker": 2, "sql": 1}
+    assert marche.offres_par['semaine'].to_dict() == {"2024-01-01": 2, "2024-01-08": 1, "2024-02-12": 1}
+    assert marche.trends(1)["python"].tolist() == [1.0, 0.0, 1.0]
+    # Un processus par mois : mêmes résultats, une fois réalignés
+    parallele = market_analytics(df, workers=2)
+    assert parallele.frequence.equals(marche.frequence)
+    assert (parallele.cooccurrences != marche.cooccurrences).nnz == 0
+    pd.testing.assert_frame_equal(parallele.pivot('semaine'), marche.pivot('semaine'), check_like=True)
+
+
+def test_offer_model_streams_persists_and_scores(tmp_path):
+    familles = [
+        ("Data engineer", "Spark, SQL", "pipelines de données spark et airflow", "CDI", "Senior"),
+        ("Développeur React", "React, Node.js", "interfaces web react typescript", "CDD", "Junior"),
+        ("Technicien support", "Windows", "assistance utilisateurs et parc informatique", "Stage", "Étudiant"),
+    ]
+    df = pd.DataFrame([
+        {'Identifiant': f"o{n}", 'Intitulé du poste': titre, 'Compétences mentionnées': competences,
+         'Description du poste': description, 'Type de contrat': contrat, 'Niveau de seniorité': niveau}
+        for n in range(120) for titre, competences, description, contrat, niveau in [familles[n % 3]]
+    ])
+    df.loc[::10, 'Niveau de seniorité'] = 'Non spécifié'
+
+    modele = OfferModel(n_clusters=3).fit(dataframe_chunks(df, 40))
+    assert modele.n_documents == 120
+    assert modele.report()["precision_validation"] == {'Niveau de seniorité': 1.0, 'Type de contrat': 1.0}
+    modele.save(str(tmp_path / "modele.joblib"))
+    recharge = OfferModel.load(str(tmp_path / "modele.joblib"))
+
+    scores = recharge.score(df.iloc[:3])
+    assert scores['Famille de métier'].nunique() == 3
+    assert scores['Type de contrat (prédit)'].tolist() == ['CDI', 'CDD', 'Stage']
+    assert scores['Niveau de seniorité (prédit)'].tolist() == ['Senior', 'Junior', 'Étudiant']
+    assert any("spark" in libelle for libelle in recharge.family_labels())
+    # Apprentissage incrémental sur de nouvelles offres, à IDF constante
+    idf = recharge.idf.copy()
+    recharge.update(df.iloc[:30])
+    assert (recharge.idf == idf).all() and recharge.validation['Type de contrat'][1] == 80 + 30
+
+
+@pytest.mark.parametrize("offres, lot, familles", [(5, 2, 5), (30, 4, 12)])
+def test_offer_model_small_corpus_and_small_chunks(offres, lot, familles):
+    # 5 offres (données de démonstration) ou des lots plus petits que le nombre de familles
+    df = pd.DataFrame({'Identifiant': [f"o{n}" for n in range(offres)],
+                       'Intitulé du poste': [f"Développeur {n % 7}" for n in range(offres)],
+                       'Compétences mentionnées': "Python", 'Description du poste': "",
+                       'Type de contrat': "CDI", 'Niveau de seniorité': "Junior"})
+    modele = OfferModel(n_clusters=12).fit(dataframe_chunks(df, lot))
+    assert len(modele.report()["familles"]) == familles
+    assert modele.score(df)['Famille de métier'].between(0, familles - 1).all()
+
+
+def test_offer_model_rejects_empty_corpus(tmp_path):
+    with pytest.raises(ValueError, match="aucune offre"):
+        OfferModel(n_clusters=4).fit(iter([]))
+    # Étape model du pipeline : échec explicite plutôt qu'un modèle sans centroïdes
+    vide = tmp_path / "vide.parquet"
+    pd.DataFrame({'Identifiant': pd.Series([], dtype=str)}).to_parquet(vide, index=False)
+    with pytest.raises(ValueError, match="aucune offre"):
+        model({"enrich": str(vide)}, str(tmp_path / "modele.joblib"))
+    assert not (tmp_path / "modele.joblib").exists()
+
+
+def test_similarity_index_incremental_and_persistent(tmp_path):
+    rng = np.random.default_rng(0)
+    vecteurs = rng.standard_normal((3000, 32)).astype(np.float32)
+    vecteurs /= np.linalg.norm(vecteurs, axis=1, keepdims=True)
+    identifiants = [f"o{i}" for i in range(3000)]
+    chemin = str(tmp_path / "similaires")
+
+    index = SimilarityIndex(chemin, dim=32, tables=8, bits=6, model_key="m1")
+    assert index.add(identifiants[:2000], vecteurs[:2000]) == 2000
+    assert index.add(identifiants[1990:2100], vecteurs[1990:2100]) == 100  # queue non triée
+    assert index.meta["triees"] == 2000
+    voisins = index.similar_to("o5", k=5)
+    assert "o5" not in dict(voisins) and voisins == sorted(voisins, key=lambda v: -v[1])
+
+    # Réouverture : mêmes résultats, puis ajout d'un lot qui déclenche le retri
+    index = SimilarityIndex(chemin, model_key="m1")
+    assert len(index) == 2100 and index.similar_to("o5", k=5) == voisins
+    index.add(identifiants[2100:], vecteurs[2100:])
+    assert index.meta["triees"] == 3000
+    assert index.search(vecteurs[2500], k=1)[0][0] == "o2500"
+    assert recall_at_k(index, vecteurs[:20], k=10) >= 0.8
+    # Offre réécrite : nouveau vecteur, l'ancien est écarté ; offres retirées puis compactage
+    assert index.add(identifiants[:3], vecteurs[3:6]) == 0  # même empreinte
+    assert index.add(["o0"], vecteurs[2500:2501], [7]) == 1 and len(index) == 3000
+    assert {identifiant for identifiant, _ in index.search(vecteurs[2500], k=2)} == {"o0", "o2500"}
+    assert "o0" not in dict(index.search(vecteurs[0], k=5))
+    assert index.remove(["o2500", "inconnue"]) == 1 and "o2500" not in dict(index.search(vecteurs[2500], k=5))
+    assert index.remove(identifiants[1000:1400]) == 400 and index.meta["supprimees"] == 0
+    index = SimilarityIndex(chemin, model_key="m1")
+    assert len(index) == index.meta["offres"] == 2599 and index.rangs["o0"] == 2598
+    assert index.search(vecteurs[2500], k=1)[0][0] == "o0" and "o1200" not in index.rangs
+    # Un autre modèle : autre espace de plongements, l'index repart de zéro
+    assert len(SimilarityIndex(chemin, dim=32, model_key="m2")) == 0
+
+
+def test_similar_stage_follows_enrich_after_model_refit(tmp_path):
+    titres = ["Data engineer spark", "Développeur React", "Technicien support", "DevOps AWS"]
+    df = pd.DataFrame({'Identifiant': [f"o{n}" for n in range(60)],
+                       'Intitulé du poste': [titres[n % 4] for n in range(60)],
+                       'Compétences mentionnées': "SQL", 'Description du poste': "",
+                       'Type de contrat': "CDI", 'Niveau de seniorité': "Junior", 'Nom de l entreprise': "Société",
+                       'Ville ou région': "Paris", 'Date de publication': pd.Timestamp(2024, 1, 1),
+                       'Télétravail': 'Non spécifié', 'Source': 'France Travail', 'Salaire annuel min': None,
+                       'Salaire annuel max': None, 'URL': "https://exemple.fr"})
+    enrichies, modele, recherche, similaires = (
+        str(tmp_path / nom) for nom in ("offres.parquet", "modele.joblib", "recherche.sqlite", "similaires"))
+    sortie = os.path.join(similaires, "meta.json")
+    entrees = {"enrich": enrichies, "model": modele, "index": recherche}
+
+    def collecte(offres):
+        offres.to_parquet(enrichies)
+        model({"enrich": enrichies}, modele, n_clusters=4)
+        with SearchIndex(recherche) as index:
+            index.sync(offres)
+        similar_offers(entrees, sortie)
+        return SimilarityIndex(similaires)
+
+    avant = np.array(collecte(df.iloc[:30]).vecteurs)
+
+    cle = SimilarityIndex(similaires).meta["modele"]
+
+    # Collecte suivante : modèle réentraîné mais IDF figée, 10 nouvelles offres, o3 réécrite, o7 disparue
+    df.loc[3, 'Intitulé du poste'] = "Technicien support"
+    index = collecte(df.iloc[:40].drop(index=7))
+    assert len(index) == 39 and "o7" not in index.rangs and index.meta["modele"] == cle
+    vecteur = lambda n: np.asarray(index.vecteurs[index.rangs[f"o{n}"]])
+    assert all(np.array_equal(vecteur(n), avant[n]) for n in range(30) if n not in (3, 7))
+    assert np.allclose(vecteur(3), vecteur(2)) and np.allclose(vecteur(38), vecteur(2))
+    assert not np.allclose(vecteur(3), avant[3])
+
+    # Corpus doublé : IDF renouvelée, l'index est reconstruit dans le nouvel espace
+    index = collecte(df)
+    assert len(index) == 60 and index.meta["modele"] != cle
+    assert np.allclose(index.vecteurs[index.rangs["o3"]], index.vecteurs[index.rangs["o58"]])
+
+
+# --------------------------------------------------------------
+#  Recherche
+# --------------------------------------------------------------
+
+def test_search_index_analysis_filters_and_sync(tmp_path):
+    def offre(n, titre, ville, contrat, competences, teletravail='Non spécifié', description=""):
+        return {'Identifiant': f"o{n}", 'Intitulé du poste': titre, 'Nom de l entreprise': f"Société {n}",
+                'Ville ou région': ville, 'Type de contrat': contrat, 'Date de publication': pd.Timestamp(2024, 1, n),
+                'Télétravail': teletravail, 'Source': 'France Travail', 'Compétences mentionnées': competences,
+                'Salaire annuel min': 40000.0 if n % 2 else None, 'Salaire annuel max': None,
+                'URL': f"https://exemple.fr/{n}", 'Description du poste': description}
+
+    df = pd.DataFrame([
+        offre(1, "Développeuse Python confirmée", "Paris", "CDI", "Python, Django", 'Hybride'),
+        offre(2, "Ingénieur réseaux", "Lyon", "CDD", "Cisco", description="Équipe C++ et .NET"),
+        offre(3, "Développeur Vue.js", "Saint-Étienne", "CDI", "Vue.js, Node.js"),
+    ])
+    textes = ["Développeuses C++/C# .NET — données", "ASP.NET, vue.js, Œuvre d'été", None]
+    assert analyse_column(pd.Series(textes)) == [analyse_text(t) or None for t in textes]
+
+    with SearchIndex(str(tmp_path / "index.sqlite")) as index:
+        assert index.sync(df) == {"nouvelles": 3, "modifiees": 0, "inchangees": 0, "supprimees": 0}
+        titres = lambda **criteres: [o['titre'] for o in index.search(**criteres)]
+        assert titres(query="developpeur python") == ["Développeuse Python confirmée"]
+        assert titres(query="réseau") == titres(query="c++") == ["Ingénieur réseaux"]
+        assert titres(query="vuejs", city="saint etienne") == ["Développeur Vue.js"]
+        assert titres(contract="CDI", remote=True) == ["Développeuse Python confirmée"]
+        assert titres(since="2024-01-02", skill="Node.js") == ["Développeur Vue.js"]
+        assert titres() == ["Développeur Vue.js", "Ingénieur réseaux", "Développeuse Python confirmée"]
+
+        df.loc[1, 'Intitulé du poste'] = "Ingénieur sécurité"
+        assert index.sync(df.iloc[1:]) == {"nouvelles": 0, "modifiees": 1, "inchangees": 1, "supprimees": 1}
+        assert titres(query="reseaux") == [] and titres(query="securite") == ["Ingénieur sécurité"]
+        assert index.count() == 2
+
+
+def enriched_stage(workdir, version):
+    """Étape enrich factice : deux offres, `version["precision"]` dans une colonne ni indexée ni suivie"""
+    def enrich(inputs, output):
+        pd.DataFrame({
+            'Identifiant': ["o1", "o2"], 'Intitulé du poste': ["Data Engineer", "DBA"],
+            'Nom de l entreprise': ["Orange", "Thales"], 'Ville ou région': ["Lyon", "Paris"],
+            'Type de contrat': ["CDI", "CDD"], 'Date de publication': pd.to_datetime(["2024-05-02", "2024-05-03"]),
+            'Télétravail': ["Non", "Oui"], 'Source': ["France Travail"] * 2, 'Compétences mentionnées': ["SQL", "SQL"],
+            'Salaire annuel min': [45000.0, None], 'Salaire annuel max': [None, None], 'URL': ["u1", "u2"],
+            'Description du poste': ["", ""], 'Précision géo': [version["precision"]] * 2,
+        }).to_parquet(output, index=False)
+
+    return Stage("enrich", enrich, os.path.join(workdir, 'offres_enrichies.parquet'))
+
+
+def test_index_stage_reruns_without_changes(tmp_path):
+    workdir, version = str(tmp_path / "pipeline"), {"precision": "commune"}
+    index = next(stage for stage in default_stages(workdir=workdir, api=False, scraping=False)
+                 if stage.name == "index")
+
+    def pipeline():
+        return Pipeline([enriched_stage(workdir, version), index], workdir=workdir)
+
+    assert pipeline().run() == {"enrich": "execute", "index": "execute"}
+    # Nouvelle sortie d'enrich, colonnes indexées identiques : l'index reste tel quel sans échec
+    version["precision"] = "departement"
+    assert pipeline().run(force=["enrich"]) == {"enrich": "execute", "index": "execute"}
+    assert pipeline().run() == {"enrich": "cache", "index": "cache"}
+    with SearchIndex(index.output) as recherche:
+        assert recherche.count() == 2
+
+
+def test_index_keeps_offers_of_partial_collections(tmp_path):
+    enrichies, partielles = str(tmp_path / "enrichies.parquet"), str(tmp_path / "partielles.parquet")
+    enriched_stage(str(tmp_path), {"precision": "commune"}).func({}, enrichies)
+    df = pd.read_parquet(enrichies)
+    df = pd.concat([df, df.iloc[:1].assign(Identifiant="o3", Source="LinkedIn")], ignore_index=True)
+    df.to_parquet(enrichies, index=False)
+    df.iloc[:1].to_parquet(partielles, index=False)  # o1 seule : o2 (France Travail) et o3 (LinkedIn) manquent
+    relevees = str(tmp_path / "relevees.parquet")
+    pd.concat([df.iloc[:1], df.iloc[2:].assign(Identifiant="o4")]).to_parquet(relevees, index=False)
+
+    api_path, metadata = tmp_path / "raw" / "offres_it.jsonl", tmp_path / "raw" / "metadata_collecte.json"
+    api_path.parent.mkdir()
+    output = str(tmp_path / "recherche.sqlite")
+
+    def indexer(enrich, complete, scraping=True):
+        metadata.write_text(json.dumps({"collecte_complete": complete}), encoding="utf-8")
+        index_offers({"enrich": enrich, "collect_api": str(api_path),
+                      "collect_scraping": str(tmp_path / "scraping.jsonl") if scraping else None}, output)
+        with SearchIndex(output) as index:
+            return sorted(row[0] for row in index.conn.execute("SELECT identifiant FROM offres"))
+
+    assert indexer(enrichies, True) == ["o1", "o2", "o3"]
+    # --max-results ou mot-clé en échec, scraping en échec : rien n'est retiré
+    assert indexer(partielles, False, scraping=False) == ["o1", "o2", "o3"]
+    # Collecte France Travail complète : ses offres absentes sont retirées, pas celles du scraping en échec
+    assert indexer(partielles, True, scraping=False) == ["o1", "o3"]
+    # Un site sans aucune offre cette fois garde les siennes ; sinon ses offres absentes sont retirées
+    assert indexer(partielles, True) == ["o1", "o3"]
+    assert indexer(relevees, True) == ["o1", "o4"]
+
+
+# --------------------------------------------------------------
+#  Géographie
+# --------------------------------------------------------------
+
+def test_geocode_formats_and_radius():
+    lieux = pd.Series(["75 - Paris 11e", "Lyon (69003)", "Villeurbanne, Auvergne-Rhône-Alpes, France", "Marseile",
+                       "92 - Commune absente", "Bretagne", "France", None, "69 - Rhône"])
+    geo = geocode(pd.DataFrame({'Ville ou région': lieux}))
+
+    assert geo['Commune'].astype(object).where(geo['Commune'].notna(), None).tolist() == [
+        "Paris", "Lyon", "Villeurbanne", "Marseille", None, None, None, None, None]
+    assert geo['Département'].astype(object).tolist()[:5] == ["75", "69", "69", "13", "92"]
+    assert geo['Région'].astype(object).tolist()[:6] == ["11", "84", "84", "93", "11", "53"]
+    assert geo['Précision géo'].astype(str).tolist() == [
+        "commune", "commune", "commune", "commune", "departement", "region", "pays", "inconnue", "departement"]
+    # Un département sans commune reconnue est placé sur son chef-lieu
+    assert geo.loc[4, ['Latitude', 'Longitude']].tolist() == pytest.approx([48.8924, 2.2069], abs=1e-4)
+
+    index = GeoIndex.from_frame(geo)
+    assert len(index) == 7
+    positions, distances = index.near("Lyon", 30)
+    assert sorted(positions.tolist()) == [1, 2, 8] and distances.max() < 5
+    positions, distances = index.near("Aix-en-Provence", 30)
+    assert positions.tolist() == [3] and 20 < distances[0] < 30
+    with pytest.raises(ValueError):
+        default_reference().find("Atlantide")
+
+
+# --------------------------------------------------------------
+#  Entrepôt colonnaire
+# --------------------------------------------------------------
+
+@pytest.mark.parametrize("format", ["arrow", "parquet"])
+def test_offer_store_partitions_projection_and_updates(tmp_path, format):
+    def offres(debut, fin, source, contrat='CDI'):
+        n = fin - debut
+        return pd.DataFrame({
+            'Identifiant': pd.Series([f"o{i}" for i in range(debut, fin)], dtype=pd.StringDtype("pyarrow")),
+            'Intitulé du poste': pd.Series([f"Poste {i}" for i in range(debut, fin)], dtype=pd.StringDtype("pyarrow")),
+            'Date de publication': pd.date_range("2024-01-01", periods=n, freq="D") + pd.Timedelta(days=debut),
+            'Type de contrat': pd.Categorical([contrat] * n, categories=['CDI', 'CDD', 'Stage']),
+            'Source': pd.Categorical([source] * n),
+            'Salaire annuel min': np.arange(debut, fin, dtype=np.float32),
+        })
+
+    chemin = str(tmp_path / "store")
+    store = OfferStore(chemin, format=format)
+    assert store.write(pd.concat([offres(0, 10, "LinkedIn"), offres(10, 15, "France Travail")]),
+                       collected="2024-01-31") == {"nouvelles": 15, "modifiees": 0, "inchangees": 0}
+    modifiee = offres(0, 1, "LinkedIn").assign(**{'Intitulé du poste': "Poste renommé"})
+    fevrier = pd.concat([modifiee, offres(1, 10, "LinkedIn"), offres(20, 30, "France Travail", 'Stage')])
+    assert store.write(fevrier, collected="2024-02-15") == {"nouvelles": 10, "modifiees": 1, "inchangees": 9}
+
+    store = OfferStore(chemin)  # relu depuis le manifeste
+    assert len(store) == 25 and store.months == ["2024-01", "2024-02"]
+    assert store.sources == ["France Travail", "LinkedIn"] and len(store.files()) == 3
+    df = store.load()
+    assert len(df) == 25 and df['Identifiant'].is_unique
+    # L'offre modifiée reste dans son mois de première collecte
+    renommee = df[df['Identifiant'] == "o0"].iloc[0]
+    assert renommee['Intitulé du poste'] == "Poste renommé" and renommee['Date de collecte'] == pd.Timestamp("2024-01-31")
+    assert df['Type de contrat'].dtype == pd.CategoricalDtype(['CDI', 'CDD', 'Intérim', 'Stage', 'Alternance',
+                                                               'Freelance', 'Saisonnier', 'Autre', 'Non spécifié'])
+
+    fevrier = store.load(columns=['Identifiant', 'Type de contrat'], months=["2024-02"])
+    assert list(fevrier.columns) == ['Identifiant', 'Type de contrat'] and len(fevrier) == 10
+    stages = store.load(columns=['Identifiant'], filter=[('Type de contrat', '=', 'Stage')], sources=["France Travail"])
+    assert sorted(stages['Identifiant']) == sorted(f"o{i}" for i in range(20, 30))
+    assert len(store.files(until="2024-01-05")) == 1
+    # Borne égale à la première date de publication d'un fichier : le fichier est gardé
+    premier = store.load(columns=['Identifiant', 'Date de publication']).sort_values('Date de publication').iloc[0]
+    borne = premier['Date de publication'].strftime('%Y-%m-%d')
+    assert premier['Identifiant'] in store.load(columns=['Identifiant'], until=borne)['Identifiant'].tolist()
+    assert store.load(until="2024-01-01")['Identifiant'].tolist() == ["o0"]
+    assert store.load(since="2024-01-20")['Identifiant'].tolist() == ["o20", "o21", "o22", "o23", "o24",
+                                                                       "o25", "o26", "o27", "o28", "o29"]
+
+
+def test_changesets_field_deltas_and_replica(tmp_path):
+    def offres(ids, titre="Data Engineer"):
+        return pd.DataFrame({
+            'Identifiant': pd.Series(ids, dtype=pd.StringDtype("pyarrow")),
+            'Intitulé du poste': pd.Series([titre] * len(ids), dtype=pd.StringDtype("pyarrow")),
+            'Date de publication': pd.to_datetime(["2024-05-02"] * len(ids)),
+            'Type de contrat': pd.Categorical(["CDI"] * len(ids)),
+            'Salaire annuel min': np.full(len(ids), 45000.5, dtype=np.float32),
+        })
+
+    dossier = str(tmp_path / "changesets")
+    with CurrentOffers(str(tmp_path / "courantes.sqlite")) as courantes:
+        premier = capture(offres(["a", "b", "c"]), courantes, dossier)
+        assert (premier["seq"], premier["insertions"]) == (1, 3)
+        assert capture(offres(["a", "b", "c"]), courantes, dossier) is None  # collecte identique
+
+        suivante = pd.concat([offres(["a"], "Data Engineer senior"), offres(["b", "d"])], ignore_index=True)
+        second = capture(suivante, courantes, dossier)
+        assert (second["base"], second["insertions"], second["modifications"], second["suppressions"]) == (1, 1, 1, 1)
+        lignes = pd.read_json(changeset_path(dossier, 2), lines=True)
+        modification = lignes[lignes["op"] == "update"].iloc[0]
+        assert modification["identifiant"] == "a"
+        assert modification["delta"] == {"titre": ["Data Engineer", "Data Engineer senior"]}
+        assert lignes[lignes["op"] == "delete"]["identifiant"].tolist() == ["c"]
+        etat = courantes.load().sort_values("identifiant")
+
+    # Un consommateur rejoue les changesets dans l'ordre et obtient la même table
+    with CurrentOffers(str(tmp_path / "copie.sqlite")) as copie:
+        with pytest.raises(ValueError):
+            copie.apply_file(changeset_path(dossier, 2))
+        copie.apply_file(changeset_path(dossier, 1))
+        copie.apply_file(changeset_path(dossier, 2))
+        replique = copie.load().sort_values("identifiant")
+    pd.testing.assert_frame_equal(replique.reset_index(drop=True), etat.reset_index(drop=True))
+    assert etat["identifiant"].tolist() == ["a", "b", "d"] and etat["salaire_min"].tolist() == [45000.5] * 3
+
+
+def test_cdc_keeps_offers_of_partial_collections(tmp_path):
+    enrichies, partielles = str(tmp_path / "enrichies.parquet"), str(tmp_path / "partielles.parquet")
+    enriched_stage(str(tmp_path), {"precision": "commune"}).func({}, enrichies)
+    pd.read_parquet(enrichies).iloc[:1].to_parquet(partielles, index=False)  # o2 (France Travail) manque
+    api_path, metadata = tmp_path / "raw" / "offres_it.jsonl", tmp_path / "raw" / "metadata_collecte.json"
+    api_path.parent.mkdir()
+    output = str(tmp_path / "courantes.sqlite")
+
+    def capturer(enrich, complete):
+        metadata.write_text(json.dumps({"collecte_complete": complete}), encoding="utf-8")
+        capture_changes({"enrich": enrich, "collect_api": str(api_path)}, output)
+        with CurrentOffers(output) as courantes:
+            return sorted(courantes.load()["identifiant"]), courantes.version
+
+    assert capturer(enrichies, True) == (["o1", "o2"], 1)
+    # --max-results ou mot-clé en échec : aucune suppression, donc aucun changeset
+    assert capturer(partielles, False) == (["o1", "o2"], 1)
+    assert capturer(partielles, True) == (["o1"], 2)
+
+
+def test_cdc_stage_reruns_without_changes(tmp_path):
+    workdir, version = str(tmp_path / "pipeline"), {"precision": "commune"}
+    cdc = next(stage for stage in default_stages(workdir=workdir, api=False, scraping=False) if stage.name == "cdc")
+
+    def pipeline():
+        return Pipeline([enriched_stage(workdir, version), cdc], workdir=workdir)
+
+    assert pipeline().run() == {"enrich": "execute", "cdc": "execute"}
+    # Collecte identique sur les champs suivis : aucun changeset, la table reste telle quelle sans échec
+    version["precision"] = "departement"
+    assert pipeline().run(force=["enrich"]) == {"enrich": "execute", "cdc": "execute"}
+    assert os.listdir(os.path.join(workdir, "changesets")) == ["changeset-000001.jsonl"]
+    with CurrentOffers(cdc.output) as courantes:
+        assert courantes.version == 1 and courantes.count() == 2